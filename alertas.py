@@ -0,0 +1,175 @@
+"""
+Alertas configurados em config_alertas.txt (JSON):
+  - valor_alerta: gasto individual acima deste valor;
+  - dias_vencimento_alerta: fatura de cartão que vence nos próximos N dias;
+e metas mensais de metas.json (meta_gasto estourada, sobra abaixo de meta_sobra_percent).
+
+Nada aqui relê o histórico a cada rerun:
+  - os gastos acima do limite ficam num pequeno DataFrame por perfil, atualizado a cada
+    gravação só com as linhas incluídas/alteradas/excluídas (register_write_listener);
+  - vencimentos vêm do agregado diário de faturas.py e metas dos rollups de resumos.py,
+    ambos também incrementais.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cache_dados
+import faturas
+import resumos
+
+CONFIG_FILE = "config_alertas.txt"
+DEFAULT_CONFIG = {'valor_alerta': 2000.0, 'dias_vencimento_alerta': 5}
+ALERT_COLUMNS = ['Alerta', 'Perfil', 'Data', 'Valor', 'Mensagem']
+LARGE_COLUMNS = ['ID', 'Data', 'Categoria', 'Descrição', 'Valor']
+
+
+def load_config(path=CONFIG_FILE):
+    """Configuração dos alertas (valores ausentes ou inválidos usam DEFAULT_CONFIG)."""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    except (FileNotFoundError, ValueError):
+        pass
+    config['valor_alerta'] = float(config['valor_alerta'])
+    config['dias_vencimento_alerta'] = int(config['dias_vencimento_alerta'])
+    return config
+
+
+def _empty_alerts():
+    return pd.DataFrame({'Alerta': pd.Series(dtype=object), 'Perfil': pd.Series(dtype=object),
+                         'Data': pd.Series(dtype='datetime64[ns]'), 'Valor': pd.Series(dtype='float64'),
+                         'Mensagem': pd.Series(dtype=object)})
+
+
+def large_expenses(df, threshold):
+    """Gastos de `df` com Valor acima de `threshold` (em reais; as linhas mantêm Valor em centavos)."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=LARGE_COLUMNS)
+    mask = (df['Tipo'] == 'Gasto').to_numpy() & (df['Valor'].to_numpy(dtype='int64') > round(threshold * 100))
+    return df.loc[mask, LARGE_COLUMNS].reset_index(drop=True)
+
+
+def _large_key(backend, profile):
+    return f"{backend.cache_key(profile)}#alertas_valor"
+
+
+def load_large_expenses(profile, threshold, backend=None):
+    """Gastos acima de `threshold` do perfil; a varredura completa só acontece sem cache (ou se o limite mudar)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return pd.DataFrame(columns=LARGE_COLUMNS)
+
+    def build():
+        return large_expenses(armazenamento.load_transactions(profile, backend.name), threshold)
+    return cache_dados.get_versioned(_large_key(backend, profile), (version, threshold), build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    key = _large_key(backend, profile)
+    if added is None or removed is None:
+        cache_dados.invalidate(key)
+        return
+    # o limite já faz parte da versão em cache, (versão, limite): sem entrada não há o que atualizar
+    cached = cache_dados.cached_version(key)
+    if cached is None:
+        return
+    threshold = cached[1]
+
+    def transform(current):
+        # linhas alteradas/excluídas saem; as novas versões entram de novo se passarem do limite
+        kept = current[~current['ID'].isin(removed['ID'])]
+        new = large_expenses(added, threshold)
+        return pd.concat([kept, new], ignore_index=True) if not new.empty else kept
+    cache_dados.update_frame(key, (previous_version, threshold), (new_version, threshold), transform)
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def expense_alerts(profiles, threshold, since, until=None, backend=None):
+    """Gastos acima de `threshold` de `since` até antes de `until` (exclusivo), de todos os perfis."""
+    frames = []
+    for profile, rows in zip(profiles, armazenamento.map_profiles(
+            lambda profile: load_large_expenses(profile, threshold, backend), profiles)):
+        dates = pd.to_datetime(rows['Data'])
+        in_window = dates >= pd.Timestamp(since)
+        if until is not None:
+            # parcelas agendadas e contas de meses seguintes não entram
+            in_window &= dates < pd.Timestamp(until)
+        rows = rows[in_window]
+        if rows.empty:
+            continue
+        frames.append(pd.DataFrame({
+            'Alerta': 'Gasto alto', 'Perfil': profile, 'Data': pd.to_datetime(rows['Data']).to_numpy(),
+            'Valor': armazenamento.to_reais(rows['Valor']),
+            'Mensagem': [f"{d} acima de R$ {threshold:,.2f}" for d in rows['Descrição'].astype(str)],
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else _empty_alerts()
+
+
+def due_alerts(profiles, cards_df, days, today, backend=None):
+    """Faturas (fechadas ou abertas) com vencimento entre hoje e hoje + `days`."""
+    invoices = faturas.invoices_for(profiles, cards_df, today, backend)
+    today = pd.Timestamp(today).normalize()
+    due = invoices[(invoices['Vencimento'] >= today) & (invoices['Vencimento'] <= today + pd.Timedelta(days=days))
+                   & (invoices['Status'] != 'Futura') & (invoices['Valor'] > 0)]
+    if due.empty:
+        return _empty_alerts()
+    owners = {} if cards_df is None or 'Dono' not in cards_df else dict(zip(cards_df['Nome'], cards_df['Dono']))
+    return pd.DataFrame({
+        'Alerta': 'Vencimento', 'Perfil': [owners.get(card) for card in due['Cartao']],
+        'Data': due['Vencimento'].to_numpy(), 'Valor': due['Valor'].to_numpy(),
+        'Mensagem': [f"Fatura {ref} do cartão {card} vence em {d:%d/%m/%Y}"
+                     for ref, card, d in zip(due['Fatura'], due['Cartao'], due['Vencimento'])],
+    })
+
+
+def goal_alerts(profiles, goals, month, backend=None):
+    """Metas do mês `month` ('AAAA-MM') estouradas: gasto acima de meta_gasto ou sobra abaixo de meta_sobra_percent."""
+    rows = []
+    rollups = armazenamento.map_profiles(lambda profile: resumos.load_rollup(profile, backend), profiles)
+    for profile, rollup in zip(profiles, rollups):
+        profile_goals = goals.get(profile) or {}
+        month_rows = rollup[rollup['Ano-Mês'] == month]
+        # rollup em centavos
+        entrada = int(month_rows.loc[month_rows['Tipo'] == 'Entrada', 'Valor'].sum()) / 100
+        gasto = int(month_rows.loc[month_rows['Tipo'] == 'Gasto', 'Valor'].sum()) / 100
+        meta_gasto = profile_goals.get('meta_gasto')
+        if meta_gasto and gasto > meta_gasto:
+            rows.append(('Meta de gasto', profile, gasto,
+                         f"Gastos de {month} (R$ {gasto:,.2f}) acima da meta de R$ {float(meta_gasto):,.2f}"))
+        meta_sobra = profile_goals.get('meta_sobra_percent')
+        if meta_sobra and entrada > 0 and entrada - gasto < entrada * meta_sobra / 100.0:
+            rows.append(('Meta de sobra', profile, entrada - gasto,
+                         f"Sobra de {month} (R$ {entrada - gasto:,.2f}) abaixo de {float(meta_sobra):g}% da entrada"))
+    if not rows:
+        return _empty_alerts()
+    alerts = pd.DataFrame(rows, columns=['Alerta', 'Perfil', 'Valor', 'Mensagem'])
+    alerts['Data'] = pd.Period(month, freq='M').start_time
+    return alerts[ALERT_COLUMNS]
+
+
+def evaluate(profiles, goals, cards_df, today=None, config=None, backend=None):
+    """
+    Todos os alertas ativos em `today`: gastos altos do mês corrente, faturas a vencer e metas
+    do mês corrente. Custo proporcional ao número de meses/dias com movimento, não de transações.
+    """
+    config = config or load_config()
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    month_start = today.to_period('M').start_time
+    frames = [
+        expense_alerts(profiles, config['valor_alerta'], month_start, month_start + pd.DateOffset(months=1), backend),
+        due_alerts(profiles, cards_df, config['dias_vencimento_alerta'], today, backend),
+        goal_alerts(profiles, goals, str(today.to_period('M')), backend),
+    ]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return _empty_alerts()
+    alerts = pd.concat(frames, ignore_index=True)
+    return alerts.iloc[np.argsort(alerts['Data'].to_numpy(), kind='stable')].reset_index(drop=True)
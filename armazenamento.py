@@ -0,0 +1,916 @@
+"""
+Camada de armazenamento das transações por perfil.
+
+O formato em disco é escolhido por um "backend" plugável:
+  - 'csv'     : arquivo texto {perfil}_dados_custos.csv (formato original)
+  - 'parquet' : arquivo colunar tipado {perfil}_dados_custos.parquet (requer pyarrow)
+  - 'sqlite'  : banco local com índices (ver armazenamento_sqlite.py)
+
+Independente do backend, load_transactions devolve sempre o mesmo modelo em memória
+(ver normalize_transactions), então o restante do app não precisa saber onde os dados estão
+gravados. Com as linhas ordenadas por Data, filtros por período são uma busca binária
+(searchsorted) seguida de um fatiamento.
+
+Modelo em memória (compacto; os arquivos continuam em reais e 'Sim'/'Não'):
+  - Data: datetime64[ns];
+  - Valor: centavos em int64 (somas exatas); TotalCompra: centavos em Int64 (nulo fora de compras parceladas);
+  - Tipo, Categoria, Cartao e Grupo: categóricos (códigos inteiros + uma cópia de cada texto;
+    as parcelas de uma compra repetem o mesmo Grupo);
+  - PagoComCartao e GerouParcelas: bool;
+  - NumParcelas e ParcelaAtual: Int16; ID: Int64.
+Para exibir ou editar, display_frame devolve os valores em reais.
+
+O backend padrão é definido pela variável de ambiente ARMAZENAMENTO ('csv', 'parquet' ou 'sqlite');
+sem ela, usa 'parquet' quando o pyarrow está instalado e 'csv' caso contrário.
+
+Cada transação tem um ID persistente (coluna 'ID', inteiro aleatório de 63 bits), atribuído
+na inserção; arquivos antigos recebem IDs na primeira leitura.
+
+As gravações custam apenas as linhas alteradas:
+  - novas transações (append_transactions): no CSV vão direto ao fim do arquivo;
+    no Parquet vão para o journal;
+  - edições e exclusões (apply_changes): registradas no journal como upsert/exclusão por ID.
+O journal é um CSV ao lado do arquivo principal, incorporado (compactado) quando cresce demais.
+
+Ao abrir um perfil em outro backend pela primeira vez, o CSV existente é migrado
+automaticamente (o CSV original é mantido no disco como cópia de segurança).
+
+Várias sessões (e processos) podem gravar o mesmo perfil: cada gravação acontece com a trava
+do perfil (persistencia.file_lock), reescritas completas trocam o arquivo de uma vez
+(persistencia.write_atomic) e edições podem exigir que as linhas ainda estejam como o usuário
+as viu (apply_changes com `expected`), levantando persistencia.WriteConflict caso contrário.
+"""
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import cache_dados
+import persistencia
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional: sem ele, só o backend CSV fica disponível
+    pa = None
+
+# Nome base do arquivo de transações (prefixado pelo perfil)
+DATA_FILE = "dados_custos.csv"
+DATA_FILE_STEM = os.path.splitext(DATA_FILE)[0]
+
+# colunas do schema de transações (na ordem em que são gravadas)
+TRANSACTION_COLUMNS = ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor', 'PagoComCartao', 'Cartao',
+                       'NumParcelas', 'ParcelaAtual', 'GerouParcelas', 'TotalCompra', 'Grupo', 'ID']
+
+# colunas adicionadas em versões posteriores (podem faltar em arquivos antigos)
+OPTIONAL_COLUMNS = ['PagoComCartao', 'Cartao', 'NumParcelas', 'ParcelaAtual', 'GerouParcelas', 'TotalCompra',
+                    'Grupo', 'ID']
+
+# journal: linhas completas + operação ('U' = inserir/atualizar pelo ID, 'D' = excluir o ID)
+JOURNAL_OPERATION_COLUMN = 'Operacao'
+JOURNAL_COLUMNS = TRANSACTION_COLUMNS + [JOURNAL_OPERATION_COLUMN]
+
+# o journal é compactado quando passa deste tamanho e de uma fração do arquivo principal
+# (limite relativo: o custo amortizado da compactação por linha gravada não cresce com o histórico)
+JOURNAL_MIN_COMPACT_BYTES = 1024 * 1024
+JOURNAL_COMPACT_RATIO = 0.1
+
+# modelo em memória das colunas (ver normalize_transactions)
+CATEGORY_COLUMNS = ['Tipo', 'Categoria', 'Cartao', 'Grupo']
+BOOL_COLUMNS = ['PagoComCartao', 'GerouParcelas']
+MONEY_COLUMNS = ['Valor', 'TotalCompra']
+COUNTER_COLUMNS = ['NumParcelas', 'ParcelaAtual']
+# textos gravados para as colunas booleanas (e aceitos na leitura, além de True/False)
+BOOL_TEXT = {True: 'Sim', False: 'Não'}
+_TRUE_VALUES = [True, 'Sim', 'sim', 'True', 'true']
+
+# threads usadas para carregar vários perfis ao mesmo tempo (visão consolidada)
+LOAD_THREADS = int(os.environ.get("ARMAZENAMENTO_THREADS", min(8, (os.cpu_count() or 1) + 4)))
+
+_rng = np.random.default_rng()
+
+# funções chamadas após cada gravação (ver register_write_listener)
+_write_listeners = []
+
+
+def empty_transactions():
+    return normalize_transactions(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+
+
+def new_ids(n):
+    """Gera `n` IDs aleatórios positivos de 63 bits (cabem em int64 e no INTEGER do SQLite)."""
+    return _rng.integers(1, np.iinfo(np.int64).max, size=n, dtype=np.int64)
+
+
+def ensure_ids(df):
+    """Atribui ID às linhas que não têm. Retorna True se alguma linha recebeu ID novo."""
+    if 'ID' not in df.columns:
+        df['ID'] = pd.array([pd.NA] * len(df), dtype='Int64')
+    else:
+        df['ID'] = pd.array(df['ID'], dtype='Int64')
+    missing = df['ID'].isna()
+    if not missing.any():
+        return False
+    df.loc[missing, 'ID'] = new_ids(int(missing.sum()))
+    return True
+
+
+def reais_to_cents(values):
+    """Valores em reais (inteiros ou não: 80 é R$ 80,00) -> centavos (Int64, nulos preservados)."""
+    reais = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return pd.array(np.round(reais * 100), dtype='Int64')
+
+
+def money_from_reais(df):
+    """
+    Cópia de `df` com Valor e TotalCompra convertidos de reais para centavos. Deve ser usada por quem
+    recebe valores digitados ou importados (editor, importação) antes de gravar: um valor inteiro
+    em reais (80) chega como int64 e, sem a conversão, seria lido como centavos.
+    """
+    return df.assign(**{col: reais_to_cents(df[col]) for col in MONEY_COLUMNS if col in df.columns})
+
+
+def stored_to_cents(values):
+    """
+    Valores monetários lidos pelos backends -> centavos (Int64, nulos preservados). Colunas inteiras
+    já estão em centavos (modelo em memória, Parquet) e ficam como estão; colunas float (CSV, SQLite)
+    estão em reais. Valores vindos do usuário passam antes por money_from_reais.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return pd.array(values, dtype='Int64')
+    return reais_to_cents(values)
+
+
+def to_reais(values):
+    """Centavos (modelo em memória) -> reais em float64 (nulos como NaN)."""
+    if not pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return pd.array(values, dtype='Int64').to_numpy(dtype='float64', na_value=np.nan) / 100
+
+
+def _to_bool(values):
+    if pd.api.types.is_bool_dtype(values) and not pd.api.types.is_extension_array_dtype(values):
+        return values
+    # só os valores distintos são comparados; nulos (código -1) viram False
+    codes, uniques = pd.factorize(values)
+    return np.append(pd.Index(uniques, dtype=object).isin(_TRUE_VALUES), False)[codes]
+
+
+def normalize_transactions(df):
+    """
+    Aplica o modelo em memória (ver o início do módulo) a `df`, no lugar, e garante que as colunas
+    opcionais existam. Idempotente: linhas já normalizadas passam sem mudança. Valores monetários
+    inteiros são centavos e em float são reais (como vêm dos arquivos); ver stored_to_cents.
+    """
+    if 'Data' in df.columns and df['Data'].dtype != 'datetime64[ns]':
+        dates = df['Data'] if pd.api.types.is_datetime64_dtype(df['Data']) else pd.to_datetime(df['Data'])
+        df['Data'] = dates.astype('datetime64[ns]')
+    # garantir colunas novas existam para compatibilidade com versões antigas
+    for col in OPTIONAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+    if 'Valor' in df.columns:
+        df['Valor'] = stored_to_cents(df['Valor']).fillna(0).astype('int64')
+    df['TotalCompra'] = stored_to_cents(df['TotalCompra'])
+    for col in COUNTER_COLUMNS:
+        if not isinstance(df[col].dtype, pd.Int16Dtype):
+            values = df[col] if pd.api.types.is_numeric_dtype(df[col]) else pd.to_numeric(df[col], errors='coerce')
+            df[col] = values.round().astype('Int16')
+    for col in BOOL_COLUMNS:
+        df[col] = _to_bool(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # coluna só com nulos (lida como float) não deve gerar categorias numéricas
+            values = df[col].astype(object) if pd.api.types.is_numeric_dtype(df[col]) else df[col]
+            df[col] = values.astype('category')
+    df['ID'] = pd.array(df['ID'], dtype='Int64')
+    return df
+
+
+def display_frame(df):
+    """
+    Cópia de `df` no formato de exibição e edição (st.data_editor): valores em reais (float)
+    e colunas categóricas como texto comum (opções livres no editor).
+    """
+    df = df.copy()
+    for col in MONEY_COLUMNS:
+        if col in df.columns:
+            df[col] = to_reais(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def concat_transactions(frames):
+    """
+    pd.concat de frames de transações mantendo as colunas categóricas: as categorias são unidas
+    antes (sem isso o pandas devolveria object). Os códigos do primeiro frame não mudam quando as
+    categorias novas só aparecem nos demais (o caso comum: histórico + poucas linhas novas).
+    """
+    frames = [df for df in frames if df is not None]
+    for col in CATEGORY_COLUMNS:
+        dtypes = [df[col].dtype for df in frames if col in df.columns]
+        if len(dtypes) < 2 or not all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            continue
+        if all(d == dtypes[0] for d in dtypes[1:]):
+            continue
+        # ordem de primeira ocorrência: as categorias do primeiro frame vêm na frente
+        categories = dtypes[0].categories.append([d.categories for d in dtypes[1:]]).unique()
+        frames = [df.assign(**{col: df[col].cat.set_categories(categories)}) if col in df.columns else df
+                  for df in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def sort_by_date(df):
+    """`df` ordenado por Data (ordenação estável; não copia nada se já estiver em ordem)."""
+    if df.empty or df['Data'].is_monotonic_increasing:
+        return df
+    return df.sort_values('Data', kind='stable', ignore_index=True)
+
+
+def apply_changes_to_frame(df, upserts, deleted_ids):
+    """
+    Aplica upserts (linhas completas, por ID) e exclusões a `df`, preservando a ordem:
+    linhas alteradas ficam na posição original e linhas novas vão para o fim; em seguida
+    a ordem por Data é restabelecida (estável, então linhas da mesma data mantêm a ordem).
+    """
+    deleted_ids = pd.Index(pd.array(deleted_ids, dtype='Int64')).dropna()
+    upserts = upserts.reindex(columns=df.columns)
+    with_id = upserts[upserts['ID'].notna()].drop_duplicates('ID', keep='last')
+    without_id = upserts[upserts['ID'].isna()]
+
+    df = df[~df['ID'].isin(deleted_ids)]
+    replaced = df['ID'].isin(with_id['ID'])
+    if replaced.any():
+        # troca as linhas alteradas e devolve cada uma à posição original
+        replacements = with_id[with_id['ID'].isin(df['ID'])]
+        positions = pd.Series(np.arange(len(df)), index=df['ID'].to_numpy())
+        order = np.concatenate([np.flatnonzero(~replaced.to_numpy()),
+                                positions.loc[replacements['ID'].to_numpy()].to_numpy()])
+        df = concat_transactions([df[~replaced], replacements]).iloc[np.argsort(order, kind='stable')]
+    new_rows = pd.concat([with_id[~with_id['ID'].isin(df['ID'])], without_id])
+    if new_rows.empty:
+        return sort_by_date(df.reset_index(drop=True))
+    return sort_by_date(concat_transactions([df, new_rows]))
+
+
+def _storage_values(df):
+    """Valores no formato gravado: reais em vez de centavos e 'Sim'/'Não' em vez de bool."""
+    changes = {col: to_reais(df[col]) for col in MONEY_COLUMNS if col in df.columns}
+    changes.update({col: df[col].map(BOOL_TEXT) for col in BOOL_COLUMNS
+                    if col in df.columns and pd.api.types.is_bool_dtype(df[col])})
+    # assign não altera o df do chamador
+    return df.assign(**changes) if changes else df
+
+
+def _format_for_csv(df):
+    df = _storage_values(df)
+    # garantir formato de data serializável
+    if 'Data' in df.columns and not df.empty:
+        df = df.assign(Data=pd.to_datetime(df['Data']).dt.strftime('%Y-%m-%d'))
+    return df
+
+
+def _read_csv(path):
+    # ID como Int64: lido como float, um inteiro de 63 bits perderia precisão;
+    # valores sempre como float (reais): uma coluna só com inteiros não pode ser confundida com centavos
+    return pd.read_csv(path, dtype={'ID': 'Int64', 'Valor': 'float64', 'TotalCompra': 'float64'})
+
+
+def _read_csv_header(path):
+    """Colunas do cabeçalho do CSV, ou None se o arquivo não existir ou estiver vazio."""
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            line = f.readline()
+    except FileNotFoundError:
+        return None
+    if not line.strip():
+        return None
+    return next(csv.reader([line]))
+
+
+def _append_csv_rows(path, rows, header=False, trim_torn_tail=False):
+    """
+    Acrescenta `rows` ao fim do CSV numa única escrita seguida de fsync.
+    Se a última linha do arquivo estiver incompleta (append anterior interrompido),
+    ela é descartada quando trim_torn_tail=True ou fechada com uma quebra de linha caso contrário
+    (arquivos editados à mão podem legitimamente não terminar em quebra de linha).
+    """
+    payload = _format_for_csv(rows).to_csv(index=False, header=header, lineterminator='\n').encode('utf-8')
+    with open(path, 'ab+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end > 0:
+            f.seek(end - 1)
+            if f.read(1) != b'\n':
+                if trim_torn_tail:
+                    _truncate_after_last_newline(f, end)
+                else:
+                    payload = b'\n' + payload
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _truncate_after_last_newline(f, end, chunk_size=4096):
+    pos = end
+    while pos > 0:
+        start = max(0, pos - chunk_size)
+        f.seek(start)
+        i = f.read(pos - start).rfind(b'\n')
+        if i >= 0:
+            f.truncate(start + i + 1)
+            return
+        pos = start
+    f.truncate(0)
+
+
+# --- Backends ---
+class CsvBackend:
+    """Formato original: um CSV por perfil, datas em texto ISO."""
+    name = 'csv'
+    extension = '.csv'
+
+    def path(self, profile):
+        return f"{profile}_{DATA_FILE_STEM}{self.extension}"
+
+    def journal_path(self, profile):
+        return f"{self.path(profile)}.journal.csv"
+
+    def journal_paths(self, profile):
+        """Arquivos auxiliares que também compõem os dados do perfil."""
+        return [self.journal_path(profile)]
+
+    def cache_key(self, profile):
+        return self.path(profile)
+
+    def version(self, profile):
+        """Versão atual dos dados do perfil para o cache (None se o perfil ainda não tem dados)."""
+        current = cache_dados.signature(self.path(profile), self.journal_paths(profile))
+        return current if current[0] is not None else None
+
+    def exists(self, profile):
+        return os.path.exists(self.path(profile))
+
+    def lock_path(self, profile):
+        return self.path(profile)
+
+    def lock(self, profile):
+        """Trava de gravação do perfil (entre threads e entre processos)."""
+        return persistencia.file_lock(self.lock_path(profile))
+
+    # leitura/escrita do arquivo principal (write_file é sobrescrito por formatos binários)
+    def read(self, path):
+        return normalize_transactions(_read_csv(path))
+
+    def write(self, df, path):
+        """Grava o arquivo inteiro num temporário e o troca de uma vez: leitores nunca veem meio arquivo."""
+        persistencia.write_atomic(path, lambda tmp_path: self.write_file(df, tmp_path))
+
+    def write_file(self, df, path):
+        _format_for_csv(df).to_csv(path, index=False)
+
+    def load(self, profile):
+        df = self.read(self.path(profile))
+        journal = self.journal_path(profile)
+        if _read_csv_header(journal) is None:
+            return df
+        changes = _read_csv(journal)
+        if changes.empty:
+            return df
+        # journals antigos (só appends) não têm a coluna de operação
+        if JOURNAL_OPERATION_COLUMN not in changes.columns:
+            changes[JOURNAL_OPERATION_COLUMN] = 'U'
+        changes = normalize_transactions(changes)
+        # vale só a última operação de cada ID (ex.: edição seguida de exclusão da mesma linha)
+        with_id = changes['ID'].notna()
+        changes = pd.concat([changes[with_id].drop_duplicates('ID', keep='last'), changes[~with_id]])
+        deleted = changes[changes[JOURNAL_OPERATION_COLUMN] == 'D']
+        upserts = changes[changes[JOURNAL_OPERATION_COLUMN] != 'D'].drop(columns=[JOURNAL_OPERATION_COLUMN])
+        return apply_changes_to_frame(df, upserts, deleted['ID'])
+
+    def save(self, df, profile):
+        self.write(df, self.path(profile))
+        # o arquivo principal já contém tudo: o journal fica obsoleto
+        if os.path.exists(self.journal_path(profile)):
+            os.remove(self.journal_path(profile))
+
+    def append(self, rows, profile):
+        """
+        Grava apenas `rows` no fim do arquivo do perfil.
+        Retorna False quando o arquivo existente não tem todas as colunas de `rows`
+        (arquivo de versão antiga): nesse caso é preciso reescrever o arquivo inteiro.
+        """
+        path = self.path(profile)
+        header = _read_csv_header(path)
+        if header is None:
+            self.write(rows, path)
+            return True
+        if set(rows.columns) - set(header):
+            return False
+        _append_csv_rows(path, rows.reindex(columns=header))
+        return True
+
+    def apply_changes(self, profile, upserts, deleted_ids):
+        """Registra upserts e exclusões no journal (sem reescrever o arquivo principal)."""
+        if not self.exists(profile):
+            self.write(upserts.reindex(columns=TRANSACTION_COLUMNS), self.path(profile))
+            return
+        journal = self.journal_path(profile)
+        header = _read_csv_header(journal)
+        if header is not None and header != JOURNAL_COLUMNS:
+            # journal de versão antiga: incorpora antes de mudar o formato
+            self.compact(profile)
+            header = None
+        deletions = pd.DataFrame({'ID': pd.array(list(deleted_ids), dtype='Int64')})
+        # formato gravado antes de juntar às exclusões (sem Valor, a coluna deixaria de ser inteira)
+        rows = pd.concat([_storage_values(upserts.reindex(columns=TRANSACTION_COLUMNS)).assign(**{JOURNAL_OPERATION_COLUMN: 'U'}),
+                          deletions.assign(**{JOURNAL_OPERATION_COLUMN: 'D'})], ignore_index=True)
+        if rows.empty:
+            return
+        _append_csv_rows(journal, rows.reindex(columns=JOURNAL_COLUMNS), header=header is None, trim_torn_tail=True)
+        if os.path.getsize(journal) > max(JOURNAL_MIN_COMPACT_BYTES,
+                                          JOURNAL_COMPACT_RATIO * os.path.getsize(self.path(profile))):
+            self.compact(profile)
+
+    def compact(self, profile):
+        """Incorpora o journal ao arquivo principal. Retorna True se havia algo a compactar."""
+        if not os.path.exists(self.journal_path(profile)):
+            return False
+        self.write(self.load(profile), self.path(profile))
+        os.remove(self.journal_path(profile))
+        return True
+
+    def _load_or_none(self, profile):
+        try:
+            return load_transactions(profile, self.name)
+        except FileNotFoundError:
+            return None
+
+    def query(self, profiles, start=None, end=None, card=None):
+        """
+        Consulta genérica: carrega os perfis em paralelo (via cache), fatia o período de cada um
+        em memória e junta só as fatias, numa única concatenação.
+        """
+        profiles = list(dict.fromkeys(profiles))
+
+        def load_slice(profile):
+            df = self._load_or_none(profile)
+            return None if df is None else filter_transactions(df, start, end, card)
+        return concat_profiles(profiles, map_profiles(load_slice, profiles))
+
+    def date_bounds(self, profiles):
+        bounds = []
+        for df in map_profiles(self._load_or_none, profiles):
+            if df is not None and not df.empty:
+                # linhas ordenadas por Data: mínimo e máximo estão nas pontas
+                bounds.append((df['Data'].iloc[0], df['Data'].iloc[-1]))
+        if not bounds:
+            return None, None
+        return min(b[0] for b in bounds).date(), max(b[1] for b in bounds).date()
+
+
+class ParquetBackend(CsvBackend):
+    """
+    Formato colunar tipado: Data como date32, valores monetários como decimal(14,2),
+    Tipo/Categoria/Cartao/PagoComCartao/GerouParcelas codificados em dicionário,
+    contadores de parcela como int16 e ID como int64. Leitura sem nenhuma interpretação de texto
+    (as colunas em dicionário chegam ao pandas já como categóricas).
+    Appends também vão para o journal (o Parquet não aceita acrescentar linhas no lugar).
+    """
+    name = 'parquet'
+    extension = '.parquet'
+
+    MONEY_TYPE = pa.decimal128(14, 2) if pa else None
+    DICTIONARY_COLUMNS = ['Tipo', 'Categoria', 'Cartao', 'PagoComCartao', 'GerouParcelas']
+    MONEY_COLUMNS = ['Valor', 'TotalCompra']
+    INT_COLUMNS = ['NumParcelas', 'ParcelaAtual']
+
+    def append(self, rows, profile):
+        path = self.path(profile)
+        if not os.path.exists(path):
+            self.write(rows, path)
+            return True
+        if set(rows.columns) - set(TRANSACTION_COLUMNS):
+            return False
+        self.apply_changes(profile, rows, [])
+        return True
+
+    def read(self, path):
+        table = pq.read_table(path)
+        columns = {}
+        for name in table.column_names:
+            col = table.column(name)
+            # conversões para o modelo em memória feitas no Arrow (vetorizadas, sem passar por objetos)
+            if name in self.MONEY_COLUMNS:
+                col = pc.cast(pc.round(pc.multiply(pc.cast(col, pa.float64()), 100)), pa.int64())
+            elif name in BOOL_COLUMNS:
+                col = pc.fill_null(pc.equal(pc.cast(col, pa.string()), BOOL_TEXT[True]), False)
+            elif name in CATEGORY_COLUMNS and not pa.types.is_dictionary(col.type):
+                col = pc.dictionary_encode(col)
+            columns[name] = col
+        # inteiros com nulos (TotalCompra, contadores) viram Int64/Int16 em vez de float: float seria lido como reais
+        nullable = {pa.int64(): pd.Int64Dtype(), pa.int16(): pd.Int16Dtype()}
+        return normalize_transactions(pa.table(columns).to_pandas(date_as_object=False, types_mapper=nullable.get))
+
+    def write_file(self, df, path):
+        df = _storage_values(df)
+        arrays = {}
+        for name in df.columns:
+            arrays[name] = self._to_arrow(name, df[name])
+        for name in TRANSACTION_COLUMNS:
+            if name not in arrays:
+                arrays[name] = self._to_arrow(name, pd.Series([pd.NA] * len(df), dtype=object))
+        pq.write_table(pa.table(arrays), path)
+
+    def _to_arrow(self, name, series):
+        if name == 'Data':
+            values = pd.to_datetime(series).to_numpy().astype('datetime64[D]')
+            return pa.array(values, type=pa.date32())
+        if name in self.MONEY_COLUMNS:
+            values = pa.array(pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=float('nan')),
+                              from_pandas=True)
+            return pc.cast(pc.round(values, 2), self.MONEY_TYPE)
+        if name in self.INT_COLUMNS:
+            return pa.array(pd.to_numeric(series, errors='coerce').astype('Int16'), type=pa.int16())
+        if name == 'ID':
+            return pa.array(pd.array(series, dtype='Int64'), type=pa.int64())
+        if name in self.DICTIONARY_COLUMNS:
+            return pa.array(series.astype(object).where(series.notna(), None), type=pa.string()).dictionary_encode()
+        if name in ('Descrição', 'Grupo'):
+            return pa.array(series.astype(object).where(series.notna(), None), type=pa.string())
+        return pa.array(series, from_pandas=True)
+
+
+BACKENDS = {'csv': CsvBackend}
+if pa is not None:
+    BACKENDS['parquet'] = ParquetBackend
+
+
+def default_backend_name():
+    name = os.environ.get("ARMAZENAMENTO")
+    if name:
+        return name
+    return 'parquet' if 'parquet' in BACKENDS else 'csv'
+
+
+def get_backend(name=None):
+    name = name or default_backend_name()
+    if name == 'sqlite' and name not in BACKENDS:
+        import armazenamento_sqlite  # noqa: F401 (registra o backend; import tardio evita ciclo)
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido ou indisponível: {name}")
+    return BACKENDS[name]()
+
+
+def date_slice(df, start=None, end=None):
+    """
+    Linhas de `df` (ordenado por Data, como devolvido por load_transactions) entre `start` e `end`,
+    inclusivo: duas buscas binárias e um fatiamento, sem percorrer a coluna.
+    """
+    dates = df['Data'].to_numpy()
+    # limite na mesma unidade da coluna: searchsorted não converte o array inteiro
+    low = 0 if start is None else dates.searchsorted(pd.Timestamp(start).normalize().to_datetime64().astype(dates.dtype))
+    high = len(df) if end is None else dates.searchsorted(
+        pd.Timestamp(end).normalize().to_datetime64().astype(dates.dtype), 'right')
+    return df.iloc[low:high]
+
+
+def inserted_positions(df, rows):
+    """
+    Posições em `df` (ordenado por Data, já com `rows` acrescentadas por append_transactions) das
+    linhas `rows`, identificadas pelo ID. Só a faixa de datas de `rows` é percorrida. Retorna None se
+    alguma não for encontrada. Estruturas derivadas (grupos.py, busca.py) usam isso para se atualizar.
+    """
+    if rows.empty:
+        return np.empty(0, dtype=np.int64)
+    dates = df['Data'].to_numpy()
+    added = np.sort(rows['Data'].to_numpy(dtype=dates.dtype))
+    low = dates.searchsorted(added[0], 'left')
+    high = dates.searchsorted(added[-1], 'right')
+    positions = low + np.flatnonzero(df['ID'].iloc[low:high].isin(rows['ID']).to_numpy())
+    return positions if len(positions) == len(rows) else None
+
+
+def map_profiles(func, profiles, max_workers=None):
+    """
+    `func(profile)` para cada perfil, em paralelo numa pool de threads (LOAD_THREADS por padrão);
+    resultados na ordem de `profiles`. A leitura de Parquet/CSV/SQLite libera o GIL, então o tempo
+    total fica próximo ao do perfil mais lento em vez da soma de todos.
+    """
+    profiles = list(profiles)
+    workers = min(max_workers or LOAD_THREADS, len(profiles))
+    if workers <= 1:
+        return [func(profile) for profile in profiles]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="carrega_perfil") as pool:
+        return list(pool.map(func, profiles))
+
+
+def concat_profiles(profiles, frames):
+    """
+    Junta os frames de cada perfil (na ordem de `profiles`; None/vazio são ignorados) numa única
+    concatenação, com a coluna 'Pessoa' categórica montada a partir dos tamanhos (sem copiar cada frame).
+    """
+    parts = [(i, df) for i, df in enumerate(frames) if df is not None and not df.empty]
+    if not parts:
+        return empty_transactions().assign(Pessoa=pd.Categorical([], categories=profiles))
+    df = concat_transactions([part for _, part in parts])
+    codes = np.repeat([i for i, _ in parts], [len(part) for _, part in parts])
+    df['Pessoa'] = pd.Categorical.from_codes(codes, categories=profiles)
+    return sort_by_date(df) if len(parts) > 1 else df
+
+
+def filter_transactions(df, start=None, end=None, card=None):
+    """Filtra por intervalo de datas (inclusivo, `df` ordenado por Data) e, opcionalmente, por cartão."""
+    if df.empty:
+        return df
+    df = date_slice(df, start, end)
+    if card is not None:
+        df = df[df['Cartao'] == card]
+    return df
+
+
+# --- Notificação de gravações (estruturas derivadas: resumos, índices, ...) ---
+def register_write_listener(listener):
+    """
+    Registra `listener(profile, backend, previous_version, new_version, added, removed)`, chamado
+    após cada gravação de transações. `added` são as linhas novas/atualizadas e `removed` as versões
+    anteriores das linhas atualizadas/excluídas, permitindo manter estruturas derivadas de forma
+    incremental. Quando isso não é possível (reescrita completa, ou versão anterior fora do cache),
+    `added`/`removed` vêm como None e o listener deve descartar o que derivou dos dados.
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify_write(profile, backend, previous_version, new_version, added=None, removed=None):
+    for listener in _write_listeners:
+        listener(profile, backend, previous_version, new_version, added, removed)
+
+
+# --- API usada pelo app ---
+def _load_with_ids(backend, profile):
+    df = sort_by_date(backend.load(profile))
+    if ensure_ids(df):
+        # dados de versão antiga sem ID: grava uma única vez para os IDs ficarem estáveis
+        backend.save(df, profile)
+    return df
+
+
+def load_transactions(profile, backend=None):
+    """
+    Carrega as transações do perfil pelo backend escolhido (via cache_dados).
+    Se o backend não for CSV e ainda não tiver dados do perfil, migra o CSV antigo.
+    Lança FileNotFoundError quando o perfil ainda não tem dados.
+    Todas as sessões do processo recebem visões da mesma cópia em memória.
+    """
+    backend = get_backend(backend)
+    migrate_profile(profile, backend)
+    key = backend.cache_key(profile)
+    version = backend.version(profile)
+    if version is None:
+        cache_dados.invalidate(key)
+        raise FileNotFoundError(key)
+    # a carga acontece com a trava do perfil: não lê um journal enquanto outra sessão o compacta,
+    # e sessões que pedem o mesmo perfil ao mesmo tempo esperam uma única leitura
+    return cache_dados.get_versioned(key, version, lambda: _load_with_ids(backend, profile), lock=backend.lock(profile))
+
+
+def cache_key(profile, backend=None):
+    """Chave das transações do perfil no cache_dados (para cache_dados.Lease.hold)."""
+    return get_backend(backend).cache_key(profile)
+
+
+def save_transactions(df, profile, backend=None, expected_version=None):
+    """
+    Reescreve todas as transações do perfil.
+    Com `expected_version` (backend.version do perfil quando `df` foi lido), levanta
+    persistencia.WriteConflict em vez de sobrescrever gravações feitas por outra sessão.
+    """
+    backend = get_backend(backend)
+    df = df.copy()
+    ensure_ids(df)
+    with backend.lock(profile):
+        before = backend.version(profile)
+        if expected_version is not None and before != expected_version:
+            raise persistencia.WriteConflict(f"As transações de {profile} foram alteradas por outra sessão.")
+        backend.save(df, profile)
+        cache_dados.invalidate(backend.cache_key(profile))
+        _notify_write(profile, backend, before, backend.version(profile))
+
+
+def append_transactions(rows, profile, backend=None):
+    """
+    Acrescenta `rows` às transações do perfil gravando só as linhas novas.
+    `rows` com valores em centavos (parcelas.generate_transactions, money_from_reais).
+    O cache é estendido em memória, sem reler o histórico.
+    """
+    backend = get_backend(backend)
+    rows = rows.copy()
+    ensure_ids(rows)
+    # mesmo modelo em memória de load_transactions (Data como datetime64) antes de entrar no cache
+    normalize_transactions(rows)
+    with backend.lock(profile):
+        migrate_profile(profile, backend)
+        before = backend.version(profile)
+        if backend.append(rows, profile):
+            after = backend.version(profile)
+            cache_dados.update_frame(backend.cache_key(profile), before, after,
+                                     lambda df: sort_by_date(concat_transactions([df, rows.reindex(columns=df.columns)])))
+            _notify_write(profile, backend, before, after, rows, rows.iloc[0:0])
+            return
+        # arquivo de versão antiga sem as colunas novas: reescrita completa (uma única vez)
+        df = load_transactions(profile, backend.name)
+        save_transactions(concat_transactions([df, rows]), profile, backend.name)
+
+
+_CONTENT_COLUMNS = [c for c in TRANSACTION_COLUMNS if c != 'ID']
+
+
+def _row_hashes(df):
+    """Hash do conteúdo de cada linha (sem o ID), igual para a mesma transação normalizada ou não."""
+    values = normalize_transactions(df.reindex(columns=TRANSACTION_COLUMNS))[_CONTENT_COLUMNS].astype(object)
+    return pd.util.hash_pandas_object(values.where(values.notna(), None), index=False).to_numpy()
+
+
+def check_unchanged(profile, expected, backend=None):
+    """
+    Levanta persistencia.WriteConflict se alguma das linhas `expected` (com ID, como foram lidas)
+    foi alterada ou excluída desde então. Deve ser chamada com a trava do perfil.
+    """
+    expected = expected[expected['ID'].notna()]
+    if expected.empty:
+        return
+    try:
+        current = load_transactions(profile, backend)
+    except FileNotFoundError:
+        current = empty_transactions()
+    current = current[current['ID'].isin(expected['ID'])].drop_duplicates('ID').set_index('ID')
+    expected = expected.drop_duplicates('ID').set_index('ID')
+    missing = expected.index.difference(current.index)
+    if len(missing):
+        raise persistencia.WriteConflict(f"{len(missing)} transação(ões) de {profile} foram excluídas por outra sessão.")
+    current = current.loc[expected.index]
+    changed = int((_row_hashes(current) != _row_hashes(expected)).sum())
+    if changed:
+        raise persistencia.WriteConflict(f"{changed} transação(ões) de {profile} foram alteradas por outra sessão.")
+
+
+def apply_changes(profile, upserts, deleted_ids, backend=None, expected=None):
+    """
+    Grava só as linhas alteradas do perfil: `upserts` (linhas completas, novas ou editadas,
+    identificadas pela coluna ID; linhas sem ID recebem um novo) e `deleted_ids`.
+    `expected` (opcional): as linhas editadas/excluídas como o usuário as viu; se outra sessão
+    as alterou nesse meio tempo, nada é gravado e persistencia.WriteConflict é levantada.
+    """
+    backend = get_backend(backend)
+    upserts = normalize_transactions(upserts.reindex(columns=TRANSACTION_COLUMNS))
+    ensure_ids(upserts)
+    deleted_ids = [int(i) for i in deleted_ids if pd.notna(i)]
+    if upserts.empty and not deleted_ids:
+        return
+    key = backend.cache_key(profile)
+    with backend.lock(profile):
+        migrate_profile(profile, backend)
+        if expected is not None:
+            check_unchanged(profile, expected, backend.name)
+        before = backend.version(profile)
+        previous = cache_dados.peek(key, before)
+        backend.apply_changes(profile, upserts, deleted_ids)
+        after = backend.version(profile)
+        cache_dados.update_frame(key, before, after, lambda df: apply_changes_to_frame(df, upserts, deleted_ids))
+        removed = None
+        if previous is not None:
+            removed = previous[previous['ID'].isin(upserts['ID']) | previous['ID'].isin(deleted_ids)]
+        _notify_write(profile, backend, before, after, upserts, removed)
+
+
+def editor_changes(df, editor_state):
+    """
+    Traduz o estado do st.data_editor ({'edited_rows', 'added_rows', 'deleted_rows'}, com posições
+    relativas às linhas de `df`) em (upserts, deleted, originals): linhas completas novas/alteradas,
+    linhas removidas e as linhas editadas/removidas como estavam em `df` (para save_changes conferir
+    que ninguém as alterou). `df` deve ser o DataFrame completo (com ID) cujas linhas foram exibidas
+    no editor, na mesma ordem.
+    Se a coluna 'Pessoa' for alterada, a linha original também aparece em `deleted` (troca de perfil).
+    O editor trabalha em reais (display_frame); as linhas devolvidas já estão em centavos.
+    """
+    edited_rows = {int(pos): values for pos, values in editor_state.get('edited_rows', {}).items()}
+    positions = sorted(edited_rows)
+    records = df.iloc[positions].to_dict('records')
+    for record, pos in zip(records, positions):
+        record.update(edited_rows[pos])
+    updated = pd.DataFrame(records, columns=df.columns)
+    added = pd.DataFrame(editor_state.get('added_rows', []), columns=df.columns)
+    if 'ID' in added.columns:
+        added['ID'] = pd.NA
+
+    deleted_positions = sorted(int(p) for p in editor_state.get('deleted_rows', []))
+    moved = [pos for pos in positions if 'Pessoa' in edited_rows[pos] and 'Pessoa' in df.columns
+             and edited_rows[pos]['Pessoa'] != df['Pessoa'].iloc[pos]]
+    deleted = df.iloc[deleted_positions + moved]
+    originals = df.iloc[sorted(set(positions) | set(deleted_positions))]
+    upserts = pd.concat([updated, added], ignore_index=True) if not added.empty else updated
+    return money_from_reais(upserts), money_from_reais(deleted), money_from_reais(originals)
+
+
+def save_changes(upserts, deleted, profile=None, expected=None):
+    """
+    Aplica o resultado de editor_changes. Sem `profile`, as linhas são distribuídas pela coluna 'Pessoa'.
+    Com `expected` (as linhas originais de editor_changes), nada é gravado se outra sessão alterou
+    alguma delas (persistencia.WriteConflict); com vários perfis, todos são travados e conferidos
+    antes da primeira gravação.
+    Retorna o número de linhas ignoradas por não indicarem o perfil.
+    """
+    if profile is not None:
+        apply_changes(profile, upserts, deleted['ID'], expected=expected)
+        return 0
+    skipped = int(upserts['Pessoa'].isna().sum())
+    upserts = upserts[upserts['Pessoa'].notna()]
+    people = [p for p in pd.unique(pd.concat([upserts['Pessoa'], deleted['Pessoa']])) if pd.notna(p)]
+    backend = get_backend()
+    with persistencia.file_locks([backend.lock_path(person) for person in people]):
+        if expected is not None:
+            for person in people:
+                check_unchanged(person, expected[expected['Pessoa'] == person].drop(columns=['Pessoa']), backend.name)
+        for person in people:
+            apply_changes(person, upserts[upserts['Pessoa'] == person].drop(columns=['Pessoa']),
+                          deleted.loc[deleted['Pessoa'] == person, 'ID'], backend.name)
+    return skipped
+
+
+def compact_transactions(profile, backend=None):
+    """Força a compactação do journal do perfil (se o backend tiver um)."""
+    backend = get_backend(backend)
+    key = backend.cache_key(profile)
+    with backend.lock(profile):
+        before = backend.version(profile)
+        compacted = backend.compact(profile)
+        if compacted:
+            # o conteúdo não muda, só a versão: a entrada em cache continua válida
+            after = backend.version(profile)
+            cache_dados.update_frame(key, before, after, lambda df: df)
+            _notify_write(profile, backend, before, after, empty_transactions(), empty_transactions())
+    return compacted
+
+
+def query_transactions(profiles, start=None, end=None, card=None, backend=None):
+    """
+    Transações de `profiles` entre `start` e `end` (inclusivo), opcionalmente de um cartão,
+    com a coluna 'Pessoa' indicando o perfil. Backends com índice (SQLite) leem só as linhas do intervalo.
+    """
+    backend = get_backend(backend)
+    for profile in profiles:
+        migrate_profile(profile, backend)
+    return backend.query(profiles, start, end, card)
+
+
+def data_version(profiles, backend=None):
+    """Versão conjunta dos dados de `profiles` (muda a cada gravação); serve de chave para caches derivados."""
+    backend = get_backend(backend)
+    return tuple((profile, backend.version(profile)) for profile in profiles)
+
+
+def date_bounds(profiles, backend=None):
+    """(menor data, maior data) das transações de `profiles`, ou (None, None) se não houver nenhuma."""
+    backend = get_backend(backend)
+    for profile in profiles:
+        migrate_profile(profile, backend)
+    return backend.date_bounds(profiles)
+
+
+def migrate_profile(profile, backend):
+    """Migra (uma única vez) o CSV do perfil para o backend informado. Retorna True se migrou."""
+    if backend.name == 'csv' or backend.exists(profile):
+        return False
+    csv_backend = CsvBackend()
+    csv_path = csv_backend.path(profile)
+    if not os.path.exists(csv_path):
+        return False
+    with backend.lock(profile):
+        # outra sessão pode ter migrado enquanto esperávamos a trava
+        if backend.exists(profile):
+            return False
+        df = csv_backend.load(profile)
+        ensure_ids(df)
+        backend.save(df, profile)
+    return True
+
+
+def export_csv(profile, path=None, backend=None):
+    """
+    Exporta as transações do perfil no formato CSV original (compatibilidade com
+    planilhas e versões antigas). Sem `path`, devolve o conteúdo CSV como texto.
+    """
+    try:
+        df = load_transactions(profile, backend)
+    except FileNotFoundError:
+        df = empty_transactions()
+    df = _format_for_csv(df)
+    if path is None:
+        return df.to_csv(index=False)
+    df.to_csv(path, index=False)
+    return path
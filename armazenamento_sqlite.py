@@ -0,0 +1,310 @@
+"""
+Backend SQLite (arquivo local, sem servidor) para transações e cadastros.
+
+Ativado com ARMAZENAMENTO=sqlite. Um único banco (DB_FILE) guarda:
+  - transacoes : todas as transações de todos os perfis, com índices por Data, Tipo,
+                 Categoria, Cartao e Grupo (consultas por intervalo leem só as linhas do intervalo)
+  - listas     : listas ordenadas de textos (perfis, categorias de entrada/gasto)
+  - cartoes    : cadastro de cartões
+  - metas      : metas por perfil (JSON)
+  - versoes    : contador de versão por perfil, usado como chave do cache_dados
+  - configuracao: chaves internas, inclusive a versão de cada cadastro ('versao:<nome>')
+
+Toda gravação acontece dentro de uma transação do SQLite (tudo ou nada).
+Na primeira abertura, os arquivos existentes (perfis.txt, cartoes.csv, categorias_*.txt,
+metas.json) são importados; as transações de cada perfil são migradas do CSV na primeira leitura.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import armazenamento
+import persistencia
+
+DB_FILE = os.environ.get("ARMAZENAMENTO_SQLITE_DB", "gerenciamento_custos.db")
+
+# arquivos de texto importados para a tabela `listas` (nome da lista = nome do arquivo sem extensão)
+LIST_FILES = ["perfis.txt", "categorias_entrada.txt", "categorias_gasto.txt"]
+CARDS_FILE = "cartoes.csv"
+GOALS_FILE = "metas.json"
+CARD_COLUMNS = ['Nome', 'Bandeira', 'Dono', 'DiaFechamento', 'DiaVencimento']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transacoes (
+    id INTEGER PRIMARY KEY,
+    perfil TEXT NOT NULL,
+    "Data" TEXT NOT NULL,
+    "Tipo" TEXT,
+    "Categoria" TEXT,
+    "Descrição" TEXT,
+    "Valor" REAL,
+    "PagoComCartao" TEXT,
+    "Cartao" TEXT,
+    "NumParcelas" INTEGER,
+    "ParcelaAtual" INTEGER,
+    "GerouParcelas" TEXT,
+    "TotalCompra" REAL,
+    "Grupo" TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transacoes_perfil_data ON transacoes (perfil, "Data");
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes ("Data");
+CREATE INDEX IF NOT EXISTS idx_transacoes_tipo ON transacoes (perfil, "Tipo", "Data");
+CREATE INDEX IF NOT EXISTS idx_transacoes_categoria ON transacoes (perfil, "Categoria", "Data");
+CREATE INDEX IF NOT EXISTS idx_transacoes_cartao ON transacoes ("Cartao", "Data");
+CREATE INDEX IF NOT EXISTS idx_transacoes_grupo ON transacoes ("Grupo");
+
+CREATE TABLE IF NOT EXISTS versoes (perfil TEXT PRIMARY KEY, versao INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS listas (lista TEXT NOT NULL, ordem INTEGER NOT NULL, valor TEXT NOT NULL,
+                                   PRIMARY KEY (lista, ordem));
+CREATE TABLE IF NOT EXISTS cartoes ("Nome" TEXT PRIMARY KEY, "Bandeira" TEXT, "Dono" TEXT,
+                                    "DiaFechamento" INTEGER, "DiaVencimento" INTEGER);
+CREATE TABLE IF NOT EXISTS metas (perfil TEXT PRIMARY KEY, dados TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS configuracao (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+# a coluna ID das transações é a chave primária `id` da tabela
+_DATA_COLUMNS = [c for c in armazenamento.TRANSACTION_COLUMNS if c != 'ID']
+_COLUMNS_SQL = ", ".join(f'"{c}"' for c in _DATA_COLUMNS)
+_UPSERT_SQL = (f'INSERT OR REPLACE INTO transacoes (id, perfil, {_COLUMNS_SQL}) '
+               f'VALUES (?, ?, {", ".join("?" for _ in _DATA_COLUMNS)})')
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+@contextmanager
+def connect():
+    """
+    Abre uma conexão (uma por operação: seguro entre as threads das sessões do Streamlit)
+    e executa o bloco numa transação: commit ao final, rollback em caso de erro.
+    """
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    # cache de páginas de 64 MB: inserções em lote (importação de extratos) mantêm os índices em memória
+    conn.execute("PRAGMA cache_size = -65536")
+    try:
+        _ensure_schema(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _ensure_schema(conn):
+    if DB_FILE in _initialized:
+        return
+    with _init_lock:
+        if DB_FILE in _initialized:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(SCHEMA)
+        with conn:
+            _import_files_once(conn)
+        _initialized.add(DB_FILE)
+
+
+def _import_files_once(conn):
+    """Importa os cadastros em arquivo para o banco na primeira abertura."""
+    if conn.execute("SELECT 1 FROM configuracao WHERE chave = 'arquivos_importados'").fetchone():
+        return
+    for file_name in LIST_FILES:
+        if os.path.exists(file_name):
+            with open(file_name, 'r', encoding='utf-8') as f:
+                _write_list(conn, os.path.splitext(file_name)[0], [line.strip() for line in f if line.strip()])
+    if os.path.exists(CARDS_FILE):
+        _write_cards(conn, pd.read_csv(CARDS_FILE, dtype={'Nome': str, 'Bandeira': str, 'Dono': str}))
+    if os.path.exists(GOALS_FILE):
+        with open(GOALS_FILE, 'r', encoding='utf-8') as f:
+            _write_goals(conn, json.load(f))
+    conn.execute("INSERT INTO configuracao (chave, valor) VALUES ('arquivos_importados', '1')")
+
+
+def _bump_version(conn, profile):
+    conn.execute("INSERT INTO versoes (perfil, versao) VALUES (?, 1) "
+                 "ON CONFLICT(perfil) DO UPDATE SET versao = versao + 1", (profile,))
+
+
+def _rows_for_insert(df, profile):
+    ids = [int(i) for i in df['ID']]
+    df = armazenamento._format_for_csv(df).reindex(columns=_DATA_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    for col in ('NumParcelas', 'ParcelaAtual'):
+        df[col] = [int(v) if v is not None else None for v in df[col]]
+    return [(row_id, profile) + tuple(row) for row_id, row in zip(ids, df.itertuples(index=False, name=None))]
+
+
+def _read_transactions(conn, where="", params=()):
+    df = pd.read_sql_query(f'SELECT perfil, {_COLUMNS_SQL}, id AS "ID" FROM transacoes {where} ORDER BY "Data", id',
+                           conn, params=params)
+    # colunas só com NULL voltam como object: manter o mesmo modelo numérico dos backends em arquivo
+    for col in ('Valor', 'TotalCompra', 'NumParcelas', 'ParcelaAtual'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    return armazenamento.normalize_transactions(df)
+
+
+class SqliteBackend(armazenamento.CsvBackend):
+    """Transações na tabela `transacoes`, com o mesmo contrato dos backends em arquivo."""
+    name = 'sqlite'
+    extension = '.db'
+
+    def path(self, profile):
+        return DB_FILE
+
+    def cache_key(self, profile):
+        return f"{DB_FILE}#{profile}"
+
+    def lock_path(self, profile):
+        # o banco já grava cada operação numa transação; a trava por perfil só ordena
+        # "versão anterior -> gravação -> versão nova" para o cache e os listeners
+        return f"{DB_FILE}.{profile}"
+
+    def version(self, profile):
+        with connect() as conn:
+            row = conn.execute("SELECT versao FROM versoes WHERE perfil = ?", (profile,)).fetchone()
+        return row[0] if row else None
+
+    def exists(self, profile):
+        return self.version(profile) is not None
+
+    def load(self, profile):
+        with connect() as conn:
+            df = _read_transactions(conn, "WHERE perfil = ?", (profile,))
+        return df.drop(columns=['perfil'])
+
+    def save(self, df, profile):
+        with connect() as conn:
+            conn.execute("DELETE FROM transacoes WHERE perfil = ?", (profile,))
+            conn.executemany(_UPSERT_SQL, _rows_for_insert(df, profile))
+            _bump_version(conn, profile)
+
+    def append(self, rows, profile):
+        with connect() as conn:
+            conn.executemany(_UPSERT_SQL, _rows_for_insert(rows, profile))
+            _bump_version(conn, profile)
+        return True
+
+    def apply_changes(self, profile, upserts, deleted_ids):
+        with connect() as conn:
+            conn.executemany("DELETE FROM transacoes WHERE id = ? AND perfil = ?",
+                             [(int(i), profile) for i in deleted_ids])
+            conn.executemany(_UPSERT_SQL, _rows_for_insert(upserts, profile))
+            _bump_version(conn, profile)
+
+    def compact(self, profile):
+        return False
+
+    def query(self, profiles, start=None, end=None, card=None):
+        profiles = list(dict.fromkeys(profiles))
+        if not profiles:
+            return armazenamento.empty_transactions().assign(Pessoa=pd.Categorical([], categories=profiles))
+        clauses = [f"perfil IN ({', '.join('?' for _ in profiles)})"]
+        params = list(profiles)
+        if start is not None:
+            clauses.append('"Data" >= ?')
+            params.append(pd.to_datetime(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            clauses.append('"Data" <= ?')
+            params.append(pd.to_datetime(end).strftime('%Y-%m-%d'))
+        if card is not None:
+            clauses.append('"Cartao" = ?')
+            params.append(card)
+        with connect() as conn:
+            df = _read_transactions(conn, "WHERE " + " AND ".join(clauses), params)
+        df['perfil'] = pd.Categorical(df['perfil'], categories=profiles)
+        return df.rename(columns={'perfil': 'Pessoa'})[armazenamento.TRANSACTION_COLUMNS + ['Pessoa']]
+
+    def date_bounds(self, profiles):
+        if not profiles:
+            return None, None
+        with connect() as conn:
+            low, high = conn.execute(
+                f'SELECT MIN("Data"), MAX("Data") FROM transacoes WHERE perfil IN ({", ".join("?" for _ in profiles)})',
+                list(profiles)).fetchone()
+        if low is None:
+            return None, None
+        return pd.to_datetime(low).date(), pd.to_datetime(high).date()
+
+
+armazenamento.BACKENDS['sqlite'] = SqliteBackend
+
+
+# --- Cadastros (perfis, categorias, cartões, metas) ---
+def registry_version(name):
+    """Versão do cadastro `name` ('perfis', 'categorias_gasto', 'cartoes', 'metas'); 0 se nunca foi gravado."""
+    with connect() as conn:
+        return _registry_version(conn, name)
+
+
+def _registry_version(conn, name):
+    row = conn.execute("SELECT valor FROM configuracao WHERE chave = ?", (f"versao:{name}",)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _bump_registry_version(conn, name, expected_version=None):
+    """Incrementa a versão do cadastro na transação da gravação (WriteConflict se não for a esperada)."""
+    if expected_version is not None and _registry_version(conn, name) != expected_version:
+        raise persistencia.WriteConflict(f"O cadastro {name} foi alterado por outra sessão.")
+    conn.execute("INSERT INTO configuracao (chave, valor) VALUES (?, '1') "
+                 "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1", (f"versao:{name}",))
+
+
+def _write_list(conn, name, values):
+    conn.execute("DELETE FROM listas WHERE lista = ?", (name,))
+    conn.executemany("INSERT INTO listas (lista, ordem, valor) VALUES (?, ?, ?)",
+                     [(name, i, v) for i, v in enumerate(values)])
+
+
+def load_list(name):
+    """Lista ordenada de textos (ex.: 'perfis', 'categorias_gasto')."""
+    with connect() as conn:
+        return [row[0] for row in conn.execute("SELECT valor FROM listas WHERE lista = ? ORDER BY ordem", (name,))]
+
+
+def save_list(name, values, expected_version=None):
+    with connect() as conn:
+        _bump_registry_version(conn, name, expected_version)
+        _write_list(conn, name, values)
+
+
+def _write_cards(conn, df_cards):
+    df = df_cards.reindex(columns=CARD_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    conn.execute("DELETE FROM cartoes")
+    conn.executemany('INSERT INTO cartoes ("Nome", "Bandeira", "Dono", "DiaFechamento", "DiaVencimento") '
+                     'VALUES (?, ?, ?, ?, ?)',
+                     [(r[0], r[1], r[2], None if r[3] is None else int(r[3]), None if r[4] is None else int(r[4]))
+                      for r in df.itertuples(index=False, name=None)])
+
+
+def load_cards():
+    with connect() as conn:
+        df = pd.read_sql_query('SELECT "Nome", "Bandeira", "Dono", "DiaFechamento", "DiaVencimento" FROM cartoes '
+                               'ORDER BY rowid', conn)
+    return df.astype({'DiaFechamento': 'Int64', 'DiaVencimento': 'Int64'})
+
+
+def save_cards(df_cards, expected_version=None):
+    with connect() as conn:
+        _bump_registry_version(conn, 'cartoes', expected_version)
+        _write_cards(conn, df_cards)
+
+
+def _write_goals(conn, goals):
+    conn.execute("DELETE FROM metas")
+    conn.executemany("INSERT INTO metas (perfil, dados) VALUES (?, ?)",
+                     [(profile, json.dumps(values, ensure_ascii=False)) for profile, values in goals.items()])
+
+
+def load_goals():
+    with connect() as conn:
+        return {profile: json.loads(data) for profile, data in conn.execute("SELECT perfil, dados FROM metas")}
+
+
+def save_goals(goals, expected_version=None):
+    with connect() as conn:
+        _bump_registry_version(conn, 'metas', expected_version)
+        _write_goals(conn, goals)
@@ -0,0 +1,197 @@
+"""
+Benchmark dos caminhos quentes do app com dados sintéticos (benchmarks/dados_sinteticos.py).
+
+    python -m benchmarks.cenarios [--linhas 10000,100000,1000000] [--perfis 2] [--backend parquet]
+                                  [--repeticoes 3] [--json resultado.json] [--base anterior.json]
+
+Para cada tamanho os dados são gerados num diretório temporário e cada cenário é medido
+em tempo (melhor de --repeticoes) e pico de memória alocada (tracemalloc, numa execução
+separada para não distorcer o tempo; conta as alocações do Python/NumPy/pandas, não os
+buffers internos do Arrow). Com --base, compara com um resultado anterior e
+termina com código 1 se algum cenário ficar mais lento que a tolerância (--tolerancia).
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+import armazenamento
+import busca
+import cache_dados
+import parcelas
+import previsao
+import resumos
+from benchmarks import dados_sinteticos
+
+
+def _purchase(profile_end):
+    """Uma compra de 12 parcelas, como o formulário de add_transaction envia."""
+    return {'Data': [profile_end], 'Tipo': ['Gasto'], 'Categoria': ['Lazer'], 'Descrição': ['Notebook'],
+            'Valor': [4800.0], 'PagoComCartao': [True], 'Cartao': ['Nubank'], 'NumParcelas': [12],
+            'ParcelaAtual': [1], 'GerarParcelas': [True]}
+
+
+SESSIONS = 8
+
+
+def scenarios(profiles, backend):
+    """Lista de (nome, preparação, execução). A preparação não entra na medição."""
+    first = profiles[0]
+    min_date, max_date = armazenamento.date_bounds(profiles, backend)
+    last_year = max_date - pd.DateOffset(years=1)
+
+    def cold():
+        cache_dados.invalidate()
+
+    def warm():
+        armazenamento.load_transactions(first, backend)
+
+    def load():
+        return armazenamento.load_transactions(first, backend)
+
+    def save():
+        armazenamento.save_transactions(armazenamento.load_transactions(first, backend), first, backend)
+
+    def add_installments():
+        rows = parcelas.generate_transactions(_purchase(max_date))
+        armazenamento.append_transactions(rows, first, backend)
+
+    def filter_period():
+        return armazenamento.query_transactions([first], last_year, max_date, backend=backend)
+
+    def monthly_cold():
+        return resumos.monthly_summary(resumos.summary_for_window([first], min_date, max_date, backend=backend))
+
+    def monthly_warm():
+        return resumos.monthly_summary(resumos.summary_for_window([first], last_year, max_date, backend=backend))
+
+    def consolidated():
+        return armazenamento.query_transactions(profiles, min_date, max_date, backend=backend)
+
+    def warm_all():
+        for profile in profiles:
+            armazenamento.load_transactions(profile, backend)
+
+    def forecast():
+        return previsao.forecast(profiles, previsao.MAX_MONTHS, backend=backend)
+
+    def search():
+        # texto sem acento achando "Farmácia", com um filtro de faceta: resultados e contagens
+        return busca.search(profiles, 'farmacia', {'Tipo': ['Gasto']}, backend=backend)
+
+    def sessions():
+        # várias sessões abrindo o mesmo perfil ao mesmo tempo: uma única carga, compartilhada
+        threads = [threading.Thread(target=load) for _ in range(SESSIONS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return [
+        ('load_data (frio)', cold, load),
+        ('load_data (cache)', warm, load),
+        ('save_data (reescrita)', warm, save),
+        ('add_transaction 12x', warm, add_installments),
+        ('filtro de período (1 ano)', warm, filter_period),
+        ('resumo mensal (frio)', cold, monthly_cold),
+        ('resumo mensal (incremental)', warm, monthly_warm),
+        ('visão consolidada', warm_all, consolidated),
+        (f'load_data ({SESSIONS} sessões, frio)', cold, sessions),
+        (f'previsão {previsao.MAX_MONTHS} meses (todos os perfis, frio)', cold, forecast),
+        (f'previsão {previsao.MAX_MONTHS} meses (todos os perfis, cache)', forecast, forecast),
+        ('busca texto + facetas (todos os perfis, frio)', cold, search),
+        ('busca texto + facetas (todos os perfis, cache)', search, search),
+    ]
+
+
+def measure(setup, func, repeats):
+    """(melhor tempo em s, pico de memória alocada em MB)."""
+    best = float('inf')
+    for _ in range(repeats):
+        setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    setup()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def run(sizes, n_profiles=2, backend=None, repeats=3, years=5):
+    results = []
+    backend = backend or armazenamento.default_backend_name()
+    cwd = os.getcwd()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                cache_dados.invalidate()
+                frames = dados_sinteticos.generate(size, n_profiles, years)
+                dados_sinteticos.write(frames, backend)
+                rows = sum(len(df) for df in frames.values())
+                profiles = list(frames)
+                del frames
+                for name, setup, func in scenarios(profiles, backend):
+                    seconds, peak_mb = measure(setup, func, repeats)
+                    results.append({'linhas': size, 'linhas_geradas': rows, 'backend': backend, 'cenario': name,
+                                    'segundos': round(seconds, 4), 'pico_mb': round(peak_mb, 1)})
+                    print(f"{size:>9} {backend:>8}  {name:<30} {seconds * 1000:10.1f} ms {peak_mb:9.1f} MB", flush=True)
+            finally:
+                os.chdir(cwd)
+                cache_dados.invalidate()
+    return results
+
+
+def compare(results, base, tolerance):
+    """Cenários mais lentos que a base além da tolerância (fração). Retorna a lista de regressões."""
+    previous = {(r['linhas'], r['backend'], r['cenario']): r['segundos'] for r in base}
+    regressions = []
+    for r in results:
+        before = previous.get((r['linhas'], r['backend'], r['cenario']))
+        # abaixo de 5 ms o ruído domina
+        if before and r['segundos'] > before * (1 + tolerance) and r['segundos'] - before > 0.005:
+            regressions.append((r, before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', default='10000,100000,1000000', help='tamanhos separados por vírgula')
+    parser.add_argument('--perfis', type=int, default=2)
+    parser.add_argument('--anos', type=int, default=5)
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--json', help='grava os resultados neste arquivo')
+    parser.add_argument('--base', help='resultado anterior (JSON) para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='regressão tolerada (fração; padrão 0.25)')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.linhas.split(',') if s.strip()]
+    results = run(sizes, args.perfis, args.backend, args.repeticoes, args.anos)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.base:
+        with open(args.base, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerancia)
+        for r, before in regressions:
+            print(f"REGRESSÃO: {r['cenario']} ({r['linhas']} linhas, {r['backend']}): "
+                  f"{before * 1000:.1f} ms -> {r['segundos'] * 1000:.1f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Teste de estresse de gravações concorrentes: vários processos (cada um com várias threads,
+como sessões do Streamlit) gravando ao mesmo tempo o mesmo perfil e os mesmos cadastros.
+
+    python -m benchmarks.concorrencia [--processos 4] [--threads 2] [--operacoes 60] [--backend csv|parquet|sqlite]
+
+Cada gravador acrescenta linhas, edita e exclui as suas, incrementa um contador compartilhado
+(uma transação cujo Valor todos somam com verificação otimista, refazendo em caso de WriteConflict),
+compacta o journal e altera metas, cartões e categorias via cadastros.update_*.
+No fim tudo é relido do disco e conferido: nenhuma linha perdida ou duplicada, contador igual ao
+número de incrementos aceitos, cadastros com a última gravação de cada gravador e nenhum
+arquivo temporário esquecido. Termina com código 1 se algo não confere.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+PROFILE = "Familia"
+HOT_DESCRIPTION = "contador compartilhado"
+CATEGORIES_DEFAULT = ["Outros Gastos"]
+
+
+def _row(description):
+    return pd.DataFrame({'Data': [pd.Timestamp('2025-01-01')], 'Tipo': ['Gasto'], 'Categoria': ['Outros Gastos'],
+                         'Descrição': [description], 'Valor': [1.0]})
+
+
+def _increment_hot(armazenamento, persistencia, hot_id):
+    """Soma 1 centavo ao contador compartilhado; retorna quantas tentativas esbarraram em outra sessão."""
+    conflicts = 0
+    while True:
+        df = armazenamento.load_transactions(PROFILE)
+        seen = df[df['ID'] == hot_id]
+        changed = seen.assign(Valor=seen['Valor'] + 1)
+        try:
+            armazenamento.apply_changes(PROFILE, changed, [], expected=seen)
+            return conflicts
+        except persistencia.WriteConflict:
+            conflicts += 1
+
+
+def _writer(name, operations, hot_id, result):
+    import armazenamento
+    import cadastros
+    import persistencia
+
+    live = []       # descrições das linhas deste gravador ainda existentes (na ordem de inserção)
+    stats = Counter()
+    for i in range(operations):
+        description = f"{name}-{i}"
+        rows = _row(description)
+        armazenamento.append_transactions(rows, PROFILE)
+        live.append(description)
+        stats['appends'] += 1
+        if i % 3 == 0:
+            stats['conflitos'] += _increment_hot(armazenamento, persistencia, hot_id)
+            stats['incrementos'] += 1
+        if i % 5 == 4 and len(live) >= 2:
+            # edita a penúltima linha própria (marca com '*')
+            df = armazenamento.load_transactions(PROFILE)
+            seen = df[df['Descrição'] == live[-2]]
+            armazenamento.apply_changes(PROFILE, seen.assign(**{'Descrição': live[-2] + '*'}), [], expected=seen)
+            live[-2] += '*'
+            stats['edicoes'] += 1
+        if i % 7 == 6 and live:
+            df = armazenamento.load_transactions(PROFILE)
+            seen = df[df['Descrição'] == live[0]]
+            armazenamento.apply_changes(PROFILE, seen.iloc[0:0], seen['ID'], expected=seen)
+            live.pop(0)
+            stats['exclusoes'] += 1
+        if i % 11 == 10:
+            armazenamento.compact_transactions(PROFILE)
+            stats['compactacoes'] += 1
+        if i % 4 == 0:
+            cadastros.update_goals(lambda goals: {**goals, name: {'meta_gasto': float(i), 'meta_sobra_percent': 10.0}})
+            stats['metas'] += 1
+        if i % 6 == 0:
+            card = {'Nome': f"C-{name}-{i}", 'Bandeira': 'Visa', 'Dono': PROFILE, 'DiaFechamento': 1, 'DiaVencimento': 10}
+            cadastros.update_cards(lambda cards: pd.concat([cards, pd.DataFrame([card])], ignore_index=True))
+            stats['cartoes'] += 1
+        if i % 8 == 0:
+            cadastros.update_categories(cadastros.CATEGORIES_GASTO_FILE, CATEGORIES_DEFAULT,
+                                        lambda categories: categories + [f"cat-{name}-{i}"])
+            stats['categorias'] += 1
+    result.update({'nome': name, 'linhas': live, 'ultima_meta': float(operations - 1 - (operations - 1) % 4),
+                   'estatisticas': dict(stats)})
+
+
+def _process(directory, backend, process, threads, operations, hot_id, queue):
+    os.chdir(directory)
+    os.environ['ARMAZENAMENTO'] = backend
+    results = [{} for _ in range(threads)]
+    workers = [threading.Thread(target=_writer, args=(f"p{process}t{t}", operations, hot_id, results[t]))
+               for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    queue.put(results)
+
+
+def verify(results):
+    """Relê tudo do disco e devolve a lista de problemas encontrados (vazia = tudo certo)."""
+    import armazenamento
+    import cache_dados
+    import cadastros
+
+    cache_dados.invalidate()
+    problems = []
+    df = armazenamento.load_transactions(PROFILE)
+    counts = Counter(df['Descrição'].tolist())
+    expected = Counter(d for r in results for d in r['linhas'])
+    expected[HOT_DESCRIPTION] = 1
+    lost = expected - counts
+    extra = counts - expected
+    if lost:
+        problems.append(f"{sum(lost.values())} linha(s) perdida(s), ex.: {list(lost)[:5]}")
+    if extra:
+        problems.append(f"{sum(extra.values())} linha(s) a mais (duplicadas ou não excluídas), ex.: {list(extra)[:5]}")
+    if df['ID'].duplicated().any():
+        problems.append("IDs duplicados")
+    increments = sum(r['estatisticas'].get('incrementos', 0) for r in results)
+    hot = df.loc[df['Descrição'] == HOT_DESCRIPTION, 'Valor']
+    if len(hot) != 1 or int(hot.iloc[0]) != increments:
+        problems.append(f"contador = {hot.tolist()} centavos, esperado {increments}")
+
+    goals = cadastros.load_goals()
+    for r in results:
+        if goals.get(r['nome'], {}).get('meta_gasto') != r['ultima_meta']:
+            problems.append(f"meta de {r['nome']} = {goals.get(r['nome'])}, esperado meta_gasto {r['ultima_meta']}")
+    cards = Counter(cadastros.load_cards()['Nome'])
+    expected_cards = sum(r['estatisticas'].get('cartoes', 0) for r in results)
+    if sum(cards.values()) != expected_cards or any(n > 1 for n in cards.values()):
+        problems.append(f"{sum(cards.values())} cartão(ões) gravado(s), esperado {expected_cards} distintos")
+    categories = cadastros.load_categories_from_file(cadastros.CATEGORIES_GASTO_FILE, CATEGORIES_DEFAULT)
+    expected_categories = sum(r['estatisticas'].get('categorias', 0) for r in results) + len(CATEGORIES_DEFAULT)
+    if len(categories) != expected_categories or len(set(categories)) != len(categories):
+        problems.append(f"{len(categories)} categoria(s) gravada(s), esperado {expected_categories} distintas")
+    leftovers = glob.glob(".*.tmp") + glob.glob("*.tmp")
+    if leftovers:
+        problems.append(f"arquivos temporários esquecidos: {leftovers}")
+    return problems
+
+
+def run(processes=4, threads=2, operations=60, backend=None):
+    import armazenamento
+    import cache_dados
+
+    backend = backend or armazenamento.default_backend_name()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.environ['ARMAZENAMENTO'] = backend
+        try:
+            cache_dados.invalidate()
+            hot = _row(HOT_DESCRIPTION).assign(Valor=0.0)
+            armazenamento.save_transactions(hot, PROFILE, backend)
+            hot_id = int(armazenamento.load_transactions(PROFILE, backend)['ID'].iloc[0])
+
+            context = multiprocessing.get_context('spawn')
+            queue = context.Queue()
+            workers = [context.Process(target=_process, args=(tmp, backend, p, threads, operations, hot_id, queue))
+                       for p in range(processes)]
+            start = time.perf_counter()
+            for w in workers:
+                w.start()
+            results = [r for _ in workers for r in queue.get()]
+            for w in workers:
+                w.join()
+            elapsed = time.perf_counter() - start
+            failed = [w.exitcode for w in workers if w.exitcode]
+            problems = ([f"{len(failed)} processo(s) terminaram com erro"] if failed else []) + verify(results)
+        finally:
+            os.chdir(cwd)
+            cache_dados.invalidate()
+    totals = Counter()
+    for r in results:
+        totals.update(r['estatisticas'])
+    return elapsed, totals, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=2, help='gravadores (sessões) por processo')
+    parser.add_argument('--operacoes', type=int, default=60, help='iterações de cada gravador')
+    parser.add_argument('--backend', default=None)
+    args = parser.parse_args(argv)
+
+    elapsed, totals, problems = run(args.processos, args.threads, args.operacoes, args.backend)
+    writes = sum(v for k, v in totals.items() if k != 'conflitos')
+    print(f"{args.processos * args.threads} gravadores, {writes} gravações em {elapsed:.1f} s "
+          f"({writes / elapsed:.0f}/s); {totals['conflitos']} conflito(s) detectado(s) e refeito(s)")
+    print("  " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+    for problem in problems:
+        print(f"FALHA: {problem}")
+    if not problems:
+        print("OK: nenhuma gravação perdida")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
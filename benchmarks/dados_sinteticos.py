@@ -0,0 +1,122 @@
+"""
+Gerador de dados sintéticos de uma família, no mesmo formato que add_transaction grava.
+
+    python -m benchmarks.dados_sinteticos --linhas 100000 [--perfis 3] [--anos 5]
+                                          [--cartao 0.4] [--destino DIR] [--backend csv|parquet|sqlite]
+
+Cada perfil recebe salário mensal, entradas avulsas e gastos distribuídos pelas categorias
+padrão; uma fração dos gastos (--cartao) é paga com cartão, parte dela parcelada segundo
+INSTALLMENT_MIX, com as parcelas futuras geradas pelo mesmo motor (parcelas.py) do app.
+O número de linhas final fica próximo de --linhas (as parcelas geradas entram na conta).
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import parcelas
+
+EXPENSE_CATEGORIES = ["Aluguel", "Alimentação", "Combustível", "Água", "Luz", "Gás", "Condomínio",
+                      "Lazer", "Investimentos", "Outros Gastos"]
+EXPENSE_WEIGHTS = [0.04, 0.30, 0.12, 0.03, 0.03, 0.02, 0.03, 0.18, 0.05, 0.20]
+INCOME_CATEGORIES = ["Salário", "Outras Entradas"]
+MERCHANTS = ["Mercado Central", "Padaria Pão Quente", "Posto Shell", "Farmácia São João", "Restaurante Sabor",
+             "Loja Americanas", "Magazine", "Cinema Multiplex", "Uber", "iFood", "Amazon", "Mercado Livre",
+             "Academia", "Pet Shop", "Livraria Cultura", "Açougue Boi Bom"]
+# número de parcelas -> proporção das compras no cartão
+INSTALLMENT_MIX = {1: 0.55, 2: 0.08, 3: 0.12, 4: 0.04, 6: 0.08, 10: 0.08, 12: 0.05}
+CARDS = ["Nubank", "Itaú Visa", "Inter"]
+
+
+def expected_rows_per_purchase(card_share, installment_mix=INSTALLMENT_MIX):
+    """Linhas geradas em média por compra (compras parceladas geram N linhas)."""
+    counts = np.array(list(installment_mix), dtype='float64')
+    weights = np.array(list(installment_mix.values()), dtype='float64')
+    mean_rows = float((counts * weights).sum() / weights.sum())
+    return 1 + card_share * (mean_rows - 1)
+
+
+def generate_profile(n_rows, years=3, card_share=0.4, installment_mix=INSTALLMENT_MIX, end=None, rng=None):
+    """Transações (sem ID) de um perfil com aproximadamente `n_rows` linhas ao longo de `years` anos."""
+    rng = rng if rng is not None else np.random.default_rng()
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    start = end - pd.DateOffset(years=years)
+    months = pd.date_range(start, end, freq='MS')
+    n_days = (end - start).days
+
+    # salário todo dia 5 + entradas avulsas (~3% das linhas)
+    salaries = pd.DataFrame({'Data': months + pd.Timedelta(days=4), 'Tipo': 'Entrada', 'Categoria': 'Salário',
+                             'Descrição': 'Salário', 'Valor': np.round(rng.normal(6000, 300, len(months)), 2)})
+    n_other = max(0, int(n_rows * 0.03))
+    other = pd.DataFrame({'Data': start + pd.to_timedelta(rng.integers(0, n_days, n_other), 'D'), 'Tipo': 'Entrada',
+                          'Categoria': 'Outras Entradas', 'Descrição': 'Pix recebido',
+                          'Valor': np.round(rng.gamma(2.0, 150.0, n_other), 2)})
+
+    remaining = max(0, n_rows - len(salaries) - n_other)
+    n_purchases = int(round(remaining / expected_rows_per_purchase(card_share, installment_mix)))
+    on_card = rng.random(n_purchases) < card_share
+    counts = np.array(list(installment_mix))
+    weights = np.array(list(installment_mix.values()), dtype='float64')
+    n_installments = np.where(on_card, rng.choice(counts, n_purchases, p=weights / weights.sum()), 1)
+    # compras parceladas costumam ser maiores
+    values = np.round(rng.lognormal(4.0, 1.0, n_purchases) * np.where(n_installments > 1, 6, 1), 2)
+    merchants = np.array(MERCHANTS, dtype=object)[rng.integers(0, len(MERCHANTS), n_purchases)]
+    purchases = pd.DataFrame({
+        'Data': start + pd.to_timedelta(rng.integers(0, n_days, n_purchases), 'D'),
+        'Tipo': 'Gasto',
+        'Categoria': rng.choice(EXPENSE_CATEGORIES, n_purchases, p=EXPENSE_WEIGHTS),
+        'Descrição': merchants,
+        'Valor': np.maximum(values, 1.0),
+        'PagoComCartao': on_card,
+        'Cartao': np.where(on_card, np.array(CARDS, dtype=object)[rng.integers(0, len(CARDS), n_purchases)], None),
+        'NumParcelas': np.where(on_card, n_installments, np.nan),
+        'ParcelaAtual': np.where(on_card, 1, np.nan),
+        'GerarParcelas': n_installments > 1,
+    })
+    frames = [parcelas.generate_transactions(purchases),
+              parcelas.generate_transactions(salaries), parcelas.generate_transactions(other)]
+    df = armazenamento.concat_transactions([f for f in frames if not f.empty])
+    return armazenamento.sort_by_date(df).reset_index(drop=True)
+
+
+def generate(n_rows, n_profiles=2, years=3, card_share=0.4, installment_mix=INSTALLMENT_MIX, seed=0, end=None):
+    """{perfil: transações} somando aproximadamente `n_rows` linhas, divididas igualmente entre os perfis."""
+    rng = np.random.default_rng(seed)
+    per_profile = max(1, n_rows // n_profiles)
+    return {f"Perfil{i + 1}": generate_profile(per_profile, years, card_share, installment_mix, end, rng)
+            for i in range(n_profiles)}
+
+
+def write(frames, backend=None):
+    """Grava cada perfil pelo backend indicado (no diretório de trabalho atual) e atualiza perfis.txt."""
+    for profile, df in frames.items():
+        armazenamento.save_transactions(df, profile, backend)
+    with open("perfis.txt", 'w', encoding='utf-8') as f:
+        f.writelines(f"{profile}\n" for profile in frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--perfis', type=int, default=2)
+    parser.add_argument('--anos', type=int, default=3)
+    parser.add_argument('--cartao', type=float, default=0.4, help='fração dos gastos pagos com cartão')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--destino', default='.', help='diretório onde os arquivos são gravados')
+    parser.add_argument('--backend', default=None)
+    args = parser.parse_args(argv)
+
+    frames = generate(args.linhas, args.perfis, args.anos, args.cartao, seed=args.semente)
+    os.makedirs(args.destino, exist_ok=True)
+    os.chdir(args.destino)
+    write(frames, args.backend)
+    total = sum(len(df) for df in frames.values())
+    print(f"{total} linhas em {len(frames)} perfis gravadas em {os.getcwd()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark de inicialização: tempo até a tela de login, em processos Python novos (frio).
+
+    python -m benchmarks.inicializacao [--execucoes 5] [--comparar REVISAO_GIT]
+
+Cada execução importa o Streamlit (custo fixo, medido à parte) e roda gerenciamento_custos.py
+em modo "bare" até desenhar o formulário de login, informando também se pandas e Plotly foram
+importados nesse caminho. Com --comparar, a mesma medição é feita numa cópia da revisão indicada
+(ex.: HEAD~1) para comparar antes/depois.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# executado em um processo novo: cwd = diretório do app
+_PROBE = r"""
+import json, logging, runpy, sys, time
+logging.disable(logging.WARNING)  # avisos de "bare mode" do Streamlit
+t0 = time.perf_counter()
+import streamlit
+t1 = time.perf_counter()
+runpy.run_path('gerenciamento_custos.py', run_name='__main__')
+t2 = time.perf_counter()
+print(json.dumps({'streamlit': t1 - t0, 'login': t2 - t1,
+                  'pandas': 'pandas' in sys.modules, 'plotly': 'plotly.express' in sys.modules}))
+"""
+
+
+def measure(app_dir, runs):
+    """Mediana (em segundos) de `runs` execuções a frio, mais os módulos pesados importados."""
+    results = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE], cwd=app_dir, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        'streamlit_s': round(statistics.median(r['streamlit'] for r in results), 3),
+        'ate_login_s': round(statistics.median(r['login'] for r in results), 3),
+        'importa_pandas': results[-1]['pandas'],
+        'importa_plotly': results[-1]['plotly'],
+    }
+
+
+def checkout(revision, target):
+    """Extrai a árvore de `revision` (git archive) em `target`."""
+    archive = subprocess.run(['git', '-C', ROOT, 'archive', revision], capture_output=True, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', target], input=archive, check=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--execucoes', type=int, default=5)
+    parser.add_argument('--comparar', help='revisão git para medir junto (antes/depois)')
+    args = parser.parse_args(argv)
+
+    rows = {'atual': measure(ROOT, args.execucoes)}
+    if args.comparar:
+        with tempfile.TemporaryDirectory() as tmp:
+            checkout(args.comparar, tmp)
+            rows[args.comparar] = measure(tmp, args.execucoes)
+    for name, row in rows.items():
+        print(f"{name:>12}: até o login {row['ate_login_s'] * 1000:7.1f} ms "
+              f"(+ import streamlit {row['streamlit_s'] * 1000:.0f} ms) | "
+              f"pandas={'sim' if row['importa_pandas'] else 'não'} plotly={'sim' if row['importa_plotly'] else 'não'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Busca textual e por facetas nas descrições das transações.
+
+Para cada perfil é mantido um índice invertido IndiceBusca:
+  - descricoes: as descrições distintas do perfil, sem o sufixo " (k/N)" das parcelas
+    (as parcelas de uma compra viram uma descrição só); o código de cada uma é a posição;
+  - termos: pares (Termo, Descricao) ordenados por Termo, onde Termo é cada palavra da descrição
+    em minúsculas e sem acentos ("Farmácia São João" -> farmacia, sao, joao);
+  - linhas: o código da descrição de cada transação, na ordem das transações em memória.
+Uma busca procura cada palavra pedida como prefixo dos termos (busca binária em `termos`),
+marca as descrições que têm todas as palavras e, com um único acesso indexado em `linhas`,
+obtém as transações. O custo por transação é o de ler um inteiro: milissegundos em 1 milhão de linhas.
+
+Facetas (Categoria, Cartao, Tipo e Pessoa) filtram pelos códigos das colunas categóricas e são
+contadas com bincount; a contagem de cada faceta considera todos os outros filtros, menos o dela
+(mostra quantas transações cada opção traria).
+
+O índice é montado na primeira busca do perfil e guardado no cache_dados. Novas transações
+(append_transactions) entram no índice sem remontá-lo; edições e exclusões o descartam.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cache_dados
+import paginacao
+import parcelas
+
+IndiceBusca = namedtuple('IndiceBusca', ['descricoes', 'termos', 'linhas'])
+ResultadoBusca = namedtuple('ResultadoBusca', ['linhas', 'total', 'facetas'])
+
+FACETS = ['Categoria', 'Cartao', 'Tipo', 'Pessoa']
+NO_VALUE = "(vazio)"  # rótulo da faceta para transações sem valor na coluna (ex.: sem cartão)
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(text):
+    """Minúsculas, sem acentos (ç -> c, ã -> a, ...)."""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Palavras (letras e dígitos) do texto normalizado."""
+    return _WORD.findall(normalize_text(text))
+
+
+def _empty_index():
+    return IndiceBusca(pd.Series([], dtype=object),
+                       pd.DataFrame({'Termo': pd.Series(dtype=object), 'Descricao': pd.Series(dtype='int64')}),
+                       pd.Series([], dtype='int32'))
+
+
+def _terms(descriptions, first_code=0):
+    """Pares (Termo, Descricao) das descrições, com códigos a partir de `first_code`, ordenados por Termo."""
+    pairs = [(term, code) for code, text in enumerate(descriptions, first_code)
+             for term in set(tokenize(text)) if isinstance(text, str)]
+    terms = pd.DataFrame(pairs, columns=['Termo', 'Descricao']).astype({'Termo': object, 'Descricao': 'int64'})
+    return terms.sort_values('Termo', kind='stable', ignore_index=True)
+
+
+def build_index(df):
+    """Índice invertido das descrições de `df` (transações do perfil, ordenadas por Data)."""
+    if df is None or df.empty:
+        return _empty_index()
+    # o sufixo é retirado e as palavras extraídas só das descrições distintas (compras repetidas e
+    # parcelas compartilham o texto); depois as descrições "X (k/N)" de todos os k são unidas em "X"
+    codes, raw = pd.factorize(df['Descrição'], use_na_sentinel=False)
+    stripped, uniques = pd.factorize(parcelas.strip_suffix(np.asarray(raw, dtype=object)), use_na_sentinel=False)
+    descriptions = pd.Series(np.asarray(uniques, dtype=object))
+    return IndiceBusca(descriptions, _terms(descriptions), pd.Series(stripped[codes].astype(np.int32)))
+
+
+def apply_insert(index, df, added):
+    """
+    Índice atualizado após acrescentar `added` às transações (`df` já ordenado, com as linhas novas).
+    Retorna None quando não dá para atualizar (o índice deve ser remontado).
+    """
+    if added.empty:
+        return index
+    descriptions, terms, rows = index
+    positions = armazenamento.inserted_positions(df, added)
+    if positions is None or len(rows) + len(added) != len(df):
+        return None
+    texts = parcelas.strip_suffix(df['Descrição'].iloc[positions].astype(object)).to_numpy(dtype=object)
+    codes = pd.Index(descriptions).get_indexer(texts)
+    new = pd.unique(texts[codes < 0])
+    if len(new):
+        codes[codes < 0] = len(descriptions) + pd.Index(new).get_indexer(texts[codes < 0])
+        new_terms = _terms(new, len(descriptions))
+        # intercala os termos novos (poucos) na lista ordenada, sem reordenar tudo
+        at = terms['Termo'].to_numpy().searchsorted(new_terms['Termo'].to_numpy(), 'right')
+        terms = pd.DataFrame({'Termo': np.insert(terms['Termo'].to_numpy(), at, new_terms['Termo'].to_numpy()),
+                              'Descricao': np.insert(terms['Descricao'].to_numpy(), at, new_terms['Descricao'].to_numpy())})
+        descriptions = pd.concat([descriptions, pd.Series(new, dtype=object)], ignore_index=True)
+    # linhas existentes na mesma ordem, com as novas nas posições em que entraram
+    inserted = np.zeros(len(df), dtype=bool)
+    inserted[positions] = True
+    merged = np.empty(len(df), dtype=np.int32)
+    merged[positions] = codes
+    merged[~inserted] = rows.to_numpy()
+    return IndiceBusca(descriptions, terms, pd.Series(merged))
+
+
+def _index_key(backend, profile):
+    return f"{backend.cache_key(profile)}#busca"
+
+
+def load_index(profile, backend=None):
+    """Índice de busca do perfil (montado a partir do histórico só quando não está em cache)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return _empty_index()
+
+    def build():
+        return build_index(armazenamento.load_transactions(profile, backend.name))
+    return cache_dados.get_versioned(_index_key(backend, profile), version, build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    key = _index_key(backend, profile)
+    # edições e exclusões podem mudar descrições e posições: remonta no próximo acesso
+    if added is None or removed is None or not removed.empty:
+        cache_dados.invalidate(key)
+        return
+    index = cache_dados.peek(key, previous_version)
+    df = cache_dados.peek(backend.cache_key(profile), new_version)
+    updated = None if index is None or df is None else apply_insert(index, df, added)
+    if updated is None:
+        cache_dados.invalidate(key)
+        return
+    cache_dados.update_frame(key, previous_version, new_version, lambda _: updated)
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def matching_descriptions(index, text):
+    """Máscara das descrições do índice que contêm (como prefixo de alguma palavra) todas as palavras de `text`."""
+    descriptions, terms, _ = index
+    found = np.ones(len(descriptions), dtype=bool)
+    vocabulary = terms['Termo'].to_numpy()
+    for word in set(tokenize(text)):
+        # termos com o prefixo `word` ficam contíguos na lista ordenada
+        low = vocabulary.searchsorted(word, 'left')
+        high = vocabulary.searchsorted(word + '￿', 'left')
+        has_word = np.zeros(len(descriptions), dtype=bool)
+        has_word[terms['Descricao'].to_numpy()[low:high]] = True
+        found &= has_word
+    return found
+
+
+def _codes(column):
+    """
+    Códigos e rótulos de uma coluna categórica. O código -1 (sem valor) indexa o último rótulo,
+    NO_VALUE: tabelas indexadas pelos códigos não precisam de deslocamento (nem de cópia da coluna).
+    """
+    values = column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype('category')
+    labels = np.append(values.cat.categories.astype(object).to_numpy(), NO_VALUE)
+    return values.cat.codes.to_numpy(), labels
+
+
+def _profile_search(profile, index, df, text, filters, start, end):
+    """
+    Máscaras de um perfil no período: (início e fim do período, máscara do texto,
+    {faceta: (máscara do filtro, códigos, rótulos)}); máscara None = todas as linhas do período.
+    Pessoa não tem códigos: todas as linhas são do perfil, e o filtro aceita ou recusa o perfil inteiro.
+    """
+    dates = df['Data'].to_numpy()
+    low = 0 if start is None else dates.searchsorted(pd.Timestamp(start).normalize().to_datetime64().astype(dates.dtype))
+    high = len(df) if end is None else dates.searchsorted(
+        pd.Timestamp(end).normalize().to_datetime64().astype(dates.dtype), 'right')
+    text_mask = matching_descriptions(index, text)[index.linhas.to_numpy()[low:high]] if tokenize(text) else None
+    facets = {}
+    for facet in FACETS:
+        selected = filters.get(facet)
+        if facet == 'Pessoa':
+            excluded = selected and profile not in selected
+            facets[facet] = (np.zeros(high - low, dtype=bool) if excluded else None, None, np.array([profile], dtype=object))
+            continue
+        codes, labels = _codes(df[facet].iloc[low:high])
+        facets[facet] = (np.isin(labels, list(selected))[codes] if selected else None, codes, labels)
+    return low, high, text_mask, facets
+
+
+def _combine(masks):
+    """E lógico das máscaras (None = todas as linhas)."""
+    combined = None
+    for mask in masks:
+        if mask is not None:
+            combined = mask if combined is None else combined & mask
+    return combined
+
+
+def _count(codes, labels, mask, size):
+    """Número de linhas de `mask` (de `size` linhas) por rótulo."""
+    if codes is None:
+        return np.array([size if mask is None else np.count_nonzero(mask)])
+    selected = codes if mask is None else codes[mask]
+    return np.bincount(selected % len(labels), minlength=len(labels))
+
+
+def _load(profile, backend):
+    index = load_index(profile, backend)
+    try:
+        df = armazenamento.load_transactions(profile, backend)
+    except FileNotFoundError:
+        # perfil ainda sem transações
+        return index, armazenamento.empty_transactions()
+    if len(index.linhas) != len(df):
+        # gravação entre as duas leituras: índice montado a partir deste mesmo frame
+        index = build_index(df)
+    return index, df
+
+
+def _most_recent(loaded, found, limit):
+    """Das posições encontradas em cada perfil, as que estão entre as `limit` mais recentes de todos."""
+    # linhas em ordem de data: as mais recentes de cada perfil são as últimas
+    candidates = [positions[len(positions) - min(limit, len(positions)):] for positions in found]
+    dates = np.concatenate([np.empty(0, dtype='datetime64[ns]')] +
+                           [df['Data'].to_numpy()[positions].astype('datetime64[ns]')
+                            for (_, df), positions in zip(loaded, candidates)])
+    owner = np.repeat(np.arange(len(candidates)), [len(positions) for positions in candidates])
+    chosen = np.bincount(owner[np.argsort(dates, kind='stable')[len(dates) - min(limit, len(dates)):]],
+                         minlength=len(candidates))
+    return [positions[len(positions) - count:] for positions, count in zip(candidates, chosen)]
+
+
+def _trim_categories(rows):
+    """
+    Poucas linhas de um perfil sem as categorias que não usam: a coluna Grupo tem uma categoria por
+    compra, e unir as categorias de todos os perfis para juntar os resultados custaria mais que a busca.
+    """
+    return rows.assign(**{col: rows[col].cat.remove_unused_categories() for col in armazenamento.CATEGORY_COLUMNS
+                          if col in rows.columns and isinstance(rows[col].dtype, pd.CategoricalDtype)})
+
+
+def search(profiles, text='', filters=None, start=None, end=None, limit=paginacao.MAX_PAGE_SIZE, backend=None):
+    """
+    Transações de `profiles` cuja descrição contém todas as palavras de `text` (sem diferenciar
+    maiúsculas nem acentos; cada palavra vale como prefixo: "farm" acha "Farmácia"), no período
+    e com os valores de `filters` ({faceta: valores aceitos}, facetas em FACETS).
+    Retorna ResultadoBusca: as `limit` transações mais recentes (com Pessoa), o total encontrado e,
+    para cada faceta, uma Series valor -> número de transações (com os demais filtros aplicados).
+    """
+    profiles = list(profiles)
+    filters = {facet: values for facet, values in (filters or {}).items() if values}
+    counts = {facet: {} for facet in FACETS}
+    found = []
+    total = 0
+    loaded = armazenamento.map_profiles(lambda p: _load(p, backend), profiles)
+    for profile, (index, df) in zip(profiles, loaded):
+        if df.empty:
+            found.append(np.empty(0, dtype=np.int64))
+            continue
+        low, high, text_mask, facets = _profile_search(profile, index, df, text, filters, start, end)
+        for facet, (_, codes, labels) in facets.items():
+            # cada faceta é contada com todos os filtros, menos o dela
+            mask = _combine([text_mask] + [other for name, (other, _, _) in facets.items() if name != facet])
+            for label, count in zip(labels, _count(codes, labels, mask, high - low)):
+                if count:
+                    counts[facet][label] = counts[facet].get(label, 0) + int(count)
+        mask = _combine([text_mask] + [facet_mask for facet_mask, _, _ in facets.values()])
+        positions = np.arange(low, high) if mask is None else low + np.flatnonzero(mask)
+        total += len(positions)
+        found.append(positions)
+    frames = [_trim_categories(df.iloc[positions]) if len(positions) else None
+              for (_, df), positions in zip(loaded, _most_recent(loaded, found, limit))]
+    rows = armazenamento.concat_profiles(profiles, frames).iloc[::-1].reset_index(drop=True)
+    facets = {facet: pd.Series(values, dtype='int64').sort_values(ascending=False, kind='stable')
+              for facet, values in counts.items()}
+    return ResultadoBusca(rows, total, facets)
@@ -0,0 +1,249 @@
+"""
+Cache compartilhado (por processo) dos arquivos de transações já interpretados.
+
+O Streamlit reexecuta o script principal a cada interação, então variáveis globais
+dele são recriadas a cada rerun. Este módulo é importado (e portanto mantido em
+sys.modules), o que permite reaproveitar os DataFrames entre reruns e entre sessões.
+
+Cada entrada é indexada pelo caminho do arquivo e validada pela assinatura
+(mtime_ns, tamanho, inode) — ou, para armazenamentos que não são arquivos, por uma chave
+e um número de versão (get_versioned). O consumo de memória é limitado com despejo LRU.
+
+Com várias sessões abertas, todas recebem visões da mesma cópia: um perfil carregado uma vez
+ocupa a mesma memória com 1 ou 20 abas. Para isso:
+  - uma chave em carga é carregada uma só vez (get_versioned com `lock`): as outras sessões
+    esperam e recebem a mesma entrada, em vez de cada uma ler a sua cópia;
+  - cada sessão registra num Lease as entradas que usa (contagem de referências); entradas em
+    uso não são despejadas pelo limite de memória, só as que nenhuma sessão aberta usa.
+Além de DataFrames, o cache guarda objetos pequenos (listas e dicionários dos cadastros),
+entregues como cópias para que nenhuma sessão altere o valor compartilhado, e tuplas
+(inclusive namedtuples) de DataFrames, como os índices de grupos.py e busca.py.
+"""
+import copy
+import os
+import sys
+import threading
+import weakref
+from collections import Counter, OrderedDict, deque
+
+import pandas as pd
+
+# Com Copy-on-Write, cópias rasas não compartilham escrita com o original:
+# quem alterar o DataFrame recebido nunca corrompe a versão em cache.
+# (pandas >= 3.0 já usa CoW sempre e a opção foi descontinuada)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+MAX_CACHE_BYTES = int(os.environ.get("CACHE_DADOS_MAX_MB", "256")) * 1024 * 1024
+MAX_CACHE_ENTRIES = int(os.environ.get("CACHE_DADOS_MAX_ENTRADAS", "64"))
+
+_cache = OrderedDict()  # chave (caminho) -> (versão/assinatura, DataFrame, bytes)
+_total_bytes = 0
+_lock = threading.Lock()
+_refs = Counter()        # chave -> número de Leases (sessões) que usam a entrada
+_released = deque()      # chaves devolvidas por Leases, descontadas de _refs sob _lock
+
+
+def file_signature(path):
+    """
+    Retorna (mtime_ns, tamanho, inode) do arquivo ou None se ele não existir.
+    O inode distingue reescritas atômicas (arquivo novo trocado no lugar) do mesmo tamanho no mesmo instante.
+    """
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+def signature(path, depends_on=()):
+    """Assinatura combinada do arquivo principal e dos arquivos auxiliares (ex.: journal de appends)."""
+    return (file_signature(path),) + tuple(file_signature(p) for p in depends_on)
+
+
+def _drain_released_locked():
+    while _released:
+        key = _released.popleft()
+        _refs[key] -= 1
+        if _refs[key] <= 0:
+            del _refs[key]
+
+
+def _evict_locked():
+    global _total_bytes
+    _drain_released_locked()
+    # do menos para o mais recentemente usado, pulando entradas em uso por alguma sessão;
+    # mantém pelo menos a entrada mais recente, mesmo que sozinha exceda o limite
+    newest = next(reversed(_cache), None)
+    for key in list(_cache):
+        if _total_bytes <= MAX_CACHE_BYTES and len(_cache) <= MAX_CACHE_ENTRIES:
+            break
+        if key == newest or key in _refs:
+            continue
+        _, _, nbytes = _cache.pop(key)
+        _total_bytes -= nbytes
+
+
+def _view(value):
+    """O que o chamador recebe: DataFrames como cópia rasa (Copy-on-Write); listas e dicionários como cópia; tuplas item a item."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    if isinstance(value, tuple):
+        items = [_view(item) for item in value]
+        return type(value)(*items) if hasattr(value, '_fields') else tuple(items)
+    return value
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    # cadastros: poucos bytes, tamanho aproximado
+    return sys.getsizeof(value)
+
+
+def get_frame(path, parser, depends_on=()):
+    """
+    Retorna o DataFrame do arquivo `path`, interpretado por `parser(path)`.
+    Se o arquivo (e os arquivos em `depends_on`) não mudaram desde a última leitura,
+    devolve a versão em cache sem reler o disco.
+    Lança FileNotFoundError se o arquivo não existir.
+    """
+    current = signature(path, depends_on)
+    if current[0] is None:
+        invalidate(path)
+        raise FileNotFoundError(path)
+    return get_versioned(path, current, lambda: parser(path))
+
+
+def _cached(key, version):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == version:
+            _cache.move_to_end(key)
+            return True, entry[1]
+    return False, None
+
+
+def get_versioned(key, version, loader, lock=None):
+    """
+    Retorna o DataFrame em cache para `key` se ele foi carregado na mesma `version`
+    (assinatura de arquivo, contador de versão do banco, ...); senão chama `loader()`.
+    O DataFrame devolvido é uma visão somente-leitura (cópia rasa sob Copy-on-Write):
+    pode ser alterado livremente pelo chamador sem afetar o cache, sem precisar de .copy().
+    `lock` (opcional): contexto de trava (ex.: persistencia.file_lock do arquivo) que serializa
+    as cargas de `key`; quem esperou a trava reaproveita a carga feita por quem a tinha.
+    """
+    hit, value = _cached(key, version)
+    if hit:
+        return _view(value)
+    if lock is None:
+        value = loader()
+        _store(key, version, value)
+        return _view(value)
+    with lock:
+        hit, value = _cached(key, version)
+        if not hit:
+            value = loader()
+            _store(key, version, value)
+    return _view(value)
+
+
+def _store(key, version, df):
+    global _total_bytes
+    nbytes = _nbytes(df)
+    with _lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _total_bytes -= old[2]
+        _cache[key] = (version, df, nbytes)
+        _total_bytes += nbytes
+        _evict_locked()
+
+
+def peek(key, version):
+    """DataFrame em cache para `key` se estiver na `version` informada (sem carregar nada), senão None."""
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return _view(entry[1])
+
+
+def cached_version(key):
+    """Versão da entrada em cache para `key` (como passada a get_versioned), ou None se não houver entrada."""
+    with _lock:
+        entry = _cache.get(key)
+        return None if entry is None else entry[0]
+
+
+def update_frame(key, previous_version, new_version, transform):
+    """
+    Atualiza a entrada em cache após uma gravação parcial (append, edição de poucas linhas),
+    aplicando `transform(df)` à versão em memória em vez de reler tudo.
+    Só aplica se a entrada corresponde a `previous_version` (estado antes da gravação);
+    caso contrário a entrada é descartada e será relida no próximo acesso.
+    """
+    with _lock:
+        entry = _cache.get(key)
+    if entry is None or entry[0] != previous_version:
+        invalidate(key)
+        return
+    _store(key, new_version, transform(entry[1]))
+
+
+def invalidate(key=None):
+    """Remove `key` do cache (ou esvazia o cache inteiro quando key=None)."""
+    global _total_bytes
+    with _lock:
+        if key is None:
+            _cache.clear()
+            _total_bytes = 0
+            return
+        old = _cache.pop(key, None)
+        if old is not None:
+            _total_bytes -= old[2]
+
+
+class Lease:
+    """
+    Entradas do cache usadas por uma sessão (contagem de referências por chave). Enquanto
+    alguma sessão usa uma entrada, ela não é despejada pelo limite de memória: despejá-la só
+    faria a sessão carregar de novo, possivelmente ao mesmo tempo que outras.
+    As referências são devolvidas com release() ou quando o Lease é coletado (ex.: guardado
+    no st.session_state, quando a sessão do Streamlit termina).
+    """
+
+    def __init__(self):
+        self._start()
+
+    def _start(self):
+        self._keys = set()
+        # o finalizador só enfileira as chaves: pode rodar no meio de qualquer alocação,
+        # inclusive com _lock adquirido pela mesma thread
+        self._finalizer = weakref.finalize(self, _released.extend, self._keys)
+
+    def hold(self, key):
+        if key in self._keys:
+            return
+        with _lock:
+            _drain_released_locked()
+            self._keys.add(key)
+            _refs[key] += 1
+
+    def release(self):
+        self._finalizer()
+        self._start()
+
+
+def cache_stats():
+    """Resumo do estado do cache (útil para depuração)."""
+    with _lock:
+        _drain_released_locked()
+        return {'entradas': len(_cache), 'bytes': _total_bytes, 'arquivos': list(_cache.keys()),
+                'em_uso': dict(_refs)}
@@ -0,0 +1,57 @@
+"""
+Cache (por processo) das figuras Plotly já montadas.
+
+Montar uma figura (agrupamento + plotly.express) custa dezenas de milissegundos e
+acontece a cada rerun do Streamlit, mesmo quando a interação não mudou nada do gráfico
+(ex.: um widget da barra lateral). As figuras ficam guardadas pela chave
+(nome do gráfico, versão dos dados, período, cartão, metas, ...): se nada disso mudou,
+a mesma figura é reaproveitada. Qualquer gravação muda a versão dos dados e, com ela, a chave.
+
+O número de figuras guardadas é limitado (despejo LRU).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+MAX_FIGURES = int(os.environ.get("CACHE_GRAFICOS_MAX_ENTRADAS", "128"))
+
+_figures = OrderedDict()  # chave -> figura
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def get_figure(key, builder):
+    """
+    Figura em cache para `key` ou, se não houver, `builder()` (guardada para os próximos reruns).
+    Com key=None a figura é sempre montada (sem cache).
+    """
+    global _hits, _misses
+    if key is None:
+        return builder()
+    with _lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            _hits += 1
+            return fig
+        _misses += 1
+    fig = builder()
+    with _lock:
+        _figures[key] = fig
+        _figures.move_to_end(key)
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+    return fig
+
+
+def invalidate():
+    """Descarta todas as figuras."""
+    with _lock:
+        _figures.clear()
+
+
+def cache_stats():
+    """Resumo do estado do cache (útil para depuração)."""
+    with _lock:
+        return {'entradas': len(_figures), 'acertos': _hits, 'faltas': _misses}
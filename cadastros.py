@@ -0,0 +1,221 @@
+"""
+Cadastros do app: perfis, categorias, cartões e metas.
+
+Leitura e gravação sem depender do Streamlit, para serem usadas tanto pela interface
+quanto pelo modo relatório (relatorio.py). Com ARMAZENAMENTO=sqlite tudo fica no banco;
+caso contrário, em arquivos texto/CSV/JSON no diretório de trabalho.
+
+As leituras passam pelo cache_dados: uma cópia de cada cadastro por processo, compartilhada
+por todas as sessões e relida só quando registry_version muda (arquivo regravado, ou contador
+de versão no banco). Cada sessão recebe sua própria cópia rasa/pequena para alterar à vontade.
+
+As gravações em arquivo são atômicas e feitas com a trava do arquivo (persistencia.py);
+save_* aceitam expected_version (de registry_version) para recusar, com WriteConflict, a
+gravação de uma cópia desatualizada. Para ler, alterar e gravar sem perder mudanças de outras
+sessões, use update_* (leitura e gravação com a trava).
+"""
+import json
+import os
+
+import pandas as pd
+
+import armazenamento
+import cache_dados
+import persistencia
+
+CARDS_FILE = "cartoes.csv"  # armazena cartões: Nome,Bandeira,Dono,DiaFechamento,DiaVencimento
+GOALS_FILE = "metas.json"   # armazena metas por perfil
+
+
+# --- Funções de Gerenciamento de Categorias ---
+CATEGORIES_ENTRADA_FILE = "categorias_entrada.txt"
+CATEGORIES_GASTO_FILE = "categorias_gasto.txt"
+
+
+def use_database():
+    """Com ARMAZENAMENTO=sqlite, perfis, categorias, cartões e metas também ficam no banco."""
+    return armazenamento.default_backend_name() == 'sqlite'
+
+
+def _registry_name(file_path):
+    """Nome do cadastro no banco: o nome do arquivo sem extensão ('perfis', 'cartoes', 'metas', ...)."""
+    return os.path.splitext(file_path)[0]
+
+
+def registry_version(file_path):
+    """Versão atual do cadastro em `file_path` (muda a cada gravação), para expected_version e para o cache."""
+    if use_database():
+        import armazenamento_sqlite
+        return armazenamento_sqlite.registry_version(_registry_name(file_path))
+    return persistencia.file_version(file_path)
+
+
+def registry_key(file_path):
+    """Chave do cadastro no cache_dados (para cache_dados.Lease.hold)."""
+    if use_database():
+        import armazenamento_sqlite
+        return f"{armazenamento_sqlite.DB_FILE}#cadastro:{_registry_name(file_path)}"
+    return file_path
+
+
+def _shared(file_path, read):
+    """Cadastro lido por `read()`, compartilhado entre as sessões até a próxima gravação."""
+    return cache_dados.get_versioned(registry_key(file_path), registry_version(file_path), read,
+                                     lock=persistencia.file_lock(file_path))
+
+
+def _update(file_path, load, save, change):
+    """Lê, aplica `change` e grava com a trava de `file_path` (a trava vale também para o banco)."""
+    with persistencia.file_lock(file_path):
+        value = change(load())
+        save(value)
+    return value
+
+
+def _saved(file_path):
+    # a versão nova já invalidaria a entrada na próxima leitura; descartá-la agora libera a memória
+    cache_dados.invalidate(registry_key(file_path))
+
+
+def _save_file(file_path, expected_version, write):
+    with persistencia.file_lock(file_path):
+        persistencia.check_version(file_path, expected_version)
+        persistencia.write_atomic(file_path, write)
+    _saved(file_path)
+
+
+def _save_text(file_path, text, expected_version):
+    with persistencia.file_lock(file_path):
+        persistencia.check_version(file_path, expected_version)
+        persistencia.write_text_atomic(file_path, text)
+    _saved(file_path)
+
+
+def _lines(values):
+    return "".join(f"{value}\n" for value in values)
+
+
+def _read_lines(file_path):
+    """Linhas não vazias do cadastro (lista vazia se não houver nenhuma)."""
+    if use_database():
+        import armazenamento_sqlite
+        return armazenamento_sqlite.load_list(_registry_name(file_path))
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _save_lines(file_path, values, expected_version):
+    if use_database():
+        import armazenamento_sqlite
+        armazenamento_sqlite.save_list(_registry_name(file_path), values, expected_version)
+        _saved(file_path)
+        return
+    _save_text(file_path, _lines(values), expected_version)
+
+
+def load_categories_from_file(file_path, default_categories):
+    categories = _shared(file_path, lambda: _read_lines(file_path))
+    return categories if categories else list(default_categories)
+
+
+def save_categories_to_file(file_path, categories_list, expected_version=None):
+    _save_lines(file_path, categories_list, expected_version)
+
+
+def update_categories(file_path, default_categories, change):
+    """Aplica `change(lista) -> nova lista` às categorias de `file_path`. Retorna a lista gravada."""
+    return _update(file_path, lambda: load_categories_from_file(file_path, default_categories),
+                   lambda categories: save_categories_to_file(file_path, categories), change)
+
+
+# --- Funções de Gerenciamento de Perfis ---
+PROFILES_FILE = "perfis.txt"
+
+
+def load_profiles():
+    return _shared(PROFILES_FILE, lambda: _read_lines(PROFILES_FILE)) or ['Principal']
+
+
+def save_profiles(profiles_list, expected_version=None):
+    _save_lines(PROFILES_FILE, profiles_list, expected_version)
+
+
+def update_profiles(change):
+    """Aplica `change(lista) -> nova lista` aos perfis. Retorna a lista gravada."""
+    return _update(PROFILES_FILE, load_profiles, save_profiles, change)
+
+
+# --- Funções de Gerenciamento de Cartões ---
+def _read_cards():
+    if use_database():
+        import armazenamento_sqlite
+        return armazenamento_sqlite.load_cards()
+    if not os.path.exists(CARDS_FILE):
+        # cria arquivo vazio (já com a trava do arquivo, ver _shared)
+        df = pd.DataFrame(columns=['Nome', 'Bandeira', 'Dono', 'DiaFechamento', 'DiaVencimento'])
+        persistencia.write_atomic(CARDS_FILE, lambda tmp_path: df.to_csv(tmp_path, index=False))
+        return df
+    df = pd.read_csv(CARDS_FILE, dtype={'Nome': str, 'Bandeira': str, 'Dono': str, 'DiaFechamento': 'Int64', 'DiaVencimento': 'Int64'})
+    if 'DiaVencimento' not in df.columns:
+        # arquivos antigos só tinham o dia de fechamento
+        df['DiaVencimento'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    return df
+
+
+def load_cards():
+    """Retorna DataFrame com colunas: Nome, Bandeira, Dono, DiaFechamento (int), DiaVencimento (int)"""
+    return _shared(CARDS_FILE, _read_cards)
+
+
+def save_cards(df_cards, expected_version=None):
+    if use_database():
+        import armazenamento_sqlite
+        armazenamento_sqlite.save_cards(df_cards, expected_version)
+        _saved(CARDS_FILE)
+        return
+    _save_file(CARDS_FILE, expected_version, lambda tmp_path: df_cards.to_csv(tmp_path, index=False))
+
+
+def update_cards(change):
+    """Aplica `change(DataFrame) -> novo DataFrame` aos cartões. Retorna o DataFrame gravado."""
+    return _update(CARDS_FILE, load_cards, save_cards, change)
+
+
+# --- Gerenciamento de metas (arquivo metas.json) ---
+def _read_goals():
+    if use_database():
+        import armazenamento_sqlite
+        return armazenamento_sqlite.load_goals()
+    try:
+        with open(GOALS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_goals():
+    """Metas por perfil. Arquivo ausente = sem metas; arquivo inválido levanta a exceção (a UI avisa)."""
+    return _shared(GOALS_FILE, _read_goals)
+
+
+def save_goals(goals, expected_version=None):
+    if use_database():
+        import armazenamento_sqlite
+        armazenamento_sqlite.save_goals(goals, expected_version)
+        _saved(GOALS_FILE)
+        return
+    _save_text(GOALS_FILE, json.dumps(goals, ensure_ascii=False, indent=2), expected_version)
+
+
+def update_goals(change):
+    """Aplica `change(metas) -> novas metas` ao arquivo de metas. Retorna as metas gravadas."""
+    return _update(GOALS_FILE, load_goals, save_goals, change)
+
+
+def cache_keys(profiles=()):
+    """Chaves no cache_dados dos cadastros e das transações de `profiles` (o que uma sessão usa)."""
+    registries = [PROFILES_FILE, CATEGORIES_ENTRADA_FILE, CATEGORIES_GASTO_FILE, CARDS_FILE, GOALS_FILE]
+    return [registry_key(path) for path in registries] + [armazenamento.cache_key(p) for p in profiles]
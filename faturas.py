@@ -0,0 +1,171 @@
+"""
+Faturas dos cartões a partir do dia de fechamento (DiaFechamento) e de vencimento (DiaVencimento).
+
+Cada compra/parcela no cartão entra na fatura do ciclo em que foi feita: compras até o dia
+de fechamento (inclusive) vão para a fatura do próprio mês; depois dele, para a do mês seguinte.
+Quando o dia não existe no mês (ex.: fechamento 31 em fevereiro) vale o último dia do mês.
+O vencimento cai no mesmo mês do fechamento se DiaVencimento > DiaFechamento, senão no mês
+seguinte; sem DiaVencimento, o vencimento é DIAS_VENCIMENTO_PADRAO dias após o fechamento.
+Cartões sem DiaFechamento (ou não cadastrados) fecham no último dia de cada mês.
+
+Para cada perfil é mantido um agregado diário Cartao × Data -> Valor, Quantidade (só linhas
+pagas com cartão), atualizado de forma incremental a cada gravação, como os rollups de resumos.py.
+O agregado não depende do cadastro dos cartões: mudar o dia de fechamento só refaz o cálculo
+das faturas (vetorizado sobre os dias com movimento), nunca a leitura das transações.
+No agregado Valor fica em centavos (int64); as faturas saem em reais.
+"""
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cache_dados
+
+DIAS_VENCIMENTO_PADRAO = 10
+DAILY_KEYS = ['Cartao', 'Data']
+DAILY_COLUMNS = DAILY_KEYS + ['Valor', 'Quantidade']
+INVOICE_COLUMNS = ['Cartao', 'Fatura', 'Fechamento', 'Vencimento', 'Valor', 'Quantidade', 'Status']
+
+
+def _empty_daily():
+    return pd.DataFrame({'Cartao': pd.Series(dtype=object), 'Data': pd.Series(dtype='datetime64[ns]'),
+                         'Valor': pd.Series(dtype='int64'), 'Quantidade': pd.Series(dtype='int64')})
+
+
+def _empty_invoices():
+    return pd.DataFrame({'Cartao': pd.Series(dtype=object), 'Fatura': pd.Series(dtype=object),
+                         'Fechamento': pd.Series(dtype='datetime64[ns]'), 'Vencimento': pd.Series(dtype='datetime64[ns]'),
+                         'Valor': pd.Series(dtype='float64'), 'Quantidade': pd.Series(dtype='int64'),
+                         'Status': pd.Series(dtype=object)})
+
+
+def build_daily(df):
+    """Agrega as linhas pagas com cartão em Cartao × Data. Gastos somam e entradas (estornos) subtraem."""
+    if df is None or df.empty:
+        return _empty_daily()
+    on_card = df['PagoComCartao'].to_numpy(dtype=bool) & df['Cartao'].notna().to_numpy()
+    rows = df[on_card]
+    if rows.empty:
+        return _empty_daily()
+    values = rows['Valor'].to_numpy(dtype='int64')
+    sign = np.where((rows['Tipo'] == 'Entrada').to_numpy(), -1, 1)
+    keys = pd.DataFrame({'Cartao': rows['Cartao'].astype(object).to_numpy(),
+                         'Data': pd.to_datetime(rows['Data']).dt.normalize().to_numpy(),
+                         'Valor': values * sign})
+    grouped = keys.groupby(DAILY_KEYS, sort=False)['Valor'].agg(['sum', 'count']).reset_index()
+    return grouped.rename(columns={'sum': 'Valor', 'count': 'Quantidade'})[DAILY_COLUMNS]
+
+
+def apply_delta(daily, added, removed):
+    """Soma ao agregado diário as linhas `added` e subtrai as linhas `removed`."""
+    plus = build_daily(added)
+    minus = build_daily(removed)
+    minus['Valor'] = -minus['Valor']
+    minus['Quantidade'] = -minus['Quantidade']
+    frames = [df for df in (daily, plus, minus) if not df.empty]
+    if not frames:
+        return _empty_daily()
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.groupby(DAILY_KEYS, sort=False)[['Valor', 'Quantidade']].sum().reset_index()
+    return merged[merged['Quantidade'] > 0][DAILY_COLUMNS].reset_index(drop=True)
+
+
+def _daily_key(backend, profile):
+    return f"{backend.cache_key(profile)}#cartoes_diario"
+
+
+def load_daily(profile, backend=None):
+    """Agregado diário de cartão do perfil (montado a partir do histórico só quando não está em cache)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return _empty_daily()
+
+    def build():
+        return build_daily(armazenamento.load_transactions(profile, backend.name))
+    return cache_dados.get_versioned(_daily_key(backend, profile), version, build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    key = _daily_key(backend, profile)
+    if added is None or removed is None:
+        cache_dados.invalidate(key)
+        return
+    cache_dados.update_frame(key, previous_version, new_version, lambda daily: apply_delta(daily, added, removed))
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def _days_in_month(months):
+    return ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+
+
+def _day_of(months, day):
+    """Data do dia `day` (1-based) em cada mês, limitado ao último dia do mês."""
+    return months.astype('datetime64[D]') + (np.minimum(day, _days_in_month(months)) - 1).astype('timedelta64[D]')
+
+
+def assign_cycles(dates, closing_day, due_day=None):
+    """
+    Vetorizado: para cada data (e dia de fechamento/vencimento da linha) retorna
+    (mês de referência da fatura, início do ciclo, data de fechamento, data de vencimento) como arrays datetime64.
+    `closing_day`/`due_day` com NaN: fechamento no último dia do mês / vencimento padrão.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    closing = np.asarray(closing_day, dtype='float64')
+    closing = np.where(np.isnan(closing), 31, np.clip(closing, 1, 31)).astype(np.int64)
+    month = dates.astype('datetime64[M]')
+    day = (dates - month.astype('datetime64[D]')).astype(np.int64) + 1
+    reference = month + (day > np.minimum(closing, _days_in_month(month))).astype('timedelta64[M]')
+    closing_date = _day_of(reference, closing)
+    opening_date = _day_of(reference - np.timedelta64(1, 'M'), closing) + np.timedelta64(1, 'D')
+
+    due = np.full(len(dates), np.nan) if due_day is None else np.asarray(due_day, dtype='float64')
+    has_due = ~np.isnan(due)
+    due = np.where(has_due, np.clip(np.nan_to_num(due), 1, 31), 1).astype(np.int64)
+    due_month = reference + (due <= closing).astype('timedelta64[M]')
+    due_date = np.where(has_due, _day_of(due_month, due),
+                        closing_date + np.timedelta64(DIAS_VENCIMENTO_PADRAO, 'D'))
+    return reference, opening_date, closing_date, due_date
+
+
+def compute_invoices(daily, cards_df, today=None):
+    """
+    Faturas (Cartao × mês de referência) a partir de um agregado diário de um ou mais perfis.
+    Status: 'Fechada' (fechamento já passou), 'Aberta' (ciclo em andamento) ou 'Futura'
+    (só parcelas lançadas para ciclos que ainda não começaram).
+    """
+    if daily.empty:
+        return _empty_invoices()
+    today = np.datetime64(pd.Timestamp(today or pd.Timestamp.today()).date(), 'D')
+    cards = cards_df if cards_df is not None else pd.DataFrame(columns=['Nome'])
+    config = pd.DataFrame({'Cartao': cards['Nome'].astype(object) if 'Nome' in cards else pd.Series(dtype=object)})
+    for column in ('DiaFechamento', 'DiaVencimento'):
+        values = cards[column] if column in cards else pd.Series(np.nan, index=cards.index)
+        config[column] = pd.to_numeric(values, errors='coerce').astype('float64').to_numpy()
+    config = config.drop_duplicates('Cartao', keep='last')
+    rows = daily.merge(config, on='Cartao', how='left')
+
+    reference, opening_date, closing_date, due_date = assign_cycles(
+        rows['Data'].to_numpy(), rows['DiaFechamento'].to_numpy(), rows['DiaVencimento'].to_numpy())
+    rows = pd.DataFrame({'Cartao': rows['Cartao'].to_numpy(), 'Referencia': reference, 'Abertura': opening_date,
+                         'Fechamento': closing_date.astype('datetime64[ns]'), 'Vencimento': due_date.astype('datetime64[ns]'),
+                         'Valor': rows['Valor'].to_numpy(), 'Quantidade': rows['Quantidade'].to_numpy()})
+    keys = ['Cartao', 'Referencia', 'Abertura', 'Fechamento', 'Vencimento']
+    invoices = rows.groupby(keys, sort=True)[['Valor', 'Quantidade']].sum().reset_index()
+    invoices['Valor'] = invoices['Valor'].to_numpy(dtype='int64') / 100
+    invoices['Fatura'] = invoices['Referencia'].to_numpy().astype('datetime64[M]').astype(str)
+    closing = invoices['Fechamento'].to_numpy().astype('datetime64[D]')
+    opening = invoices['Abertura'].to_numpy().astype('datetime64[D]')
+    invoices['Status'] = np.where(closing < today, 'Fechada', np.where(opening <= today, 'Aberta', 'Futura'))
+    return invoices[INVOICE_COLUMNS].reset_index(drop=True)
+
+
+def invoices_for(profiles, cards_df, today=None, backend=None):
+    """Faturas de todos os cartões usados pelos `profiles` (um cartão pode ser usado por vários perfis)."""
+    dailies = [d for d in armazenamento.map_profiles(lambda profile: load_daily(profile, backend), profiles) if not d.empty]
+    if not dailies:
+        return _empty_invoices()
+    daily = dailies[0] if len(dailies) == 1 else pd.concat(dailies, ignore_index=True)
+    return compute_invoices(daily, cards_df, today)
@@ -0,0 +1,300 @@
+"""
+Índice das compras parceladas (Grupo) e operações sobre uma compra inteira.
+
+As parcelas de uma compra no cartão compartilham o mesmo Grupo (UUID, ver parcelas.py).
+Para cada perfil é mantido um índice IndiceGrupos com duas tabelas:
+  - membros: uma linha por parcela lançada (Posicao nas transações em memória, Data,
+    Parcela, Valor em centavos), agrupadas por compra e, dentro da compra, em ordem de data;
+  - grupos: uma linha por compra, indexada pelo Grupo, com Inicio/Quantidade (fatia de membros)
+    e os dados da compra (Descrição sem o sufixo " (k/N)", Tipo, Categoria, Cartao, NumParcelas, TotalCompra).
+Achar as parcelas de uma compra é uma consulta ao índice (hash) e um fatiamento, sem varrer o histórico.
+
+O índice é montado na primeira leitura do perfil e guardado no cache_dados. Novas transações
+(append_transactions) o atualizam sem remontá-lo: as posições antigas são deslocadas pelo número
+de linhas inseridas antes delas (searchsorted nas datas novas) e as compras novas entram no fim.
+Edições e exclusões descartam o índice, remontado no próximo acesso.
+
+Operações de compra (resplit_group, cancel_remaining, prepay_group) leem as parcelas pelo índice
+e gravam só essas linhas (armazenamento.apply_changes, com verificação de que ninguém as alterou).
+Pagas/restantes dependem da data de referência e são calculados em group_summary.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cache_dados
+import parcelas
+
+IndiceGrupos = namedtuple('IndiceGrupos', ['grupos', 'membros'])
+
+SUMMARY_COLUMNS = ['Grupo', 'Descrição', 'Tipo', 'Categoria', 'Cartao', 'NumParcelas', 'Lancadas', 'Pagas',
+                   'Restantes', 'TotalCompra', 'ValorRestante', 'PrimeiraData', 'UltimaData']
+
+
+def _empty_index():
+    grupos = pd.DataFrame({'Inicio': pd.Series(dtype='int64'), 'Quantidade': pd.Series(dtype='int64'),
+                           'Descrição': pd.Series(dtype=object), 'Tipo': pd.Series(dtype=object),
+                           'Categoria': pd.Series(dtype=object), 'Cartao': pd.Series(dtype=object),
+                           'NumParcelas': pd.Series(dtype='int64'), 'TotalCompra': pd.Series(dtype='Int64')},
+                          index=pd.Index([], dtype=object, name='Grupo'))
+    membros = pd.DataFrame({'Posicao': pd.Series(dtype='int64'), 'Data': pd.Series(dtype='datetime64[ns]'),
+                            'Parcela': pd.Series(dtype='int64'), 'Valor': pd.Series(dtype='int64')})
+    return IndiceGrupos(grupos, membros)
+
+
+def _index_rows(df, positions):
+    """Índice das linhas `positions` de `df` (todas com Grupo), na ordem de `positions`."""
+    if len(positions) == 0:
+        return _empty_index()
+    grupo = df['Grupo'].iloc[positions].astype('category')
+    # numeração própria das compras, na ordem da primeira parcela (comparando códigos, não os UUIDs)
+    ordinal, codes = pd.factorize(grupo.cat.codes.to_numpy(), sort=False)
+    order = np.argsort(ordinal, kind='stable')
+    members = positions[order]
+    counts = np.bincount(ordinal, minlength=len(codes))
+    starts = np.cumsum(counts) - counts
+    first = members[starts]
+    membros = pd.DataFrame({
+        'Posicao': members,
+        'Data': df['Data'].to_numpy()[members],
+        'Parcela': df['ParcelaAtual'].iloc[members].fillna(1).to_numpy(dtype='int64'),
+        'Valor': df['Valor'].to_numpy(dtype='int64')[members],
+    })
+    grupos = pd.DataFrame({
+        'Inicio': starts,
+        'Quantidade': counts,
+        'Descrição': parcelas.strip_suffix(df['Descrição'].iloc[first]).to_numpy(dtype=object),
+        'Tipo': df['Tipo'].iloc[first].astype(object).to_numpy(),
+        'Categoria': df['Categoria'].iloc[first].astype(object).to_numpy(),
+        'Cartao': df['Cartao'].iloc[first].astype(object).to_numpy(),
+        'NumParcelas': df['NumParcelas'].iloc[first].fillna(0).to_numpy(dtype='int64'),
+        'TotalCompra': pd.array(df['TotalCompra'].iloc[first], dtype='Int64'),
+    }, index=pd.Index(grupo.cat.categories[codes].astype(object), name='Grupo'))
+    return IndiceGrupos(grupos, membros)
+
+
+def build_index(df):
+    """Índice de todas as compras parceladas de `df` (transações do perfil, ordenadas por Data)."""
+    if df is None or df.empty:
+        return _empty_index()
+    return _index_rows(df, np.flatnonzero(df['Grupo'].notna().to_numpy()))
+
+
+def apply_insert(index, df, added):
+    """
+    Índice atualizado após acrescentar `added` às transações; `df` é o resultado já ordenado
+    (as linhas novas entram depois das existentes de mesma data, como em armazenamento.sort_by_date).
+    Retorna None quando não dá para atualizar (o índice deve ser remontado).
+    """
+    if added.empty:
+        return index
+    grupos, membros = index
+    dates = np.sort(added['Data'].to_numpy(dtype='datetime64[ns]'))
+    # cada linha existente anda uma posição para cada linha nova de data anterior à dela
+    shifted = membros['Posicao'].to_numpy() + np.searchsorted(dates, membros['Data'].to_numpy(), side='left')
+
+    new_positions = armazenamento.inserted_positions(df, added)
+    if new_positions is None:
+        return None
+    new_positions = new_positions[df['Grupo'].iloc[new_positions].notna().to_numpy()]
+    new = _index_rows(df, new_positions)
+    if new.grupos.index.isin(grupos.index).any():
+        # parcelas novas de uma compra já indexada (raro): a fatia da compra teria de crescer
+        return None
+    new.grupos['Inicio'] += len(membros)
+    return IndiceGrupos(pd.concat([grupos, new.grupos]),
+                        pd.concat([membros.assign(Posicao=shifted), new.membros], ignore_index=True))
+
+
+def _index_key(backend, profile):
+    return f"{backend.cache_key(profile)}#grupos"
+
+
+def load_index(profile, backend=None):
+    """Índice das compras parceladas do perfil (montado a partir do histórico só quando não está em cache)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return _empty_index()
+
+    def build():
+        return build_index(armazenamento.load_transactions(profile, backend.name))
+    return cache_dados.get_versioned(_index_key(backend, profile), version, build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    key = _index_key(backend, profile)
+    # edições e exclusões mudam posições de forma arbitrária: remonta no próximo acesso
+    if added is None or removed is None or not removed.empty:
+        cache_dados.invalidate(key)
+        return
+    index = cache_dados.peek(key, previous_version)
+    df = cache_dados.peek(backend.cache_key(profile), new_version)
+    updated = None if index is None or df is None else apply_insert(index, df, added)
+    if updated is None:
+        cache_dados.invalidate(key)
+        return
+    cache_dados.update_frame(key, previous_version, new_version, lambda _: updated)
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def _reference_date(today):
+    return pd.Timestamp(today if today is not None else pd.Timestamp.today()).normalize()
+
+
+def summarize(index, today=None):
+    """Resumo por compra (valores em reais) com parcelas pagas (data até `today`) e restantes."""
+    grupos, membros = index
+    if grupos.empty:
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in SUMMARY_COLUMNS})
+    starts = grupos['Inicio'].to_numpy()
+    counts = grupos['Quantidade'].to_numpy()
+    ends = starts + counts - 1
+    paid = membros['Data'].to_numpy() <= np.datetime64(_reference_date(today))
+    installment = membros['Parcela'].to_numpy()
+    values = membros['Valor'].to_numpy()
+
+    last_recorded = np.maximum.reduceat(installment, starts)
+    n = np.maximum(grupos['NumParcelas'].to_numpy(), last_recorded)
+    # parcelas anteriores à primeira lançada (compra registrada a partir da parcela k) já foram pagas
+    pagas = np.maximum(np.maximum.reduceat(np.where(paid, installment, 0), starts), installment[starts] - 1)
+    # restante: parcelas lançadas com data futura + parcelas ainda não lançadas (com o valor da última)
+    future = np.add.reduceat(np.where(paid, 0, values), starts)
+    missing = np.maximum(n - last_recorded, 0)
+    total = grupos['TotalCompra'].to_numpy(dtype='float64', na_value=np.nan)
+    # parcelas não lançadas pela regra de parcelas.split_cents (sem total, com o valor da última lançada)
+    base, remainder = parcelas.split_cents(np.nan_to_num(total).astype(np.int64), n)
+    missing_value = np.where(np.isnan(total), missing * values[ends],
+                             missing * base + np.clip(remainder - last_recorded, 0, missing))
+    return pd.DataFrame({
+        'Grupo': grupos.index.to_numpy(),
+        'Descrição': grupos['Descrição'].to_numpy(),
+        'Tipo': grupos['Tipo'].to_numpy(),
+        'Categoria': grupos['Categoria'].to_numpy(),
+        'Cartao': grupos['Cartao'].to_numpy(),
+        'NumParcelas': n,
+        'Lancadas': counts,
+        'Pagas': np.minimum(pagas, n),
+        'Restantes': np.maximum(n - pagas, 0),
+        'TotalCompra': total / 100,
+        'ValorRestante': (future + missing_value) / 100,
+        'PrimeiraData': membros['Data'].to_numpy()[starts],
+        'UltimaData': membros['Data'].to_numpy()[ends],
+    })
+
+
+def group_summary(profile, today=None, backend=None):
+    """Resumo de todas as compras parceladas do perfil (ver summarize)."""
+    return summarize(load_index(profile, backend), today)
+
+
+def group_rows(profile, grupo, backend=None):
+    """Parcelas lançadas da compra `grupo` (modelo em memória, em ordem de data). KeyError se não existir."""
+    backend = armazenamento.get_backend(backend)
+    df = armazenamento.load_transactions(profile, backend.name)
+    grupos, membros = load_index(profile, backend.name)
+    if grupo not in grupos.index:
+        raise KeyError(f"Compra parcelada {grupo} não encontrada em {profile}.")
+    loc = grupos.index.get_loc(grupo)
+    start, count = int(grupos['Inicio'].iat[loc]), int(grupos['Quantidade'].iat[loc])
+    positions = membros['Posicao'].to_numpy()[start:start + count]
+    if positions.max() < len(df):
+        rows = df.iloc[positions]
+        if (rows['Grupo'] == grupo).all():
+            return rows
+    # índice e transações de versões diferentes (gravação entre as duas leituras): busca direta
+    return df[df['Grupo'] == grupo]
+
+
+def _group_size(rows):
+    n = rows['NumParcelas'].dropna()
+    return max(int(n.max()) if len(n) else 0, int(rows['ParcelaAtual'].fillna(1).max()))
+
+
+def _installment_cents(total_cents, n, installments):
+    """Valor (centavos) das parcelas `installments` (1..n) de um total dividido em n (mesma regra de parcelas.py)."""
+    base, remainder = parcelas.split_cents([total_cents], [n])
+    return base[0] + (np.asarray(installments) - 1 < remainder[0])
+
+
+def _missing_rows(rows):
+    """Parcelas ainda não lançadas (compra registrada só até a parcela k), como linhas novas sem ID nem data."""
+    n = _group_size(rows)
+    last = int(rows['ParcelaAtual'].fillna(1).max())
+    installments = np.arange(last + 1, n + 1)
+    if len(installments) == 0:
+        return rows.iloc[0:0]
+    template = rows.iloc[[-1] * len(installments)].reset_index(drop=True)
+    total = template['TotalCompra'].iloc[0]
+    values = (_installment_cents(int(total), n, installments) if pd.notna(total)
+              else np.full(len(installments), int(template['Valor'].iloc[0])))
+    return template.assign(ParcelaAtual=installments, Valor=values, ID=pd.NA,
+                           Descrição=parcelas.replace_suffix(template['Descrição'], installments, n))
+
+
+def resplit_group(profile, grupo, total, backend=None):
+    """
+    Redivide o novo `total` (reais) da compra pelas N parcelas (parcelas.installment_values,
+    a mesma divisão do formulário) e grava o novo Valor de cada parcela lançada e o TotalCompra.
+    """
+    rows = group_rows(profile, grupo, backend)
+    n = _group_size(rows)
+    values = armazenamento.reais_to_cents(parcelas.installment_values(total, n)).to_numpy(dtype='int64')
+    installments = rows['ParcelaAtual'].fillna(1).to_numpy(dtype='int64').clip(1, n)
+    changed = rows.assign(Valor=values[installments - 1],
+                          TotalCompra=pd.array(np.full(len(rows), armazenamento.reais_to_cents([total])[0]), dtype='Int64'))
+    armazenamento.apply_changes(profile, changed, [], backend, expected=rows)
+
+
+def cancel_remaining(profile, grupo, today=None, backend=None):
+    """
+    Cancela as parcelas com data depois de `today` (e as ainda não lançadas): as futuras são excluídas
+    e as que ficam passam a indicar o novo número de parcelas e o total efetivamente cobrado.
+    Retorna o número de parcelas canceladas.
+    """
+    rows = group_rows(profile, grupo, backend)
+    future = rows['Data'] > _reference_date(today)
+    kept = rows[~future]
+    cancelled = int(future.sum()) + len(_missing_rows(rows))
+    if cancelled == 0:
+        return 0
+    if not kept.empty:
+        n = int(kept['ParcelaAtual'].fillna(1).max())
+        total = rows['TotalCompra'].dropna()
+        # total cobrado: o original menos as parcelas canceladas (ou a soma do que ficou, sem total)
+        charged = (int(total.iloc[0]) - int(rows.loc[future, 'Valor'].sum()) - int(_missing_rows(rows)['Valor'].sum())
+                   if len(total) else int(kept['Valor'].sum()))
+        kept = kept.assign(NumParcelas=n, TotalCompra=pd.array(np.full(len(kept), charged), dtype='Int64'),
+                           Descrição=parcelas.replace_suffix(kept['Descrição'], kept['ParcelaAtual'].fillna(1).to_numpy(dtype='int64'), n))
+    armazenamento.apply_changes(profile, kept, rows.loc[future, 'ID'], backend, expected=rows)
+    return cancelled
+
+
+def prepay_group(profile, grupo, data=None, total=None, backend=None):
+    """
+    Antecipa as parcelas restantes (data depois de `data` e as ainda não lançadas) para `data`.
+    Com `total` (reais pagos pela antecipação, ex.: com desconto), o valor é redividido entre elas
+    e o TotalCompra da compra é reduzido pela diferença. Retorna o número de parcelas antecipadas.
+    """
+    rows = group_rows(profile, grupo, backend)
+    data = _reference_date(data)
+    remaining = armazenamento.concat_transactions([rows[rows['Data'] > data], _missing_rows(rows)])
+    if remaining.empty:
+        return 0
+    remaining = remaining.assign(Data=data)
+    changed = remaining
+    if total is not None:
+        values = armazenamento.reais_to_cents(parcelas.installment_values(total, len(remaining))).to_numpy(dtype='int64')
+        discount = int(remaining['Valor'].sum()) - int(values.sum())
+        remaining = remaining.assign(Valor=values)
+        earlier = rows[rows['Data'] <= data]
+        changed = armazenamento.concat_transactions([earlier, remaining])
+        totals = changed['TotalCompra']
+        changed = changed.assign(TotalCompra=(totals - discount).where(totals.notna(), pd.NA))
+    armazenamento.apply_changes(profile, changed, [], backend, expected=rows)
+    return len(remaining)
@@ -0,0 +1,347 @@
+"""
+Importação em lote de extratos bancários e faturas de cartão (CSV ou OFX).
+
+O arquivo é lido em blocos (streaming): cada bloco é convertido para o schema de
+transações, comparado com as transações já gravadas (deduplicação) e acumulado por perfil.
+No final, cada perfil recebe uma única gravação (append_transactions), independente
+do número de linhas do arquivo.
+
+Fluxo típico:
+    mapping = guess_mapping(read_header(arquivo))
+    resultado = import_statement(arquivo, 'Ana', mapping=mapping, progress=callback)
+"""
+import csv
+import io
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cadastros
+
+# tamanho padrão dos blocos lidos do arquivo (linhas)
+CHUNK_ROWS = 50_000
+
+# colunas do schema que podem vir do arquivo; Pessoa direciona a linha para outro perfil
+IMPORT_COLUMNS = ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor', 'Cartao', 'NumParcelas', 'ParcelaAtual',
+                  'TotalCompra', 'Pessoa']
+
+# nomes de coluna comuns em extratos (minúsculos, sem acento) -> coluna do schema
+COLUMN_ALIASES = {
+    'data': 'Data', 'date': 'Data', 'dt': 'Data', 'data lancamento': 'Data', 'data da compra': 'Data',
+    'tipo': 'Tipo', 'type': 'Tipo',
+    'categoria': 'Categoria', 'category': 'Categoria',
+    'descricao': 'Descrição', 'description': 'Descrição', 'historico': 'Descrição', 'lancamento': 'Descrição',
+    'estabelecimento': 'Descrição', 'memo': 'Descrição', 'title': 'Descrição',
+    'valor': 'Valor', 'amount': 'Valor', 'value': 'Valor', 'valor (r$)': 'Valor',
+    'cartao': 'Cartao', 'card': 'Cartao',
+    'numparcelas': 'NumParcelas', 'parcelas': 'NumParcelas', 'total de parcelas': 'NumParcelas',
+    'parcelaatual': 'ParcelaAtual', 'parcela': 'ParcelaAtual',
+    'totalcompra': 'TotalCompra', 'valor total': 'TotalCompra',
+    'pessoa': 'Pessoa', 'perfil': 'Pessoa',
+}
+
+_DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%Y%m%d', '%d-%m-%Y']
+_OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def _plain(text):
+    """Minúsculas e sem acentos (para comparar nomes de colunas)."""
+    table = str.maketrans('áàâãéêíóôõúüç', 'aaaaeeiooouuc')
+    return str(text).strip().lower().translate(table)
+
+
+def guess_mapping(columns):
+    """Sugere {coluna do arquivo: coluna do schema} a partir dos nomes do cabeçalho."""
+    mapping = {}
+    for col in columns:
+        target = COLUMN_ALIASES.get(_plain(col))
+        if target and target not in mapping.values():
+            mapping[col] = target
+    return mapping
+
+
+def _open(source):
+    """(arquivo binário, precisa fechar?) para caminho ou arquivo binário já aberto (ex.: upload do Streamlit)."""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb'), True
+    source.seek(0)
+    return source, False
+
+
+def _detect_encoding(binary):
+    """UTF-8 quando o início do arquivo é UTF-8 válido; senão Latin-1 (comum em extratos de bancos)."""
+    sample = binary.read(64 * 1024)
+    binary.seek(0)
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # um caractere multibyte cortado no fim da amostra não conta
+        if e.start < len(sample) - 3:
+            return 'latin-1'
+    return 'utf-8-sig'
+
+
+class _Statement:
+    """Arquivo de extrato aberto como texto, com o progresso medido pela posição no arquivo binário."""
+
+    def __init__(self, source):
+        self.binary, self.owned = _open(source)
+        self.size = max(1, self.binary.seek(0, io.SEEK_END))
+        self.binary.seek(0)
+        self.text = io.TextIOWrapper(self.binary, encoding=_detect_encoding(self.binary), errors='replace',
+                                     newline='')
+
+    def fraction(self):
+        return min(1.0, self.binary.tell() / self.size)
+
+    def close(self):
+        if self.owned:
+            self.text.close()
+        else:
+            # devolve o arquivo do chamador aberto e no início
+            self.text.detach()
+            self.binary.seek(0)
+
+
+def is_ofx(source):
+    """True se o conteúdo parece OFX (cabeçalho OFXHEADER ou tag <OFX>)."""
+    statement = _Statement(source)
+    try:
+        head = statement.text.read(2048).upper()
+    finally:
+        statement.close()
+    return 'OFXHEADER' in head or '<OFX>' in head
+
+
+def _sniff_separator(sample):
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+
+def read_header(source):
+    """Colunas do arquivo CSV (ou as colunas geradas para OFX)."""
+    if is_ofx(source):
+        return ['Data', 'Valor', 'Descrição', 'FITID']
+    statement = _Statement(source)
+    try:
+        first_line = statement.text.readline()
+    finally:
+        statement.close()
+    return next(csv.reader([first_line], delimiter=_sniff_separator(first_line)))
+
+
+# --- Leitura em blocos ---
+def _csv_chunks(stream, chunk_rows):
+    first_line = stream.readline()
+    stream.seek(0)
+    reader = pd.read_csv(stream, sep=_sniff_separator(first_line), dtype=str, keep_default_na=False,
+                         chunksize=chunk_rows, skipinitialspace=True)
+    for chunk in reader:
+        yield chunk
+
+
+def _ofx_chunks(stream, chunk_rows):
+    """Lê os <STMTTRN> de um OFX (SGML 1.x ou XML 2.x) linha a linha, sem carregar o arquivo inteiro."""
+    records, current = [], None
+    for line in stream:
+        upper = line.upper()
+        if '<STMTTRN>' in upper:
+            current = {}
+        if current is not None:
+            for tag, value in _OFX_FIELD.findall(line):
+                current.setdefault(tag.upper(), value.strip())
+        if '</STMTTRN>' in upper and current is not None:
+            records.append({'Data': current.get('DTPOSTED', '')[:8], 'Valor': current.get('TRNAMT', ''),
+                            'Descrição': current.get('MEMO') or current.get('NAME', ''),
+                            'FITID': current.get('FITID', '')})
+            current = None
+            if len(records) >= chunk_rows:
+                yield pd.DataFrame(records)
+                records = []
+    if records:
+        yield pd.DataFrame(records)
+
+
+# --- Conversão para o schema de transações ---
+def parse_dates(values):
+    """
+    Datas em texto (ISO, dd/mm/aaaa, aaaammdd, ...) -> datetime64. Cada formato conhecido é testado
+    no bloco inteiro (vetorizado) e fica o que reconhece mais linhas; as demais viram NaT.
+    """
+    values = pd.Series(values, dtype=str).str.strip()
+    filled = int((values != '').sum())
+    # ordena os formatos pelo acerto numa amostra: em geral o primeiro já serve para o bloco todo
+    sample = values[values != ''].head(200)
+    formats = sorted(_DATE_FORMATS,
+                     key=lambda fmt: -int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()))
+    best, best_count = None, -1
+    for fmt in formats:
+        parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+        count = int(parsed.notna().sum())
+        if count == filled:
+            return parsed
+        if count > best_count:
+            best, best_count = parsed, count
+    return best
+
+
+def parse_amounts(values):
+    """Valores em texto ('1.234,56', '-R$ 12,30', '1234.56') -> reais em float64 (também quando todos são inteiros)."""
+    text = pd.Series(values, dtype=str).str.replace(r'[R$\s]', '', regex=True)
+    brazilian = text.str.contains(',', regex=False)
+    text = text.where(~brazilian, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def to_transactions(chunk, mapping, default_category='Outros Gastos', card=None, negative_is_expense=True,
+                    default_income_category='Outras Entradas'):
+    """
+    Converte um bloco lido do arquivo para o schema de transações (valores em centavos, já no modelo em memória).
+    Sem coluna Tipo, o sinal do valor define Entrada/Gasto (`negative_is_expense`: extrato de conta usa
+    negativo para débitos; fatura de cartão costuma usar positivo para compras). Com `card`, todas as linhas
+    são lançadas como pagas com esse cartão. Linhas sem categoria recebem `default_category` (gastos)
+    ou `default_income_category` (entradas). Linhas sem data ou valor válidos são descartadas.
+    """
+    df = chunk.rename(columns=mapping)[[c for c in IMPORT_COLUMNS if c in mapping.values()]]
+    out = pd.DataFrame(index=df.index)
+    out['Data'] = parse_dates(df['Data']) if 'Data' in df.columns else pd.NaT
+    amounts = parse_amounts(df['Valor']) if 'Valor' in df.columns else pd.Series(np.nan, index=df.index)
+    if 'Tipo' in df.columns:
+        tipo = df['Tipo'].str.strip().str.capitalize()
+        out['Tipo'] = tipo.where(tipo.isin(['Entrada', 'Gasto']),
+                                 np.where((amounts < 0) == negative_is_expense, 'Gasto', 'Entrada'))
+    else:
+        out['Tipo'] = np.where((amounts < 0) == negative_is_expense, 'Gasto', 'Entrada')
+    defaults = np.where(out['Tipo'] == 'Entrada', default_income_category, default_category)
+    out['Categoria'] = (df['Categoria'].where(df['Categoria'].str.strip() != '', defaults) if 'Categoria' in df.columns
+                        else defaults)
+    out['Descrição'] = df['Descrição'].str.strip() if 'Descrição' in df.columns else ''
+    # valores em centavos (modelo em memória), convertidos explicitamente dos reais do arquivo
+    out['Valor'] = armazenamento.reais_to_cents(amounts.abs())
+    cards = df['Cartao'].replace('', np.nan) if 'Cartao' in df.columns else pd.Series(card, index=df.index, dtype=object)
+    if card is not None:
+        cards = cards.fillna(card)
+    paid_with_card = cards.notna()
+    out['PagoComCartao'] = paid_with_card.to_numpy()
+    out['Cartao'] = cards
+    for col in ('NumParcelas', 'ParcelaAtual'):
+        out[col] = pd.to_numeric(df[col], errors='coerce').where(paid_with_card) if col in df.columns else np.nan
+    out['GerouParcelas'] = False
+    # sem a coluna, o total da compra é estimado pela parcela x número de parcelas
+    total = (parse_amounts(df['TotalCompra']).abs() if 'TotalCompra' in df.columns
+             else (amounts.abs().round(2) * out['NumParcelas'].fillna(1)).where(paid_with_card))
+    out['TotalCompra'] = armazenamento.reais_to_cents(total)
+    out['Grupo'] = pd.NA
+    if 'Pessoa' in df.columns:
+        out['Pessoa'] = df['Pessoa'].str.strip().replace('', np.nan)
+    return out[out['Data'].notna() & out['Valor'].notna()]
+
+
+# --- Deduplicação ---
+def _row_keys(df):
+    """Hash de (Data, Valor em centavos, Descrição normalizada) de cada linha."""
+    keys = pd.DataFrame({
+        'Data': pd.to_datetime(df['Data']).to_numpy().astype('datetime64[D]').astype(np.int64),
+        # linhas importadas (to_transactions) e já gravadas: as duas em centavos
+        'Valor': pd.array(df['Valor'], dtype='Int64').to_numpy(dtype='float64', na_value=np.nan),
+        'Descrição': df['Descrição'].astype(str).str.strip().str.lower().to_numpy(),
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class _Deduplicator:
+    """
+    Descarta linhas já gravadas no perfil. Repetições legítimas (duas compras iguais no mesmo dia)
+    são preservadas: a n-ésima ocorrência de uma chave no arquivo só é descartada se o perfil
+    já tiver pelo menos n linhas com essa chave.
+    """
+
+    def __init__(self, existing):
+        self.existing = pd.Series(_row_keys(existing)).value_counts() if not existing.empty else pd.Series(dtype='int64')
+        self.seen = pd.Series(dtype='int64')
+
+    def new_rows(self, df):
+        if df.empty:
+            return np.zeros(0, dtype=bool)
+        keys = pd.Series(_row_keys(df))
+        occurrence = self.seen.reindex(keys).fillna(0).to_numpy() + keys.groupby(keys).cumcount().to_numpy()
+        self.seen = self.seen.add(keys.value_counts(), fill_value=0)
+        return occurrence >= self.existing.reindex(keys).fillna(0).to_numpy()
+
+
+def import_statement(source, profile, mapping=None, default_category='Outros Gastos', card=None,
+                     negative_is_expense=True, default_income_category='Outras Entradas', chunk_rows=CHUNK_ROWS,
+                     progress=None, backend=None):
+    """
+    Importa um extrato/fatura (CSV ou OFX) para `profile` (ou para o perfil da coluna Pessoa, quando mapeada).
+    `source`: caminho ou arquivo aberto; `mapping`: {coluna do arquivo: coluna do schema} (padrão: guess_mapping);
+    `progress(fração, linhas lidas)` é chamado a cada bloco.
+    Linhas cuja Pessoa não é um perfil cadastrado contam como inválidas (não criam arquivos de perfil novos).
+    Retorna dict com linhas lidas, importadas, duplicadas e inválidas, por perfil, pessoas desconhecidas,
+    tempo e linhas/s.
+    """
+    started = time.perf_counter()
+    ofx = is_ofx(source)
+    if ofx:
+        mapping = {'Data': 'Data', 'Valor': 'Valor', 'Descrição': 'Descrição'}
+    elif mapping is None:
+        mapping = guess_mapping(read_header(source))
+    statement = _Statement(source)
+    pending, dedupers = {}, {}
+    read = invalid = duplicates = 0
+    known_profiles, unknown_people = set(cadastros.load_profiles()) | {profile}, {}
+    try:
+        chunks = _ofx_chunks(statement.text, chunk_rows) if ofx else _csv_chunks(statement.text, chunk_rows)
+        for chunk in chunks:
+            read += len(chunk)
+            rows = to_transactions(chunk, mapping, default_category, card, negative_is_expense, default_income_category)
+            invalid += len(chunk) - len(rows)
+            people = rows.pop('Pessoa').fillna(profile) if 'Pessoa' in rows.columns else None
+            if people is not None:
+                unknown = ~people.isin(known_profiles)
+                if unknown.any():
+                    for person, count in people[unknown].value_counts(sort=False).items():
+                        unknown_people[person] = unknown_people.get(person, 0) + int(count)
+                    invalid += int(unknown.sum())
+                    rows, people = rows[~unknown], people[~unknown]
+            for person, person_rows in ([(profile, rows)] if people is None else rows.groupby(people, sort=False)):
+                if person not in dedupers:
+                    try:
+                        existing = armazenamento.load_transactions(person, backend)
+                    except FileNotFoundError:
+                        existing = armazenamento.empty_transactions()
+                    dedupers[person] = _Deduplicator(existing)
+                keep = dedupers[person].new_rows(person_rows)
+                duplicates += int((~keep).sum())
+                pending.setdefault(person, []).append(person_rows[keep])
+            if progress is not None:
+                progress(statement.fraction(), read)
+    finally:
+        statement.close()
+
+    # uma única gravação por perfil
+    imported = {}
+    for person, frames in pending.items():
+        rows = pd.concat(frames, ignore_index=True)
+        if not rows.empty:
+            armazenamento.append_transactions(rows, person, backend)
+        imported[person] = len(rows)
+    if progress is not None:
+        progress(1.0, read)
+    elapsed = time.perf_counter() - started
+    return {
+        'lidas': read,
+        'importadas': sum(imported.values()),
+        'duplicadas': duplicates,
+        'invalidas': invalid,
+        'por_perfil': imported,
+        'pessoas_desconhecidas': unknown_people,
+        'segundos': elapsed,
+        'linhas_por_segundo': read / elapsed if elapsed > 0 else float('inf'),
+    }
@@ -0,0 +1,84 @@
+"""
+Medição do tempo de cada etapa de um rerun (carga, filtro, agregação, diff do editor,
+gráficos, gravação), para descobrir onde o painel fica lento.
+
+    instrumentacao.start_rerun(enabled)
+    with instrumentacao.stage("resumos"):
+        ...
+    report = instrumentacao.finish_rerun()   # dict pronto para JSON (ou None se desligado)
+
+Desligado, stage() devolve sempre o mesmo contexto vazio: o custo é uma consulta a um
+atributo de thread-local por etapa. Ligado, cada rerun também é registrado como uma linha
+JSON no logger "gerenciamento_custos.tempos". Os registros são por thread (cada sessão do
+Streamlit roda o script na sua própria thread); etapas executadas em threads auxiliares
+(ex.: map_profiles) entram no tempo da etapa que as chamou.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+ENABLED_BY_DEFAULT = os.environ.get("INSTRUMENTACAO", "") == "1"
+
+logger = logging.getLogger("gerenciamento_custos.tempos")
+
+_local = threading.local()
+_NOOP = nullcontext()
+
+
+class _Stage:
+    __slots__ = ('records', 'name', 'level', 'start')
+
+    def __init__(self, records, name):
+        self.records = records
+        self.name = name
+
+    def __enter__(self):
+        self.level = getattr(_local, 'level', 0)
+        _local.level = self.level + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.level = self.level
+        self.records.append({'etapa': self.name, 'nivel': self.level, 'ms': round(elapsed * 1000, 3),
+                             'inicio_ms': round((self.start - _local.started) * 1000, 3)})
+        return False
+
+
+def start_rerun(enabled=ENABLED_BY_DEFAULT):
+    """Começa a medição de um rerun (ou a desliga, com enabled=False)."""
+    _local.records = [] if enabled else None
+    _local.level = 0
+    _local.started = time.perf_counter()
+    _local.started_at = datetime.now().isoformat(timespec='milliseconds')
+
+
+def stage(name):
+    """Contexto que mede a etapa `name` do rerun atual (vazio se a medição estiver desligada)."""
+    records = getattr(_local, 'records', None)
+    if records is None:
+        return _NOOP
+    return _Stage(records, name)
+
+
+def enabled():
+    return getattr(_local, 'records', None) is not None
+
+
+def finish_rerun(**extra):
+    """Encerra o rerun: devolve {'inicio', 'total_ms', 'etapas', ...} e registra no log (None se desligado)."""
+    records = getattr(_local, 'records', None)
+    if records is None:
+        return None
+    _local.records = None
+    report = {'inicio': _local.started_at, 'total_ms': round((time.perf_counter() - _local.started) * 1000, 3),
+              # etapas na ordem em que começaram (as internas terminam antes das externas)
+              'etapas': sorted(records, key=lambda r: r['inicio_ms'])}
+    report.update(extra)
+    logger.info(json.dumps(report, ensure_ascii=False))
+    return report
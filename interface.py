@@ -0,0 +1,949 @@
+"""
+Interface do app (tudo o que aparece depois do login).
+
+Importado por gerenciamento_custos.py só quando o usuário já está autenticado: a tela de
+login não paga a importação do pandas, dos módulos de dados nem a leitura de arquivos.
+O Plotly é importado apenas quando um gráfico é montado. A lógica de dados fica nos
+módulos de núcleo (armazenamento, resumos, parcelas, faturas, cadastros, ...), que não
+dependem do Streamlit e também são usados pelo modo relatório.
+"""
+import json
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+import alertas
+import armazenamento
+import busca
+import cache_dados
+import cache_graficos
+import cadastros
+import faturas
+import grupos
+import importacao
+import instrumentacao
+import paginacao
+import parcelas
+import previsao
+import resumos
+
+# perfis, categorias, cartões e metas: leitura/gravação em cadastros.py (também usada pelo modo relatório)
+from cadastros import (CATEGORIES_ENTRADA_FILE, CATEGORIES_GASTO_FILE, load_cards, load_categories_from_file,
+                       load_profiles, update_cards, update_categories, update_profiles)
+from persistencia import WriteConflict
+
+# Categorias separadas: relidas a cada rerun por load_category_lists() (só depois do login)
+CATEGORIAS_ENTRADA = []
+CATEGORIAS_GASTO = []
+TODAS_CATEGORIAS = []
+
+DEFAULT_CATEGORIAS_ENTRADA = ["Salário", "Outras Entradas"]
+DEFAULT_CATEGORIAS_GASTO = ["Aluguel", "Alimentação", "Combustível", "Água", "Luz", "Gás", "Condomínio", "Lazer", "Investimentos", "Outros Gastos"]
+
+def load_category_lists():
+    global CATEGORIAS_ENTRADA, CATEGORIAS_GASTO, TODAS_CATEGORIAS
+    CATEGORIAS_ENTRADA = load_categories_from_file(CATEGORIES_ENTRADA_FILE, DEFAULT_CATEGORIAS_ENTRADA)
+    CATEGORIAS_GASTO = load_categories_from_file(CATEGORIES_GASTO_FILE, DEFAULT_CATEGORIAS_GASTO)
+    TODAS_CATEGORIAS = CATEGORIAS_ENTRADA + CATEGORIAS_GASTO
+
+# --- Gerenciamento de metas (arquivo metas.json) ---
+def load_goals():
+    try:
+        return cadastros.load_goals()
+    except Exception as e:
+        st.warning(f"Não foi possível carregar metas: {e}")
+        return {}
+
+def update_goals(change):
+    """Relê as metas, aplica `change` e grava (sem apagar metas salvas por outra sessão). Retorna True se gravou."""
+    try:
+        cadastros.update_goals(change)
+        return True
+    except Exception as e:
+        st.warning(f"Não foi possível salvar metas: {e}")
+        return False
+
+# --- Função auxiliar: dividir valor em parcelas com centavos distribuídos ---
+def split_amount_into_installments(total_value, n_installments):
+    """
+    Divide total_value (float ou Decimal-compatível) em n_installments partes com 2 casas decimais,
+    garantindo que a soma das partes seja igual ao valor total (distribui os centavos extras nas primeiras parcelas).
+    Retorna lista de floats (comprimento n_installments). Para muitas compras de uma vez, ver parcelas.py.
+    """
+    return parcelas.installment_values(total_value, n_installments)
+
+# --- Funções de dados (transações) ---
+def hold_session_data(profiles):
+    """
+    Registra que esta sessão usa os cadastros e as transações de `profiles`: enquanto ela estiver
+    aberta, essas entradas do cache compartilhado (uma cópia por processo, para todas as sessões)
+    não são despejadas. As referências são devolvidas quando a sessão termina.
+    """
+    lease = st.session_state.get("_cache_lease")
+    if lease is None:
+        lease = st.session_state["_cache_lease"] = cache_dados.Lease()
+    for key in cadastros.cache_keys(profiles):
+        lease.hold(key)
+
+def load_data(profile):
+    """
+    Carrega as transações do perfil pelo backend de armazenamento configurado.
+    O arquivo só é relido quando muda (mtime/tamanho); caso contrário a versão em cache
+    é devolvida como visão somente-leitura.
+    """
+    try:
+        return armazenamento.load_transactions(profile)
+    except FileNotFoundError:
+        # colunas novas relacionadas a cartão adicionadas ao schema
+        return armazenamento.empty_transactions()
+    except Exception as e:
+        st.error(f"Erro ao carregar dados do perfil {profile}: {e}")
+        return pd.DataFrame()
+
+def save_data(df, profile, expected_version=None):
+    armazenamento.save_transactions(df, profile, expected_version=expected_version)
+
+def query_data(profiles, start_date, end_date, card=None):
+    """
+    Transações dos perfis no intervalo [start_date, end_date] (e do cartão, se informado),
+    com a coluna 'Pessoa'. No backend SQLite a consulta usa os índices e lê só o intervalo.
+    """
+    try:
+        with instrumentacao.stage("consulta (carga + filtro)"):
+            return armazenamento.query_transactions(profiles, start_date, end_date, card)
+    except Exception as e:
+        st.error(f"Erro ao consultar transações: {e}")
+        return armazenamento.empty_transactions().assign(Pessoa=pd.Series(dtype=object))
+
+def save_editor_changes(editor_key, df_source, profile=None):
+    """
+    Grava só as linhas inseridas, editadas ou excluídas no st.data_editor `editor_key`,
+    identificadas pelo ID (df_source: DataFrame completo exibido no editor, na mesma ordem).
+    Sem `profile`, cada linha vai para o perfil indicado na coluna 'Pessoa'.
+    As posições do editor se referem às linhas exibidas no rerun anterior (guardadas na sessão),
+    que podem diferir de df_source se outra sessão gravou no meio; se alguma linha editada ou
+    excluída mudou desde então, nada é gravado e o usuário é avisado (no rerun seguinte).
+    Retorna True se havia alterações.
+    """
+    shown_key = f"{editor_key}_exibido"
+    conflict_key = f"{editor_key}_conflito"
+    if conflict_key in st.session_state:
+        st.warning(st.session_state.pop(conflict_key))
+    editor_state = st.session_state.get(editor_key, {})
+    if not any(editor_state.get(k) for k in ('edited_rows', 'added_rows', 'deleted_rows')):
+        st.session_state[shown_key] = df_source
+        return False
+    shown = st.session_state.get(shown_key, df_source)
+    with instrumentacao.stage("diff do editor"):
+        upserts, deleted, originals = armazenamento.editor_changes(shown, editor_state)
+    try:
+        with instrumentacao.stage("gravação"):
+            skipped = armazenamento.save_changes(upserts, deleted, profile, expected=originals)
+    except WriteConflict as e:
+        st.session_state[conflict_key] = f"Alterações não salvas: {e} Confira os dados atualizados e refaça a edição."
+        skipped = 0
+    if skipped:
+        st.warning(f"{skipped} linha(s) nova(s) sem perfil (coluna Pessoa) foram ignoradas.")
+    # as posições registradas pelo editor não valem mais depois da gravação
+    del st.session_state[editor_key]
+    st.session_state.pop(shown_key, None)
+    return True
+
+def transactions_page(df, key_prefix):
+    """
+    Controles de busca (Descrição), ordenação e paginação da tabela de transações.
+    Retorna só a página escolhida (no máximo paginacao.MAX_PAGE_SIZE linhas), que é o que vai ao editor,
+    já no formato de exibição (valores em reais; ver armazenamento.display_frame).
+    """
+    sort_columns = [c for c in ['Data', 'Valor', 'Descrição', 'Categoria', 'Tipo', 'Cartao', 'Pessoa'] if c in df.columns]
+    col_busca, col_ordem, col_sentido, col_tamanho, col_pagina = st.columns([3, 2, 1, 1, 1])
+    search = col_busca.text_input("Buscar na descrição", key=f"{key_prefix}_busca")
+    sort_by = col_ordem.selectbox("Ordenar por", sort_columns, key=f"{key_prefix}_ordem")
+    ascending = col_sentido.selectbox("Sentido", ["Crescente", "Decrescente"], key=f"{key_prefix}_sentido") == "Crescente"
+    page_size = col_tamanho.selectbox("Linhas", paginacao.PAGE_SIZES, index=1, key=f"{key_prefix}_tamanho")
+    # a página é limitada ao total depois da busca (trocar o filtro não deixa a tabela vazia)
+    page = col_pagina.number_input("Página", min_value=1, step=1, key=f"{key_prefix}_pagina")
+    with instrumentacao.stage("paginação"):
+        df_page, total, n_pages = paginacao.page_frame(df, search, sort_by, ascending, page, page_size)
+    first = (min(page, n_pages) - 1) * page_size
+    st.caption(f"Linhas {first + 1 if total else 0}–{first + len(df_page)} de {total} · página {min(page, n_pages)} de {n_pages}")
+    return armazenamento.display_frame(df_page)
+
+def add_transaction(df, data, tipo, categoria, descricao, valor, profile,
+                    pago_com_cartao=False, cartao=None, num_parcelas=None, parcela_atual=None, gerar_parcelas=False):
+    """
+    Adiciona a transação ao dataframe. Se gerar_parcelas=True e num_parcelas>1,
+    gera automaticamente linhas adicionais com datas incrementadas mensalmente.
+    Ajustes:
+      - quando lançado com cartão parcelado, cada parcela recebe o valor = total / N (com centavos distribuídos)
+      - adiciona coluna 'TotalCompra' com o valor total da compra (quando aplicável)
+      - adiciona coluna 'Grupo' com um UUID para ligar parcelas da mesma compra
+    A gravação é feita por append: só as linhas novas (inclusive parcelas geradas) vão para o disco,
+    então o custo não depende do tamanho do histórico. `df` é mantido por compatibilidade (pode ser None);
+    o retorno é o histórico completo já atualizado (servido pelo cache).
+    """
+    # parcelas (valores em centavos e datas mês a mês) geradas pelo motor em lote de parcelas.py
+    new_rows = parcelas.generate_transactions({
+        'Data': [data], 'Tipo': [tipo], 'Categoria': [categoria], 'Descrição': [descricao], 'Valor': [valor],
+        'PagoComCartao': [bool(pago_com_cartao)], 'Cartao': [cartao if pago_com_cartao else pd.NA],
+        'NumParcelas': [num_parcelas], 'ParcelaAtual': [parcela_atual], 'GerarParcelas': [bool(gerar_parcelas)],
+    })
+
+    # Observação: se o usuário NÃO optou por gerar_parcelas, registramos apenas a parcela atual com o valor da parcela (não duplicamos o total).
+    armazenamento.append_transactions(new_rows, profile)
+    return load_data(profile)
+
+# --- Funções de Gráficos ---
+# cache_key: (versão dos dados, filtros, ...) — com a mesma chave a figura do rerun anterior é reaproveitada.
+# O Plotly só é importado dentro de build(), quando algum gráfico é de fato montado.
+def show_figure(name, key, build):
+    with instrumentacao.stage(f"gráfico: {name}"):
+        st.plotly_chart(cache_graficos.get_figure(key, build), use_container_width=True)
+
+def plot_trend_chart(df, title="Tendência de Gastos e Entradas", cache_key=None):
+    if df.empty:
+        st.info("Sem dados para exibir o gráfico de tendência.")
+        return
+
+    def build():
+        import plotly.express as px
+
+        # aceita transações ou resumos mensais (que já trazem 'Ano-Mês')
+        df_local = df if 'Ano-Mês' in df.columns else df.assign(**{'Ano-Mês': pd.to_datetime(df['Data']).dt.to_period('M').astype(str)})
+        grouped = df_local.groupby(['Ano-Mês', 'Tipo'])['Valor'].sum().reset_index()
+        fig = px.line(grouped, x='Ano-Mês', y='Valor', color='Tipo', markers=True, title=title)
+        fig.update_layout(xaxis_title="Mês", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('tendencia', title, cache_key)
+    show_figure(title, key, build)
+
+def plot_daily_chart(df, title="Movimentação Diária", cache_key=None):
+    """Série diária por Tipo, reduzida no servidor a no máximo paginacao.MAX_CHART_POINTS pontos por série."""
+    if df.empty:
+        st.info("Sem dados para exibir a série diária.")
+        return
+
+    def build():
+        import plotly.express as px
+
+        daily = df.groupby([pd.to_datetime(df['Data']).dt.normalize(), 'Tipo'], observed=True)['Valor'].sum().reset_index()
+        daily['Valor'] = armazenamento.to_reais(daily['Valor'])
+        daily = paginacao.downsample(daily, 'Data', 'Valor', by='Tipo')
+        fig = px.line(daily, x='Data', y='Valor', color='Tipo', title=title)
+        fig.update_layout(xaxis_title="Dia", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('diario', title, cache_key)
+    show_figure(title, key, build)
+
+def plot_category_chart(df, title="Distribuição por Categoria", cache_key=None):
+    if df.empty:
+        st.info("Sem dados para exibir a distribuição de categorias.")
+        return
+
+    def build():
+        import plotly.express as px
+
+        grouped = df.groupby('Categoria')['Valor'].sum().reset_index().sort_values('Valor', ascending=False)
+        fig = px.bar(grouped, x='Categoria', y='Valor', text_auto=True, title=title)
+        fig.update_layout(xaxis_title="", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('categorias', title, cache_key)
+    show_figure(title, key, build)
+
+def plot_profile_comparison(df_all, cache_key=None):
+    if df_all.empty:
+        st.info("Sem dados para comparação de perfis.")
+        return
+    if 'Pessoa' not in df_all.columns:
+        st.info("Dados não contém informação de perfil para comparação.")
+        return
+
+    def build():
+        import plotly.express as px
+
+        grouped = df_all.groupby(['Pessoa', 'Tipo'], observed=True)['Valor'].sum().reset_index()
+        fig = px.bar(grouped, x='Pessoa', y='Valor', color='Tipo', barmode='group', title="Comparativo de Entradas e Gastos por Perfil")
+        fig.update_layout(template="plotly_white", yaxis_title="Valor (R$)")
+        return fig
+    key = None if cache_key is None else ('comparativo', cache_key)
+    show_figure("Comparativo entre Perfis", key, build)
+
+# Novas funções de plot para metas
+def plot_spending_vs_goal(resumo_df, meta_gasto, profile, cache_key=None):
+    """
+    resumo_df: DataFrame com índice 'Ano-Mês' e colunas 'Entrada' e 'Gasto' (já calculado)
+    meta_gasto: float ou None
+    """
+    if resumo_df.empty:
+        st.info("Sem dados para exibir comparação com meta.")
+        return
+    dfp = resumo_df.reset_index().copy()
+    dfp = dfp.sort_values('Ano-Mês')
+
+    def build():
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=dfp['Ano-Mês'], y=dfp.get('Gasto', 0), mode='lines+markers', name='Gasto', line=dict(color='crimson')))
+        if meta_gasto is not None:
+            fig.add_trace(go.Scatter(x=dfp['Ano-Mês'], y=[meta_gasto]*len(dfp), mode='lines', name='Meta Gasto', line=dict(color='black', dash='dash')))
+        fig.update_layout(title=f"Gastos x Meta - {profile}", xaxis_title="Mês", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('meta_gasto', profile, meta_gasto, cache_key)
+    show_figure(f"Gastos x Meta - {profile}", key, build)
+
+    # resumo textual
+    if meta_gasto is not None:
+        dfp['Excedeu'] = dfp['Gasto'] > meta_gasto
+        excedeu_count = dfp['Excedeu'].sum()
+        st.write(f"{excedeu_count} mês(es) superaram a meta de gasto.")
+
+def plot_sobra_vs_goal(resumo_df, meta_sobra_percent, profile, cache_key=None):
+    """
+    mostra a sobra (Entrada - Gasto) e a meta de sobra (meta_percent% da Entrada) por mês.
+    """
+    if resumo_df.empty:
+        st.info("Sem dados para exibir comparação de sobra com meta.")
+        return
+    dfp = resumo_df.reset_index().copy()
+    dfp = dfp.sort_values('Ano-Mês')
+    dfp['Sobra'] = dfp.get('Entrada', 0) - dfp.get('Gasto', 0)
+    if meta_sobra_percent is not None:
+        dfp['MetaSobra'] = dfp.get('Entrada', 0) * (meta_sobra_percent / 100.0)
+
+    def build():
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=dfp['Ano-Mês'], y=dfp['Sobra'], mode='lines+markers', name='Sobra (Entrada - Gasto)', line=dict(color='green')))
+        if meta_sobra_percent is not None:
+            fig.add_trace(go.Scatter(x=dfp['Ano-Mês'], y=dfp['MetaSobra'], mode='lines', name=f'Meta Sobra ({meta_sobra_percent}%)', line=dict(color='black', dash='dash')))
+        fig.update_layout(title=f"Sobra x Meta de Sobra - {profile}", xaxis_title="Mês", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('meta_sobra', profile, meta_sobra_percent, cache_key)
+    show_figure(f"Sobra x Meta - {profile}", key, build)
+
+    # resumo textual
+    if meta_sobra_percent is not None:
+        dfp['AtingiuSobra'] = dfp['Sobra'] >= dfp['MetaSobra']
+        atingiu_count = dfp['AtingiuSobra'].sum()
+        st.write(f"{atingiu_count} mês(es) atingiram a meta de sobra ({meta_sobra_percent}%).")
+
+def plot_forecast_chart(previsao_df, title="Saldo Acumulado Previsto", cache_key=None):
+    if previsao_df.empty:
+        st.info("Sem dados para exibir a previsão.")
+        return
+
+    def build():
+        import plotly.express as px
+
+        fig = px.line(previsao_df, x='Ano-Mês', y='SaldoAcumulado', color='Perfil', markers=True, title=title)
+        fig.update_layout(xaxis_title="Mês", yaxis_title="Valor (R$)", template="plotly_white")
+        return fig
+    key = None if cache_key is None else ('previsao', title, cache_key)
+    show_figure(title, key, build)
+
+# --- Previsão de fluxo de caixa (parcelas futuras + recorrentes) ---
+def forecast_section(profiles, key):
+    st.subheader("🔮 Previsão de Fluxo de Caixa")
+    months = st.number_input("Meses à frente", min_value=1, max_value=previsao.MAX_MONTHS,
+                             value=previsao.DEFAULT_MONTHS, step=1, key=f"previsao_meses_{key}")
+    with instrumentacao.stage("previsão"):
+        previsto = previsao.forecast(profiles, int(months), goals=load_goals())
+    st.caption("Parcelas já lançadas e restantes, lançamentos agendados e recorrentes "
+               f"(categorias presentes em {previsao.MIN_RECURRING_MONTHS} dos últimos {previsao.LOOKBACK_MONTHS} meses).")
+    plot_forecast_chart(previsto, title=f"Saldo Acumulado Previsto ({int(months)} meses)",
+                        cache_key=(armazenamento.data_version(profiles), int(months), date.today(), key))
+    st.dataframe(previsto, use_container_width=True, hide_index=True, column_config={
+        column: st.column_config.NumberColumn(format="R$ %.2f")
+        for column in ['Entrada', 'Gasto', 'Parcelas', 'Saldo', 'SaldoAcumulado', 'MetaGasto']})
+    with st.expander("Lançamentos recorrentes detectados"):
+        st.dataframe(previsao.recurring(profiles), use_container_width=True, hide_index=True,
+                     column_config={"ValorMensal": st.column_config.NumberColumn("Valor Mensal (R$)", format="R$ %.2f")})
+
+# --- Interface Principal ---
+def main():
+    st.title("💳 Gerenciamento de Custos Pessoais (com Cartões)")
+
+    # medição por etapa: desligada, o custo é desprezível (ver instrumentacao.py)
+    instrumentacao.start_rerun(st.sidebar.checkbox("⏱️ Medir tempos (diagnóstico)", value=instrumentacao.ENABLED_BY_DEFAULT,
+                                                   key="diagnostico_tempos"))
+    with instrumentacao.stage("cadastros"):
+        load_category_lists()
+        profiles = load_profiles()
+        cards_df = load_cards()
+        hold_session_data(profiles)
+    with instrumentacao.stage("alertas"):
+        alerts_section(profiles, cards_df)
+    tab_titles = ["Análise Geral"] + profiles + ["Gerenciamento de Perfis", "Gerenciamento de Categorias", "Gerenciamento de Cartões"]
+    views = ([lambda: general_analysis_tab(profiles)]
+             + [lambda profile=profile: profile_tab(profile) for profile in profiles]
+             + [manage_profiles_tab, manage_categories_tab, manage_cards_tab])
+    try:
+        # só a aba aberta é montada (carrega dados e gera gráficos); trocar de aba provoca um rerun
+        tabs = st.tabs(tab_titles, key="aba_ativa", on_change="rerun")
+    except TypeError:
+        # versões do Streamlit sem abas sob demanda: todas as abas são montadas
+        tabs = st.tabs(tab_titles)
+
+    for title, tab, render in zip(tab_titles, tabs, views):
+        # .open é None quando o Streamlit não acompanha a aba ativa
+        if tab.open is False:
+            continue
+        with tab, instrumentacao.stage(f"aba: {title}"):
+            render()
+
+    report = instrumentacao.finish_rerun(aba=st.session_state.get("aba_ativa"))
+    if report is not None:
+        timing_panel(report)
+
+# --- Painel de diagnóstico (tempos por etapa) ---
+MAX_TIMING_HISTORY = 50
+
+def timing_panel(report):
+    history = st.session_state.setdefault("tempos_reruns", [])
+    history.append(report)
+    del history[:-MAX_TIMING_HISTORY]
+    with st.sidebar.expander(f"⏱️ Último rerun: {report['total_ms']:.0f} ms", expanded=True):
+        etapas = pd.DataFrame(report['etapas'], columns=['etapa', 'nivel', 'ms', 'inicio_ms'])
+        etapas['etapa'] = ["\u2003" * nivel + etapa for etapa, nivel in zip(etapas['etapa'], etapas['nivel'])]
+        st.dataframe(etapas[['etapa', 'ms']], hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Exportar tempos (JSON)", data=json.dumps(history, ensure_ascii=False, indent=2),
+                           file_name="tempos_reruns.json", mime="application/json", key="exportar_tempos")
+
+# --- Alertas (config_alertas.txt e metas) ---
+def alerts_section(profiles, cards_df):
+    # avaliados a partir de estruturas incrementais: o custo não cresce com o histórico
+    try:
+        alerts = alertas.evaluate(profiles, load_goals(), cards_df)
+    except Exception as e:
+        st.sidebar.warning(f"Não foi possível avaliar os alertas: {e}")
+        return
+    with st.sidebar.expander(f"🔔 Alertas ({len(alerts)})", expanded=not alerts.empty):
+        if alerts.empty:
+            st.write("Nenhum alerta no momento.")
+        for alert in alerts.itertuples(index=False):
+            profile = f"{alert.Perfil}: " if isinstance(alert.Perfil, str) else ""
+            st.warning(f"**{alert.Alerta}** — {profile}{alert.Mensagem}")
+
+# --- Análise Geral ---
+def general_analysis_tab(profiles):
+    st.header("📊 Análise Geral de Todos os Perfis")
+
+    min_date, max_date = armazenamento.date_bounds(profiles)
+    if min_date is None:
+        st.info("Nenhuma transação cadastrada.")
+        return
+
+    # --- Filtros ---
+    st.sidebar.subheader("Filtros - Análise Geral")
+    start_date = st.sidebar.date_input("Data Inicial", min_date if pd.notna(min_date) else date.today())
+    end_date = st.sidebar.date_input("Data Final", max_date if pd.notna(max_date) else date.today())
+    # filtro por cartão opcional
+    cards_df = load_cards()
+    card_options = ['Todos'] + cards_df['Nome'].tolist() if not cards_df.empty else ['Todos']
+    selected_card = st.sidebar.selectbox("Filtrar por Cartão (opcional)", card_options)
+    card_filter = None if selected_card == 'Todos' else selected_card
+    df_filtered = query_data(profiles, start_date, end_date, card_filter)
+
+    st.write(f"Período selecionado: **{start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}**")
+
+    # --- Tabela primeiro ---
+    st.subheader("🧾 Tabela de Transações (Edição e Exclusão)")
+
+    # mostrar colunas adicionais relacionadas a cartão, incluindo TotalCompra e Grupo (apenas leitura)
+    cols_to_show = [c for c in df_filtered.columns if c in ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor', 'PagoComCartao', 'Cartao', 'NumParcelas', 'ParcelaAtual', 'TotalCompra', 'Grupo']]
+    column_config = {
+        "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+        "Tipo": st.column_config.SelectboxColumn("Tipo", options=['Entrada', 'Gasto']),
+        "Categoria": st.column_config.SelectboxColumn("Categoria", options=TODAS_CATEGORIAS),
+        "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+        "TotalCompra": st.column_config.NumberColumn("TotalCompra (R$)", format="R$ %.2f", disabled=True),
+        "Grupo": st.column_config.TextColumn("Grupo", disabled=True),
+        "Pessoa": st.column_config.SelectboxColumn("Pessoa", options=profiles),
+        "ID": None,  # oculto: identifica a linha ao salvar
+    }
+
+    # só a página atual vai ao navegador; as posições do editor são relativas a ela
+    df_page = transactions_page(df_filtered, "tabela_geral")
+    st.data_editor(
+        df_page[cols_to_show + ['ID', 'Pessoa']],
+        key="data_editor_geral",
+        use_container_width=True,
+        num_rows="dynamic",
+        column_config=column_config
+    )
+
+    # salvar de volta só as linhas alteradas, no perfil de cada uma (linhas fora do filtro não são tocadas)
+    if save_editor_changes("data_editor_geral", df_page):
+        st.success("Transações atualizadas com sucesso!")
+        st.rerun()
+
+    st.markdown("---")
+    search_section(profiles, start_date, end_date)
+
+    # --- Gráficos depois ---
+
+    # --- Resumo Financeiro ---
+    # métricas e gráficos vêm dos resumos mensais (não reagregam todas as transações)
+    with instrumentacao.stage("resumos (agregação)"):
+        resumo_periodo = resumos.summary_for_window(profiles, start_date, end_date, card_filter)
+    # gráficos só são remontados quando os dados ou os filtros mudam
+    chart_key = (armazenamento.data_version(profiles), start_date, end_date, card_filter)
+    if not resumo_periodo.empty:
+        entrada_total = resumo_periodo[resumo_periodo['Tipo'] == 'Entrada']['Valor'].sum()
+        gasto_total = resumo_periodo[resumo_periodo['Tipo'] == 'Gasto']['Valor'].sum()
+        saldo_total = entrada_total - gasto_total
+
+        st.markdown("---")
+        st.subheader("Resumo Financeiro")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total de Entradas", f"R$ {entrada_total:,.2f}")
+        col2.metric("Total de Gastos", f"R$ {gasto_total:,.2f}")
+        col3.metric("Saldo", f"R$ {saldo_total:,.2f}")
+        st.markdown("---")
+        st.subheader("📈 Gráfico de Tendência")
+        plot_trend_chart(resumo_periodo, cache_key=chart_key)
+
+        st.subheader("🍕 Distribuição de Gastos por Categoria")
+        plot_category_chart(resumo_periodo[resumo_periodo['Tipo'] == 'Gasto'], cache_key=chart_key)
+
+        st.subheader("👥 Comparativo entre Perfis")
+        plot_profile_comparison(resumo_periodo, cache_key=chart_key)
+
+    st.markdown("---")
+    forecast_section(profiles, "geral")
+
+# --- Busca nas descrições (índice invertido + facetas) ---
+def search_section(profiles, start_date, end_date):
+    st.subheader("🔎 Busca nas Descrições")
+    text = st.text_input("Palavras da descrição (sem diferenciar acentos; \"farm\" acha \"Farmácia\")", key="busca_texto")
+    facet_names = {'Categoria': "Categoria", 'Cartao': "Cartão", 'Tipo': "Tipo", 'Pessoa': "Pessoa"}
+    # os filtros escolhidos no rerun anterior entram na busca; as opções mostram as contagens novas
+    filters = {facet: st.session_state.get(f"busca_{facet}", []) for facet in busca.FACETS}
+    with instrumentacao.stage("busca"):
+        resultado = busca.search(profiles, text, filters, start_date, end_date, limit=paginacao.MAX_PAGE_SIZE)
+    for column, facet in zip(st.columns(len(busca.FACETS)), busca.FACETS):
+        counts = resultado.facetas[facet]
+        options = list(counts.index) + [value for value in filters[facet] if value not in counts.index]
+        column.multiselect(facet_names[facet], options, key=f"busca_{facet}",
+                           format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})")
+    shown = f" · mostrando as {len(resultado.linhas)} mais recentes" if resultado.total > len(resultado.linhas) else ""
+    st.caption(f"{resultado.total} transações encontradas no período{shown}")
+    if resultado.total:
+        rows = armazenamento.display_frame(resultado.linhas)
+        st.dataframe(rows[['Data', 'Pessoa', 'Tipo', 'Categoria', 'Descrição', 'Valor', 'Cartao']],
+                     use_container_width=True, hide_index=True, column_config={
+                         "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                         "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f")})
+
+# --- Importação em lote ---
+def import_statement_section(profile, card_names):
+    """Importa um extrato bancário ou fatura de cartão (CSV/OFX) inteiro para o perfil, numa única gravação."""
+    with st.sidebar.expander("📥 Importar extrato (CSV/OFX)"):
+        uploaded = st.file_uploader("Arquivo do extrato", type=['csv', 'ofx', 'txt'], key=f"import_file_{profile}")
+        if uploaded is None:
+            return
+        mapping = None
+        if not importacao.is_ofx(uploaded):
+            header = importacao.read_header(uploaded)
+            guessed = {target: source for source, target in importacao.guess_mapping(header).items()}
+            st.caption("Colunas do arquivo para cada campo:")
+            mapping = {}
+            options = ['(não importar)'] + header
+            for target in importacao.IMPORT_COLUMNS:
+                source = st.selectbox(target, options, index=options.index(guessed.get(target, '(não importar)')),
+                                      key=f"import_map_{profile}_{target}")
+                if source != '(não importar)':
+                    mapping[source] = target
+        card = st.selectbox("Fatura do cartão", ['Nenhum (extrato de conta)'] + card_names,
+                            key=f"import_card_{profile}")
+        negative = st.radio("Valores negativos são", ["Gastos", "Entradas"], horizontal=True,
+                            key=f"import_sign_{profile}")
+        default_category = st.selectbox("Categoria para gastos sem categoria", CATEGORIAS_GASTO,
+                                        index=len(CATEGORIAS_GASTO) - 1, key=f"import_category_{profile}")
+        default_income = st.selectbox("Categoria para entradas sem categoria", CATEGORIAS_ENTRADA,
+                                      index=len(CATEGORIAS_ENTRADA) - 1, key=f"import_income_{profile}")
+        if not st.button("Importar", key=f"import_button_{profile}"):
+            return
+        if mapping is not None and not {'Data', 'Valor'} <= set(mapping.values()):
+            st.warning("Mapeie ao menos as colunas Data e Valor.")
+            return
+        bar = st.progress(0.0, text="Lendo arquivo...")
+        try:
+            result = importacao.import_statement(
+                uploaded, profile, mapping=mapping, default_category=default_category,
+                card=None if card.startswith('Nenhum') else card, negative_is_expense=(negative == "Gastos"),
+                default_income_category=default_income,
+                progress=lambda fraction, rows: bar.progress(fraction, text=f"{rows:,} linhas lidas"))
+        except Exception as e:
+            st.error(f"Erro ao importar o extrato: {e}")
+            return
+        st.success(f"{result['importadas']:,} transações importadas ({result['duplicadas']:,} já existentes e "
+                   f"{result['invalidas']:,} inválidas ignoradas): {result['lidas']:,} linhas em "
+                   f"{result['segundos']:.1f}s ({result['linhas_por_segundo']:,.0f} linhas/s).")
+        if result['pessoas_desconhecidas']:
+            st.warning("Linhas ignoradas por Pessoa sem perfil cadastrado: " + ", ".join(
+                f"{person} ({count:,})" for person, count in result['pessoas_desconhecidas'].items()))
+
+# --- Aba de Perfil ---
+def profile_tab(profile):
+    st.header(f"👤 Perfil: {profile}")
+
+    min_date, max_date = armazenamento.date_bounds([profile])
+
+    # carregar metas para este perfil
+    goals = load_goals()
+    profile_goals = goals.get(profile, {})
+    meta_gasto_default = profile_goals.get('meta_gasto', None)
+    meta_sobra_percent_default = profile_goals.get('meta_sobra_percent', None)
+
+    st.sidebar.header(f"Adicionar Transação ({profile})")
+    tipo = st.sidebar.selectbox("Tipo", ["Entrada", "Gasto"], key=f"tipo_select_{profile}")
+
+    # Carregar cartões para seleção
+    cards_df = load_cards()
+    card_names = cards_df['Nome'].tolist() if not cards_df.empty else []
+
+    with st.sidebar.form(f"add_transaction_form_{profile}"):
+        data = st.date_input("Data", value=pd.to_datetime(date.today()).date())
+        categorias_filtradas = CATEGORIAS_ENTRADA if tipo == "Entrada" else CATEGORIAS_GASTO
+        categoria = st.selectbox("Categoria", categorias_filtradas, key=f"categoria_select_{profile}")
+        descricao = st.text_input("Descrição")
+        valor = st.number_input("Valor (R$)", min_value=0.0, step=10.0)
+
+        pago_com_cartao = st.checkbox("Pago com cartão de crédito?", key=f"pago_cartao_{profile}")
+        cartao = None
+        num_parcelas = None
+        parcela_atual = None
+        gerar_parcelas = False
+        if pago_com_cartao:
+            if card_names:
+                cartao = st.selectbox("Cartão utilizado", ['Selecione'] + card_names, key=f"cartao_select_{profile}")
+                if cartao == 'Selecione':
+                    cartao = None
+                num_parcelas = st.number_input("Número de parcelas (1 para à vista)", min_value=1, step=1, key=f"num_parcelas_{profile}")
+                parcela_atual = st.number_input("Parcela atual (ex: 1)", min_value=1, max_value=int(num_parcelas) if num_parcelas else 1, value=1, step=1, key=f"parcela_atual_{profile}")
+                gerar_parcelas = st.checkbox("Gerar automaticamente lançamentos das parcelas futuras?", key=f"gerar_parcelas_{profile}")
+            else:
+                st.info("Nenhum cartão cadastrado. Cadastre um cartão na aba 'Gerenciamento de Cartões' antes de usar esta opção.")
+
+        submitted = st.form_submit_button("Adicionar")
+        if submitted:
+            # validações básicas
+            if pago_com_cartao and not cartao:
+                st.warning("Selecione um cartão válido ou desmarque 'Pago com cartão'.")
+            else:
+                add_transaction(None, data, tipo, categoria, descricao, valor, profile,
+                                pago_com_cartao, cartao, num_parcelas, parcela_atual, gerar_parcelas)
+                st.success("Transação adicionada com sucesso!")
+                st.rerun()
+
+    # --- Metas (form separado) ---
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("Metas (mensal)")
+
+    with st.sidebar.form(f"metas_form_{profile}"):
+        meta_gasto = st.number_input("Meta de Gastos mensal (R$)", min_value=0.0, step=10.0, value=float(meta_gasto_default) if pd.notna(meta_gasto_default) else 0.0)
+        meta_sobra_percent = st.number_input("Meta de sobra (% da entrada)", min_value=0.0, max_value=100.0, step=1.0, value=float(meta_sobra_percent_default) if pd.notna(meta_sobra_percent_default) else 0.0)
+        save_meta = st.form_submit_button("Salvar Metas")
+        if save_meta:
+            profile_goals = {
+                'meta_gasto': float(meta_gasto),
+                'meta_sobra_percent': float(meta_sobra_percent)
+            }
+            if update_goals(lambda goals: {**goals, profile: profile_goals}):
+                st.success("Metas salvas.")
+                st.rerun()
+
+    # --- Importação de extrato (CSV/OFX) ---
+    st.sidebar.markdown("---")
+    import_statement_section(profile, card_names)
+
+    if min_date is None:
+        st.info("Nenhuma transação neste perfil.")
+        return
+
+    # --- Filtros de data ---
+    st.subheader("📅 Filtros de Análise")
+    start_date = st.date_input("Data Inicial", min_date, key=f"start_{profile}")
+    end_date = st.date_input("Data Final", max_date, key=f"end_{profile}")
+    df_filtered = query_data([profile], start_date, end_date).drop(columns=['Pessoa'])
+
+    # --- Tabela primeiro ---
+    st.subheader("🧾 Tabela de Transações")
+
+    cols_to_show = [c for c in df_filtered.columns if c in ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor', 'PagoComCartao', 'Cartao', 'NumParcelas', 'ParcelaAtual', 'TotalCompra', 'Grupo']]
+    column_config = {
+        "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+        "Tipo": st.column_config.SelectboxColumn("Tipo", options=['Entrada', 'Gasto']),
+        "Categoria": st.column_config.SelectboxColumn("Categoria", options=TODAS_CATEGORIAS),
+        "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+        "TotalCompra": st.column_config.NumberColumn("TotalCompra (R$)", format="R$ %.2f", disabled=True),
+        "Grupo": st.column_config.TextColumn("Grupo", disabled=True),
+        "ID": None,  # oculto: identifica a linha ao salvar
+    }
+    df_page = transactions_page(df_filtered, f"tabela_{profile}")
+    st.data_editor(
+        df_page[cols_to_show + ['ID']],
+        key=f"data_editor_{profile}",
+        use_container_width=True,
+        num_rows="dynamic",
+        column_config=column_config
+    )
+
+    if save_editor_changes(f"data_editor_{profile}", df_page, profile):
+        st.success("Transações atualizadas com sucesso!")
+        st.rerun()
+
+    st.download_button("⬇️ Exportar CSV", data=lambda: armazenamento.export_csv(profile),
+                       file_name=f"{profile}_{armazenamento.DATA_FILE}", mime="text/csv",
+                       key=f"export_csv_{profile}")
+    installment_groups_section(profile)
+
+    # --- Gráficos depois ---
+
+    # --- Resumo Financeiro ---
+    with instrumentacao.stage("resumos (agregação)"):
+        resumo_periodo = resumos.summary_for_window([profile], start_date, end_date)
+    chart_key = (armazenamento.data_version([profile]), start_date, end_date)
+    if not resumo_periodo.empty:
+        entrada_total = resumo_periodo[resumo_periodo['Tipo'] == 'Entrada']['Valor'].sum()
+        gasto_total = resumo_periodo[resumo_periodo['Tipo'] == 'Gasto']['Valor'].sum()
+        saldo_total = entrada_total - gasto_total
+
+        st.markdown("---")
+        st.subheader("Resumo Financeiro")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total de Entradas", f"R$ {entrada_total:,.2f}")
+        col2.metric("Total de Gastos", f"R$ {gasto_total:,.2f}")
+        col3.metric("Saldo", f"R$ {saldo_total:,.2f}")
+        st.markdown("---")
+        st.subheader("📈 Tendência de Gastos e Entradas")
+        plot_trend_chart(resumo_periodo, title=f"Tendência - {profile}", cache_key=chart_key)
+        if st.checkbox("Mostrar série diária", key=f"serie_diaria_{profile}"):
+            plot_daily_chart(df_filtered, title=f"Movimentação Diária - {profile}", cache_key=chart_key)
+
+        st.subheader("🍕 Gastos por Categoria")
+        plot_category_chart(resumo_periodo[resumo_periodo['Tipo'] == 'Gasto'], title=f"Distribuição de Gastos - {profile}", cache_key=chart_key)
+
+        # --- Resumo mensal para metas e gráficos de comparação ---
+        resumo = resumos.monthly_summary(resumo_periodo)
+
+        st.subheader("📊 Resumo Mensal")
+        st.dataframe(resumo)
+
+        # carregar metas atuais (após possível edição)
+        goals = load_goals()
+        profile_goals = goals.get(profile, {})
+        meta_gasto_val = profile_goals.get('meta_gasto', None)
+        meta_sobra_percent_val = profile_goals.get('meta_sobra_percent', None)
+
+        # mostrar metas atuais
+        with st.expander("Metas atuais"):
+            st.write(f"Meta de Gastos mensal: R$ {meta_gasto_val if pd.notna(meta_gasto_val) else 'Não definida'}")
+            st.write(f"Meta de sobra: {meta_sobra_percent_val if pd.notna(meta_sobra_percent_val) else 'Não definida'} % da entrada")
+
+        # gráficos de comparação com metas
+        plot_spending_vs_goal(resumo, meta_gasto_val if pd.notna(meta_gasto_val) else None, profile, cache_key=chart_key)
+        plot_sobra_vs_goal(resumo, meta_sobra_percent_val if pd.notna(meta_sobra_percent_val) else None, profile, cache_key=chart_key)
+
+    st.markdown("---")
+    forecast_section([profile], profile)
+
+# --- Compras parceladas (operações sobre um Grupo inteiro) ---
+def installment_groups_section(profile):
+    with instrumentacao.stage("compras parceladas"):
+        summary = grupos.group_summary(profile)
+    if summary.empty:
+        return
+    with st.expander(f"💳 Compras Parceladas ({int((summary['Restantes'] > 0).sum())} em aberto)"):
+        # resultado da operação do rerun anterior (a gravação é seguida de st.rerun)
+        message = st.session_state.pop(f"grupo_msg_{profile}", None)
+        if message:
+            st.success(message)
+        if not st.checkbox("Mostrar compras quitadas", key=f"grupos_quitadas_{profile}"):
+            summary = summary[summary['Restantes'] > 0]
+        summary = summary.sort_values('PrimeiraData', ascending=False).head(paginacao.MAX_PAGE_SIZE)
+        st.dataframe(summary.drop(columns=['Grupo']), use_container_width=True, hide_index=True, column_config={
+            "TotalCompra": st.column_config.NumberColumn("Total (R$)", format="R$ %.2f"),
+            "ValorRestante": st.column_config.NumberColumn("Restante (R$)", format="R$ %.2f"),
+            "PrimeiraData": st.column_config.DateColumn("Primeira", format="DD/MM/YYYY"),
+            "UltimaData": st.column_config.DateColumn("Última", format="DD/MM/YYYY"),
+        })
+        if summary.empty:
+            return
+        labels = {row.Grupo: f"{row.Descrição} — {row.Pagas}/{row.NumParcelas} pagas — R$ {row.TotalCompra:,.2f} ({row.PrimeiraData:%d/%m/%Y})"
+                  for row in summary.itertuples(index=False)}
+        grupo = st.selectbox("Compra", list(labels), format_func=labels.get, key=f"grupo_{profile}")
+        rows = grupos.group_rows(profile, grupo)
+        st.dataframe(armazenamento.display_frame(rows)[['Data', 'Descrição', 'Valor', 'ParcelaAtual', 'NumParcelas', 'TotalCompra']],
+                     use_container_width=True, hide_index=True, column_config={
+                         "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                         "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+                         "TotalCompra": st.column_config.NumberColumn("TotalCompra (R$)", format="R$ %.2f")})
+        selected = summary.set_index('Grupo').loc[grupo]
+        total_atual = float(selected['TotalCompra']) if pd.notna(selected['TotalCompra']) else 0.0
+        n_parcelas = int(selected['NumParcelas'])
+
+        col_total, col_cancelar, col_antecipar = st.columns(3)
+        novo_total = col_total.number_input("Novo total (R$)", min_value=0.0, value=total_atual,
+                                            step=10.0, key=f"grupo_total_{profile}")
+        if n_parcelas > 0:
+            col_total.caption(f"{n_parcelas}x de R$ {split_amount_into_installments(novo_total, n_parcelas)[-1]:,.2f}")
+        redividir = col_total.button("Redividir parcelas", key=f"grupo_redividir_{profile}")
+        cancelar = col_cancelar.button("Cancelar parcelas futuras", key=f"grupo_cancelar_{profile}")
+        data_antecipacao = col_antecipar.date_input("Antecipar para", value=date.today(), key=f"grupo_data_{profile}")
+        valor_antecipacao = col_antecipar.number_input("Valor pago (R$, 0 = sem desconto)", min_value=0.0, step=10.0,
+                                                       key=f"grupo_valor_{profile}")
+        antecipar = col_antecipar.button("Antecipar parcelas", key=f"grupo_antecipar_{profile}")
+        try:
+            if redividir:
+                grupos.resplit_group(profile, grupo, novo_total)
+                st.session_state[f"grupo_msg_{profile}"] = "Parcelas redivididas."
+            elif cancelar:
+                n = grupos.cancel_remaining(profile, grupo)
+                st.session_state[f"grupo_msg_{profile}"] = f"{n} parcela(s) cancelada(s)."
+            elif antecipar:
+                n = grupos.prepay_group(profile, grupo, data_antecipacao, valor_antecipacao or None)
+                st.session_state[f"grupo_msg_{profile}"] = f"{n} parcela(s) antecipada(s)."
+            else:
+                return
+        except WriteConflict as e:
+            st.warning(f"{e} Recarregue a compra e tente novamente.")
+            return
+        st.rerun()
+
+# --- Aba de Perfis ---
+def manage_profiles_tab():
+    st.header("👥 Gerenciamento de Perfis")
+    profiles = load_profiles()
+    st.subheader("Perfis Atuais")
+    st.write(", ".join(profiles))
+
+    with st.form("add_profile_form"):
+        new_profile = st.text_input("Novo Perfil (Ex: 'Filho 1', 'Casa')").strip()
+        submitted = st.form_submit_button("Adicionar Perfil")
+        if submitted and new_profile:
+            if new_profile not in profiles:
+                update_profiles(lambda current: current if new_profile in current else current + [new_profile])
+                st.success(f"Perfil '{new_profile}' adicionado com sucesso!")
+                st.rerun()
+            else:
+                st.warning("Este perfil já existe.")
+
+    st.subheader("Remover Perfil")
+    profile_to_remove = st.selectbox("Selecione o Perfil para Remover", profiles)
+    if st.button("Remover Perfil"):
+        # Atenção: remover o perfil não remove automaticamente o arquivo de dados associado.
+        update_profiles(lambda current: [p for p in current if p != profile_to_remove])
+        st.success(f"Perfil '{profile_to_remove}' removido com sucesso!")
+        st.rerun()
+
+# --- Aba de Categorias ---
+def manage_categories_tab():
+    st.header("📂 Gerenciamento de Categorias")
+
+    st.subheader("Categorias de Entrada")
+    st.write(", ".join(CATEGORIAS_ENTRADA))
+    with st.form("add_entrada_form"):
+        new_entrada = st.text_input("Nova Categoria de Entrada").strip()
+        submitted_entrada = st.form_submit_button("Adicionar Entrada")
+        if submitted_entrada and new_entrada:
+            if new_entrada not in CATEGORIAS_ENTRADA:
+                update_categories(CATEGORIES_ENTRADA_FILE, DEFAULT_CATEGORIAS_ENTRADA,
+                                  lambda current: current if new_entrada in current else current + [new_entrada])
+                st.success(f"Categoria '{new_entrada}' adicionada.")
+                st.rerun()
+
+    st.subheader("Categorias de Gasto")
+    st.write(", ".join(CATEGORIAS_GASTO))
+    with st.form("add_gasto_form"):
+        new_gasto = st.text_input("Nova Categoria de Gasto").strip()
+        submitted_gasto = st.form_submit_button("Adicionar Gasto")
+        if submitted_gasto and new_gasto:
+            if new_gasto not in CATEGORIAS_GASTO:
+                update_categories(CATEGORIES_GASTO_FILE, DEFAULT_CATEGORIAS_GASTO,
+                                  lambda current: current if new_gasto in current else current + [new_gasto])
+                st.success(f"Categoria '{new_gasto}' adicionada.")
+                st.rerun()
+
+# --- Aba de Cartões ---
+def upsert_card(cards_df, card):
+    """Cartões com `card` (dict) incluído, ou atualizado se já existir um cartão com o mesmo nome."""
+    if card['Nome'] in cards_df['Nome'].values:
+        cards_df = cards_df.copy()
+        cards_df.loc[cards_df['Nome'] == card['Nome'], ['Bandeira', 'Dono', 'DiaFechamento', 'DiaVencimento']] = [
+            card['Bandeira'], card['Dono'], card['DiaFechamento'], card['DiaVencimento']]
+        return cards_df
+    return pd.concat([cards_df, pd.DataFrame([card])], ignore_index=True)
+
+def manage_cards_tab():
+    st.header("💳 Gerenciamento de Cartões")
+
+    cards_df = load_cards()
+    st.subheader("Cartões Cadastrados")
+    if cards_df.empty:
+        st.info("Nenhum cartão cadastrado.")
+    else:
+        display_df = cards_df.copy()
+        display_df['DiaFechamento'] = display_df['DiaFechamento'].astype('Int64')
+        st.dataframe(display_df)
+
+        # --- Faturas (ciclos pelo dia de fechamento, de todos os perfis) ---
+        st.markdown("---")
+        st.subheader("🧾 Faturas")
+        with instrumentacao.stage("faturas"):
+            invoices = faturas.invoices_for(load_profiles(), cards_df)
+        if invoices.empty:
+            st.info("Nenhuma compra no cartão registrada.")
+        else:
+            invoice_card = st.selectbox("Cartão", ['Todos'] + sorted(invoices['Cartao'].unique().tolist()), key="faturas_cartao")
+            if invoice_card != 'Todos':
+                invoices = invoices[invoices['Cartao'] == invoice_card]
+            abertas = invoices[invoices['Status'] == 'Aberta']
+            fechadas = invoices[invoices['Status'] == 'Fechada']
+            futuras = invoices[invoices['Status'] == 'Futura']
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Fatura(s) aberta(s)", f"R$ {abertas['Valor'].sum():,.2f}")
+            col2.metric("Última(s) fechada(s)", f"R$ {fechadas.groupby('Cartao')['Valor'].last().sum():,.2f}")
+            col3.metric("Parcelas futuras", f"R$ {futuras['Valor'].sum():,.2f}")
+            st.dataframe(
+                invoices.sort_values(['Fechamento', 'Cartao'], ascending=[False, True]),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Fechamento": st.column_config.DateColumn("Fechamento", format="DD/MM/YYYY"),
+                    "Vencimento": st.column_config.DateColumn("Vencimento", format="DD/MM/YYYY"),
+                    "Valor": st.column_config.NumberColumn("Valor (R$)", format="R$ %.2f"),
+                },
+            )
+
+    st.markdown("---")
+    st.subheader("Adicionar / Atualizar Cartão")
+    with st.form("add_card_form"):
+        nome = st.text_input("Nome do Cartão (ex: 'Nubank Visa')")
+        bandeira = st.text_input("Bandeira (ex: Visa, MasterCard, Elo)")
+        profiles = load_profiles()
+        dono = st.selectbox("Dono do Cartão (perfil)", profiles)
+        dia_fech = st.number_input("Dia de fechamento da fatura (1-31)", min_value=1, max_value=31, step=1)
+        dia_venc = st.number_input("Dia de vencimento da fatura (1-31)", min_value=1, max_value=31, value=10, step=1)
+        submitted_card = st.form_submit_button("Salvar Cartão")
+        if submitted_card:
+            if not nome:
+                st.warning("Insira o nome do cartão.")
+            else:
+                card = {'Nome': nome, 'Bandeira': bandeira, 'Dono': dono, 'DiaFechamento': int(dia_fech), 'DiaVencimento': int(dia_venc)}
+                existed = nome in cards_df['Nome'].values
+                update_cards(lambda current: upsert_card(current, card))
+                st.success("Cartão atualizado." if existed else "Cartão adicionado.")
+                st.rerun()
+
+    st.subheader("Remover Cartão")
+    if not cards_df.empty:
+        card_to_remove = st.selectbox("Selecione o cartão para remover", cards_df['Nome'].tolist())
+        if st.button("Remover Cartão"):
+            update_cards(lambda current: current[current['Nome'] != card_to_remove])
+            st.success("Cartão removido.")
+            st.rerun()
@@ -0,0 +1,81 @@
+"""
+Paginação das tabelas de transações e redução de pontos dos gráficos, feitas no servidor.
+
+O st.data_editor e o Plotly enviam ao navegador tudo o que recebem; com centenas de
+milhares de linhas a página fica enorme e o editor trava. Aqui a busca em 'Descrição',
+a ordenação e o recorte da página acontecem no pandas, e o navegador recebe no máximo
+MAX_PAGE_SIZE linhas por rerun. Séries diárias longas são reduzidas a no máximo
+MAX_CHART_POINTS pontos por série, preservando mínimos e máximos de cada intervalo.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [50, 100, 250, 500, 1000]
+MAX_PAGE_SIZE = max(PAGE_SIZES)
+MAX_CHART_POINTS = int(os.environ.get("GRAFICOS_MAX_PONTOS", "1000"))
+
+
+def search_mask(df, text, column='Descrição'):
+    """Máscara das linhas cuja `column` contém `text` (sem diferenciar maiúsculas; texto vazio = todas)."""
+    text = (text or '').strip()
+    if not text or column not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    return df[column].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+
+
+def sort_frame(df, column=None, ascending=True):
+    """Ordena por `column` (ordenação estável); sem coluna, ou se já estiver em ordem, não copia nada."""
+    if column is None or column not in df.columns:
+        return df
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # categorias ficam na ordem em que apareceram: ordenar pelo texto (só as categorias são comparadas)
+        values = values.cat.set_categories(sorted(values.cat.categories))
+    if (values.is_monotonic_increasing if ascending else values.is_monotonic_decreasing):
+        return df
+    return df.sort_values(column, ascending=ascending, kind='stable', na_position='last', key=lambda _: values)
+
+
+def page_frame(df, search=None, sort_by=None, ascending=True, page=1, page_size=100):
+    """
+    Aplica busca, ordenação e paginação. Retorna (página, total de linhas após a busca, número de páginas).
+    `page` começa em 1 e é limitada ao intervalo válido; `page_size` é limitado a MAX_PAGE_SIZE.
+    """
+    page_size = int(min(max(page_size, 1), MAX_PAGE_SIZE))
+    mask = search_mask(df, search)
+    matched = df if mask.all() else df[mask]
+    total = len(matched)
+    n_pages = max(1, -(-total // page_size))
+    page = int(min(max(page, 1), n_pages))
+    ordered = sort_frame(matched, sort_by, ascending)
+    start = (page - 1) * page_size
+    return ordered.iloc[start:start + page_size], total, n_pages
+
+
+def downsample(df, x, y, max_points=None, by=None):
+    """
+    Reduz a série (`x` ordenável, `y` numérico) a no máximo ~`max_points` pontos por grupo de `by`:
+    os pontos são divididos em intervalos consecutivos e de cada intervalo ficam o primeiro,
+    o de mínimo e o de máximo (os picos continuam visíveis). Séries curtas são devolvidas intactas.
+    """
+    max_points = max_points or MAX_CHART_POINTS
+    if by is not None:
+        parts = [downsample(part, x, y, max_points) for _, part in df.groupby(by, sort=False, observed=True)]
+        return pd.concat(parts, ignore_index=True) if parts else df
+    n = len(df)
+    if n <= max_points:
+        return df
+    df = df.sort_values(x, kind='stable').reset_index(drop=True)
+    n_buckets = max(1, max_points // 3)
+    bucket = (np.arange(n) * n_buckets) // n
+    values = pd.Series(df[y].to_numpy(dtype='float64'))
+    grouped = values.groupby(bucket)
+    keep = np.unique(np.concatenate([
+        np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]]),
+        grouped.idxmin().to_numpy(),
+        grouped.idxmax().to_numpy(),
+        [n - 1],
+    ]))
+    return df.iloc[keep].reset_index(drop=True)
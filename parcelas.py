@@ -0,0 +1,157 @@
+"""
+Geração de parcelas de compras no cartão, em lote.
+
+Recebe várias compras de uma vez (arrays de valores totais, número de parcelas,
+datas de início e parcela inicial) e devolve todas as linhas de transação num único
+DataFrame, sem laço em Python por parcela:
+  - valores em centavos inteiros (int64): a soma das parcelas é sempre igual ao total,
+    com os centavos restantes distribuídos nas primeiras parcelas;
+  - datas deslocadas mês a mês de forma vetorizada (datetime64[M]), com o mesmo ajuste
+    de fim de mês do relativedelta (31/01 + 1 mês = 28/02 ou 29/02).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+
+
+# sufixo " (k/N)" que generate_transactions acrescenta à descrição de cada parcela
+SUFFIX_PATTERN = r' \(\d+/\d+\)$'
+
+
+def split_cents(total_cents, n_installments):
+    """
+    Divide cada total (centavos) no número de parcelas correspondente.
+    Retorna (base, resto): a parcela i (0-based) vale base + (i < resto) centavos.
+    """
+    total_cents = np.asarray(total_cents, dtype=np.int64)
+    n = np.maximum(np.asarray(n_installments, dtype=np.int64), 1)
+    base = total_cents // n
+    return base, total_cents - base * n
+
+
+def installment_values(total_value, n_installments):
+    """Lista com o valor (float, 2 casas) de cada uma das `n_installments` parcelas de `total_value`."""
+    if n_installments <= 0:
+        return []
+    base, remainder = split_cents(armazenamento.reais_to_cents([total_value]).to_numpy(dtype='int64'), [n_installments])
+    cents = base[0] + (np.arange(n_installments) < remainder[0])
+    return (cents / 100).tolist()
+
+
+def strip_suffix(descriptions):
+    """Descrições sem o sufixo ' (k/N)' das parcelas (as demais ficam como estão)."""
+    return pd.Series(descriptions).str.replace(SUFFIX_PATTERN, '', regex=True)
+
+
+def replace_suffix(descriptions, installment, n_installments):
+    """Troca o sufixo ' (k/N)' das descrições que o têm por ' (installment/n_installments)' (vetorizado)."""
+    descriptions = pd.Series(descriptions).reset_index(drop=True)
+    has_suffix = descriptions.str.contains(SUFFIX_PATTERN, regex=True, na=False).to_numpy()
+    suffix = (' (' + pd.Series(np.broadcast_to(installment, len(descriptions))).astype(str) + '/'
+              + pd.Series(np.broadcast_to(n_installments, len(descriptions))).astype(str) + ')')
+    replaced = strip_suffix(descriptions).astype(object) + suffix.astype(object)
+    return replaced.where(has_suffix, descriptions.astype(object)).to_numpy()
+
+
+def new_groups(n):
+    """`n` identificadores de Grupo (UUID versão 4, em texto) gerados de uma vez."""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # versão 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # variante RFC 4122
+    hexa = raw.tobytes().hex()
+    return [f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}" for h in (hexa[i:i + 32] for i in range(0, 32 * n, 32))]
+
+
+def add_months(dates, months):
+    """
+    Soma `months` (array de inteiros) às datas, vetorizado. Quando o dia não existe no
+    mês de destino, usa o último dia do mês (mesma regra do relativedelta).
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+    month_start = dates.astype('datetime64[M]')
+    day = (dates - month_start.astype('datetime64[D]')).astype(np.int64)
+    target = month_start + np.asarray(months, dtype=np.int64).astype('timedelta64[M]')
+    days_in_month = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+    return target.astype('datetime64[D]') + np.minimum(day, days_in_month - 1).astype('timedelta64[D]')
+
+
+def generate_transactions(purchases):
+    """
+    Gera as linhas de transação de várias compras de uma vez.
+
+    `purchases`: DataFrame (ou dict de colunas) com uma linha por compra e colunas
+      Data, Tipo, Categoria, Descrição, Valor (total da compra),
+      e opcionais PagoComCartao (bool), Cartao, NumParcelas, ParcelaAtual (1..N), GerarParcelas (bool).
+
+    Mesmas regras de add_transaction: compras no cartão com NumParcelas > 1 recebem Grupo e
+    TotalCompra, a linha da parcela atual vale total/N (centavos distribuídos) e, com GerarParcelas,
+    são geradas também as parcelas seguintes até N, uma por mês. Demais compras geram uma linha
+    com o valor total. Retorna um DataFrame com as colunas de armazenamento.TRANSACTION_COLUMNS
+    (sem ID: atribuído na gravação) já no modelo em memória (valores em centavos, booleanos, categóricos).
+    Valor de entrada é sempre em reais.
+    """
+    purchases = pd.DataFrame(purchases).reset_index(drop=True)
+    n_purchases = len(purchases)
+    if n_purchases == 0:
+        return armazenamento.empty_transactions().drop(columns=['ID'])
+
+    def column(name, default):
+        if name in purchases.columns:
+            return purchases[name]
+        return pd.Series([default] * n_purchases)
+
+    card = column('PagoComCartao', False).fillna(False).astype(bool).to_numpy()
+    generate = column('GerarParcelas', False).fillna(False).astype(bool).to_numpy()
+    num_raw = pd.to_numeric(column('NumParcelas', np.nan), errors='coerce').to_numpy(dtype='float64')
+    current_raw = pd.to_numeric(column('ParcelaAtual', np.nan), errors='coerce').to_numpy(dtype='float64')
+    has_num = card & ~np.isnan(num_raw) & (num_raw > 0)
+    has_current = card & ~np.isnan(current_raw) & (current_raw > 0)
+    num = np.where(has_num, np.nan_to_num(num_raw), 1).astype(np.int64)
+    start = np.where(~np.isnan(current_raw) & (current_raw > 0), np.nan_to_num(current_raw), 1).astype(np.int64)
+    parceled = card & (num > 1)
+
+    # linhas por compra: a parcela atual + (se pedido) as seguintes até N
+    n_rows = np.where(parceled & generate, np.maximum(num - start, 0) + 1, 1)
+    owner = np.repeat(np.arange(n_purchases), n_rows)
+    offset = np.arange(len(owner)) - np.repeat(np.cumsum(n_rows) - n_rows, n_rows)
+    installment = start[owner] + offset
+
+    total_cents = armazenamento.reais_to_cents(purchases['Valor']).fillna(0).to_numpy(dtype='int64')
+    base, remainder = split_cents(total_cents, num)
+    index = np.clip(installment, 1, num[owner]) - 1
+    cents = np.where(parceled[owner], base[owner] + (index < remainder[owner]), total_cents[owner])
+
+    def repeat(series):
+        return series.take(owner).reset_index(drop=True)
+
+    row_parceled = parceled[owner]
+    description = repeat(purchases['Descrição'])
+    suffix = ' (' + pd.Series(installment[row_parceled]).astype(str) + '/' + pd.Series(num[owner][row_parceled]).astype(str) + ')'
+    description = description.astype(object)
+    description[row_parceled] = (description[row_parceled].astype(str).to_numpy() + suffix.astype(object).to_numpy())
+
+    groups = np.full(n_purchases, pd.NA, dtype=object)
+    groups[parceled] = new_groups(int(parceled.sum()))
+    total_value = pd.array(np.where(card, total_cents, 0), dtype='Int64')
+    total_value[~card] = pd.NA
+    cards = column('Cartao', pd.NA).where(card, pd.NA)
+
+    df = pd.DataFrame({
+        'Data': add_months(pd.to_datetime(purchases['Data']).to_numpy()[owner], offset),
+        'Tipo': repeat(purchases['Tipo']),
+        'Categoria': repeat(purchases['Categoria']),
+        'Descrição': description,
+        'Valor': cents,
+        'PagoComCartao': card[owner],
+        'Cartao': repeat(cards),
+        'NumParcelas': np.where(has_num, num, np.nan)[owner],
+        # a primeira linha só registra ParcelaAtual quando ela foi informada
+        'ParcelaAtual': np.where((offset == 0) & ~has_current[owner], np.nan, installment),
+        'GerouParcelas': generate[owner],
+        'TotalCompra': total_value[owner],
+        'Grupo': groups[owner],
+    })
+    return armazenamento.normalize_transactions(df).drop(columns=['ID'])
@@ -0,0 +1,170 @@
+"""
+Gravação segura de arquivos compartilhados por várias sessões (e processos) ao mesmo tempo.
+
+  - file_lock(path): trava exclusiva por arquivo. Dentro do processo é um RLock (reentrante:
+    quem já tem a trava pode chamar outras funções que também a pedem); entre processos,
+    flock (ou msvcrt no Windows) no arquivo auxiliar {path}.lock, que nunca é apagado.
+  - write_atomic(path, write): grava num temporário no mesmo diretório e troca com os.replace;
+    quem lê vê o arquivo antigo ou o novo, nunca um arquivo pela metade.
+  - file_version(path) / check_version(path, expected): verificação otimista. Quem leu um arquivo
+    na versão V grava com expected_version=V; se outra sessão gravou no meio, WriteConflict.
+
+As travas protegem só a gravação (e a releitura após uma mudança): leituras em cache não esperam.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+LOCK_SUFFIX = ".lock"
+
+
+class WriteConflict(RuntimeError):
+    """Os dados mudaram desde a versão em que o chamador os leu (gravação recusada, nada foi alterado)."""
+
+
+class _FileLock:
+    """Trava de um arquivo: RLock entre threads + trava do SO entre processos (só na primeira aquisição)."""
+
+    def __init__(self, path):
+        self.lock_path = path + LOCK_SUFFIX
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self.fd = _lock_os_file(self.lock_path)
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            fd, self.fd = self.fd, None
+            _unlock_os_file(fd)
+        self.thread_lock.release()
+
+
+def _lock_os_file(lock_path):
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK desiste após ~10 s: continua esperando
+                    continue
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _unlock_os_file(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+_locks = {}  # caminho absoluto -> _FileLock
+_locks_guard = threading.Lock()
+
+
+def _get_lock(path):
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = _FileLock(key)
+        return lock
+
+
+@contextmanager
+def file_lock(path):
+    """Trava exclusiva de `path` (reentrante na mesma thread) enquanto o bloco executa."""
+    lock = _get_lock(path)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@contextmanager
+def file_locks(paths):
+    """Trava vários arquivos, sempre na mesma ordem (evita impasse entre sessões que travam os mesmos arquivos)."""
+    with ExitStack() as stack:
+        for path in sorted(set(os.path.abspath(p) for p in paths)):
+            stack.enter_context(file_lock(path))
+        yield
+
+
+def write_atomic(path, write):
+    """
+    Grava `path` por meio de `write(caminho_temporário)` e troca o arquivo de uma vez (os.replace).
+    Em caso de erro o arquivo original fica intacto e o temporário é removido.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp cria o arquivo só para o dono: mantém as permissões do arquivo substituído
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_text_atomic(path, text):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    write_atomic(path, write)
+
+
+def file_version(path):
+    """Versão do arquivo para a verificação otimista: (mtime_ns, tamanho, inode), ou () se ele não existir."""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+def check_version(path, expected_version):
+    """Levanta WriteConflict se `path` mudou desde `expected_version` (None = sem verificação)."""
+    if expected_version is not None and file_version(path) != tuple(expected_version):
+        raise WriteConflict(f"{path} foi alterado por outra sessão.")
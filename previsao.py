@@ -0,0 +1,266 @@
+"""
+Previsão de fluxo de caixa: saldo projetado por perfil e mês para os próximos N meses.
+
+A projeção de cada mês futuro soma:
+  - parcelas já lançadas com data futura (compras com Grupo e GerarParcelas);
+  - parcelas restantes de compras parceladas registradas só com a parcela atual
+    (Grupo sem GerouParcelas): NumParcelas - ParcelaAtual parcelas, uma por mês, com o valor da última;
+  - lançamentos recorrentes: Tipo × Categoria (fora de parcelas) presente em pelo menos
+    MIN_RECURRING_MONTHS dos últimos LOOKBACK_MONTHS meses completos, projetado pela mediana
+    mensal desses meses. Lançamentos avulsos já agendados no mês contam como parte do recorrente
+    (vale o maior dos dois); categorias não recorrentes entram só com o que já foi agendado.
+
+Tudo é calculado sobre uma tabela agregada por perfil (load_base),
+    Mes × Tipo × Categoria × Origem -> Valor (centavos), Quantidade
+montada uma vez a partir do histórico e guardada no cache_dados até a próxima gravação do perfil.
+A previsão em si só opera sobre essa tabela (meses × categorias), não sobre as transações:
+o custo não cresce com o histórico. Mes é o número de meses desde 1970-01 (datetime64[M]).
+"""
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import cache_dados
+import resumos
+
+LOOKBACK_MONTHS = 6
+MIN_RECURRING_MONTHS = 4
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 36
+
+# Origem na tabela base
+SINGLE = 'Avulsa'
+INSTALLMENT = 'Parcela'
+PENDING_INSTALLMENT = 'Parcela prevista'  # parcela restante que não foi lançada
+
+# Origem no detalhamento da previsão
+SCHEDULED = 'Agendada'
+RECURRING = 'Recorrente'
+
+BASE_KEYS = ['Mes', 'Tipo', 'Categoria', 'Origem']
+BASE_COLUMNS = BASE_KEYS + ['Valor', 'Quantidade']
+DETAIL_COLUMNS = ['Perfil', 'Ano-Mês', 'Tipo', 'Categoria', 'Origem', 'Valor']
+FORECAST_COLUMNS = ['Perfil', 'Ano-Mês', 'Entrada', 'Gasto', 'Parcelas', 'Saldo', 'SaldoAcumulado']
+
+
+def month_index(dates):
+    """Datas -> meses desde 1970-01 (int64)."""
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+
+
+def month_label(months):
+    """Meses desde 1970-01 -> 'AAAA-MM' (mesmo formato de Ano-Mês nos resumos)."""
+    return np.asarray(months, dtype=np.int64).astype('datetime64[M]').astype(str)
+
+
+def _empty_base():
+    return pd.DataFrame({'Mes': pd.Series(dtype='int64'), 'Tipo': pd.Series(dtype=object),
+                         'Categoria': pd.Series(dtype=object), 'Origem': pd.Series(dtype=object),
+                         'Valor': pd.Series(dtype='int64'), 'Quantidade': pd.Series(dtype='int64')})
+
+
+def _aggregate(months, tipos, categories, origins, values):
+    keys = pd.DataFrame({'Mes': months, 'Tipo': tipos, 'Categoria': categories, 'Origem': origins, 'Valor': values})
+    grouped = keys.groupby(BASE_KEYS, observed=True, sort=False)['Valor'].agg(['sum', 'count']).reset_index()
+    grouped = grouped.rename(columns={'sum': 'Valor', 'count': 'Quantidade'})
+    for column in ('Tipo', 'Categoria', 'Origem'):
+        grouped[column] = grouped[column].astype(object)
+    return grouped[BASE_COLUMNS]
+
+
+def pending_installments(df):
+    """
+    Parcelas restantes (Mes, Tipo, Categoria, Valor em centavos) das compras parceladas em que
+    só a parcela atual foi lançada: uma linha por parcela que falta, nos meses seguintes à última lançada.
+    """
+    grouped = df['Grupo'].notna().to_numpy()
+    if not grouped.any():
+        return pd.DataFrame({'Mes': [], 'Tipo': [], 'Categoria': [], 'Valor': []})
+    rows = df.loc[grouped, ['Data', 'Tipo', 'Categoria', 'Valor', 'NumParcelas', 'ParcelaAtual', 'GerouParcelas', 'Grupo']]
+    # agrupa pelos códigos inteiros do Grupo (categórico), sem comparar os UUIDs em texto
+    per_group = pd.DataFrame({
+        'Grupo': pd.Categorical(rows['Grupo']).codes,
+        # transações ficam ordenadas por Data: a última posição do grupo é a parcela mais recente
+        'Posicao': np.arange(len(rows)),
+        'Parcela': rows['ParcelaAtual'].fillna(1).to_numpy(dtype='int64'),
+        'Gerou': rows['GerouParcelas'].to_numpy(dtype=bool),
+    }).groupby('Grupo', sort=False).agg(Posicao=('Posicao', 'max'), Parcela=('Parcela', 'max'), Gerou=('Gerou', 'any'))
+    latest = rows.iloc[per_group['Posicao'].to_numpy()]
+    remaining = latest['NumParcelas'].fillna(0).to_numpy(dtype='int64') - per_group['Parcela'].to_numpy()
+    remaining = np.where(per_group['Gerou'].to_numpy(), 0, np.maximum(remaining, 0))
+
+    owner = np.repeat(np.arange(len(latest)), remaining)
+    offset = np.arange(len(owner)) - np.repeat(np.cumsum(remaining) - remaining, remaining) + 1
+    return pd.DataFrame({
+        'Mes': month_index(latest['Data'].to_numpy())[owner] + offset,
+        'Tipo': latest['Tipo'].to_numpy()[owner],
+        'Categoria': latest['Categoria'].to_numpy()[owner],
+        'Valor': latest['Valor'].to_numpy(dtype='int64')[owner],
+    })
+
+
+def build_base(df):
+    """Agrega as transações de um perfil em Mes × Tipo × Categoria × Origem (+ parcelas restantes)."""
+    if df is None or df.empty:
+        return _empty_base()
+    installment = df['Grupo'].notna().to_numpy()
+    origins = pd.Categorical.from_codes(installment.astype('int8'), [SINGLE, INSTALLMENT])
+    base = _aggregate(month_index(df['Data'].to_numpy()), df['Tipo'], df['Categoria'], origins,
+                      df['Valor'].to_numpy(dtype='int64'))
+    pending = pending_installments(df)
+    if pending.empty:
+        return base
+    pending = _aggregate(pending['Mes'], pending['Tipo'], pending['Categoria'], PENDING_INSTALLMENT, pending['Valor'])
+    return pd.concat([base, pending], ignore_index=True)
+
+
+def _base_key(backend, profile):
+    return f"{backend.cache_key(profile)}#previsao"
+
+
+def load_base(profile, backend=None):
+    """Tabela base da previsão do perfil (montada a partir do histórico só quando não está em cache)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return _empty_base()
+
+    def build():
+        return build_base(armazenamento.load_transactions(profile, backend.name))
+    return cache_dados.get_versioned(_base_key(backend, profile), version, build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    # a versão nova já invalidaria a entrada; descartá-la agora libera a memória
+    cache_dados.invalidate(_base_key(backend, profile))
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def _current_month(today):
+    return int(month_index([pd.Timestamp(today if today is not None else pd.Timestamp.today()).normalize()])[0])
+
+
+def recurring_from_base(base, current_month, lookback=LOOKBACK_MONTHS, min_months=MIN_RECURRING_MONTHS):
+    """Tipo, Categoria, Meses (em que apareceu) e Valor (mediana mensal, centavos) dos lançamentos recorrentes."""
+    history = base[(base['Origem'] == SINGLE) & (base['Mes'] >= current_month - lookback)
+                   & (base['Mes'] < current_month)]
+    monthly = history.groupby(['Tipo', 'Categoria', 'Mes'], sort=False)['Valor'].sum()
+    stats = monthly.groupby(level=['Tipo', 'Categoria'], sort=False).agg(['count', 'median'])
+    stats = stats[stats['count'] >= min_months]
+    return pd.DataFrame({'Tipo': stats.index.get_level_values('Tipo').astype(object),
+                         'Categoria': stats.index.get_level_values('Categoria').astype(object),
+                         'Meses': stats['count'].to_numpy(dtype='int64'),
+                         'Valor': np.round(stats['median'].to_numpy(dtype='float64')).astype(np.int64)})
+
+
+def _profile_detail(base, current_month, months, lookback, min_months):
+    """Detalhamento (centavos) de um perfil: Mes × Tipo × Categoria × Origem -> Valor."""
+    start, stop = current_month + 1, current_month + 1 + months
+    future = base[(base['Mes'] >= start) & (base['Mes'] < stop)]
+    scheduled = future[['Mes', 'Tipo', 'Categoria', 'Valor']].assign(
+        Origem=np.where(future['Origem'] == SINGLE, SCHEDULED, INSTALLMENT))
+
+    recurring = recurring_from_base(base, current_month, lookback, min_months)
+    if recurring.empty:
+        return scheduled
+    # o recorrente completa o que já está agendado (avulso) no mês, até a mediana
+    grid = recurring[['Tipo', 'Categoria', 'Valor']].merge(pd.DataFrame({'Mes': np.arange(start, stop)}), how='cross')
+    single = scheduled[scheduled['Origem'] == SCHEDULED].groupby(['Mes', 'Tipo', 'Categoria'], sort=False)['Valor'].sum()
+    grid = grid.merge(single.rename('Agendado').reset_index(), on=['Mes', 'Tipo', 'Categoria'], how='left')
+    grid['Valor'] = (grid['Valor'] - grid['Agendado'].fillna(0).astype('int64')).clip(lower=0)
+    grid = grid[grid['Valor'] > 0].drop(columns=['Agendado']).assign(Origem=RECURRING)
+    return pd.concat([scheduled, grid], ignore_index=True)
+
+
+def _bases(profiles, backend):
+    return armazenamento.map_profiles(lambda profile: load_base(profile, backend), profiles)
+
+
+def forecast_detail(profiles, months=DEFAULT_MONTHS, today=None, backend=None,
+                    lookback=LOOKBACK_MONTHS, min_months=MIN_RECURRING_MONTHS):
+    """
+    Valores projetados (em reais) por Perfil, Ano-Mês, Tipo, Categoria e Origem
+    (Agendada, Parcela ou Recorrente) para os `months` meses seguintes ao mês de `today`.
+    """
+    current = _current_month(today)
+    frames = []
+    for profile, base in zip(profiles, _bases(profiles, backend)):
+        detail = _profile_detail(base, current, months, lookback, min_months)
+        if not detail.empty:
+            frames.append(detail.assign(Perfil=profile))
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype='float64' if c == 'Valor' else object) for c in DETAIL_COLUMNS})
+    detail = pd.concat(frames, ignore_index=True)
+    detail = detail.groupby(['Perfil', 'Mes', 'Tipo', 'Categoria', 'Origem'], sort=True)['Valor'].sum().reset_index()
+    detail['Ano-Mês'] = month_label(detail['Mes'])
+    detail['Valor'] = detail['Valor'].to_numpy(dtype='int64') / 100
+    return detail[DETAIL_COLUMNS]
+
+
+def opening_balance(base, current_month):
+    """Saldo (centavos) de tudo o que foi lançado até o fim do mês atual (Entrada - Gasto)."""
+    rows = base[(base['Mes'] <= current_month) & (base['Origem'] != PENDING_INSTALLMENT)]
+    signed = np.where(rows['Tipo'] == 'Entrada', 1, np.where(rows['Tipo'] == 'Gasto', -1, 0))
+    return int((rows['Valor'].to_numpy(dtype='int64') * signed).sum())
+
+
+def forecast(profiles, months=DEFAULT_MONTHS, today=None, goals=None, backend=None,
+             lookback=LOOKBACK_MONTHS, min_months=MIN_RECURRING_MONTHS):
+    """
+    Fluxo de caixa projetado por perfil e mês (valores em reais): Entrada, Gasto (com Parcelas à parte),
+    Saldo do mês e SaldoAcumulado a partir do saldo até o fim do mês atual. Todos os meses aparecem,
+    mesmo sem nada previsto. Com `goals` (metas.json), acrescenta as colunas de resumos.goals_report.
+    """
+    current = _current_month(today)
+    future_months = np.arange(current + 1, current + 1 + months)
+    frames = []
+    for profile, base in zip(profiles, _bases(profiles, backend)):
+        detail = _profile_detail(base, current, months, lookback, min_months)
+        kind = detail['Tipo'].to_numpy(dtype=object)
+        values = detail['Valor'].to_numpy(dtype='int64')
+        position = detail['Mes'].to_numpy(dtype='int64') - (current + 1)
+        # somas por mês sem groupby: bincount nas posições dos meses
+        entrada = np.bincount(position, weights=values * (kind == 'Entrada'), minlength=months)
+        gasto = np.bincount(position, weights=values * (kind == 'Gasto'), minlength=months)
+        installments = np.bincount(position, weights=values * ((kind == 'Gasto') & (detail['Origem'] == INSTALLMENT).to_numpy()),
+                                   minlength=months)
+        saldo = entrada - gasto
+        frames.append(pd.DataFrame({
+            'Perfil': profile,
+            'Ano-Mês': month_label(future_months),
+            'Entrada': entrada / 100,
+            'Gasto': gasto / 100,
+            'Parcelas': installments / 100,
+            'Saldo': saldo / 100,
+            'SaldoAcumulado': (opening_balance(base, current) + np.cumsum(saldo)) / 100,
+        }))
+    if not frames:
+        result = pd.DataFrame({c: pd.Series(dtype=object if c in ('Perfil', 'Ano-Mês') else 'float64')
+                               for c in FORECAST_COLUMNS})
+    else:
+        result = pd.concat(frames, ignore_index=True)[FORECAST_COLUMNS].round(2)
+    if goals is None:
+        return result
+    status = resumos.goals_report(result, goals).drop(columns=['Gasto', 'Sobra'])
+    return result.merge(status, on=['Perfil', 'Ano-Mês'], how='left')
+
+
+def recurring(profiles, today=None, backend=None, lookback=LOOKBACK_MONTHS, min_months=MIN_RECURRING_MONTHS):
+    """Lançamentos recorrentes detectados por perfil: Perfil, Tipo, Categoria, Meses e ValorMensal (reais)."""
+    current = _current_month(today)
+    frames = []
+    for profile, base in zip(profiles, _bases(profiles, backend)):
+        found = recurring_from_base(base, current, lookback, min_months)
+        if not found.empty:
+            frames.append(found.assign(Perfil=profile))
+    if not frames:
+        return pd.DataFrame({'Perfil': pd.Series(dtype=object), 'Tipo': pd.Series(dtype=object),
+                             'Categoria': pd.Series(dtype=object), 'Meses': pd.Series(dtype='int64'),
+                             'ValorMensal': pd.Series(dtype='float64')})
+    found = pd.concat(frames, ignore_index=True)
+    found['ValorMensal'] = found.pop('Valor').to_numpy(dtype='int64') / 100
+    return found[['Perfil', 'Tipo', 'Categoria', 'Meses', 'ValorMensal']].sort_values(
+        ['Perfil', 'Tipo', 'ValorMensal'], ascending=[True, True, False], ignore_index=True)
@@ -0,0 +1,138 @@
+"""
+Modo relatório (sem Streamlit) para execução em lote, por exemplo via cron:
+
+    python -m gerenciamento_custos report [--perfis A,B] [--inicio AAAA-MM-DD] [--fim AAAA-MM-DD]
+                                          [--formato csv|json] [--saida DIR|-] [--secoes resumo,metas,cartoes,previsao]
+                                          [--meses 12]
+
+Usa os mesmos carregadores (cadastros.py, armazenamento.py) e agregações da interface:
+resumos mensais a partir dos rollups de resumos.py, status das metas de metas.json (resumos.goals_report),
+faturas por cartão de faturas.py e fluxo de caixa previsto (previsao.py) para os próximos --meses. Nada de interface é importado (nem Streamlit nem Plotly).
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+import armazenamento
+import cadastros
+import faturas
+import previsao
+import resumos
+
+SECTIONS = ['resumo', 'metas', 'cartoes', 'previsao']
+SECTION_FILES = {'resumo': 'relatorio_resumo_mensal', 'metas': 'relatorio_metas', 'cartoes': 'relatorio_cartoes',
+                 'previsao': 'relatorio_previsao'}
+
+
+def monthly_report(profiles, start, end, backend=None):
+    """Entrada, Gasto e Saldo por perfil e mês no período."""
+    rollup = resumos.summary_for_window(profiles, start, end, backend=backend)
+    frames = []
+    for profile, rows in rollup.groupby('Pessoa', sort=False, observed=True):
+        frames.append(resumos.monthly_summary(rows).reset_index().assign(Perfil=profile))
+    if not frames:
+        return pd.DataFrame(columns=['Perfil', 'Ano-Mês', 'Entrada', 'Gasto', 'Saldo'])
+    report = pd.concat(frames, ignore_index=True)
+    return report[['Perfil', 'Ano-Mês', 'Entrada', 'Gasto', 'Saldo']].round(2)
+
+
+def cards_report(profiles, cards_df, start, end, backend=None):
+    """Faturas por cartão (todos os perfis) com fechamento dentro do período."""
+    invoices = faturas.invoices_for(profiles, cards_df, backend=backend)
+    closing = invoices['Fechamento']
+    return invoices[(closing >= pd.Timestamp(start)) & (closing <= pd.Timestamp(end))].reset_index(drop=True)
+
+
+def build_report(profiles=None, start=None, end=None, sections=SECTIONS, backend=None, months=previsao.DEFAULT_MONTHS):
+    """
+    Monta as seções pedidas. Sem perfis/período, usa todos os perfis e todo o histórico.
+    A previsão cobre os `months` meses seguintes ao mês atual (não depende do período).
+    """
+    profiles = profiles or cadastros.load_profiles()
+    if start is None or end is None:
+        min_date, max_date = armazenamento.date_bounds(profiles, backend)
+        start = start or (min_date if min_date is not None else pd.Timestamp.today())
+        end = end or (max_date if max_date is not None else pd.Timestamp.today())
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    report = {}
+    monthly = monthly_report(profiles, start, end, backend)
+    if 'resumo' in sections:
+        report['resumo'] = monthly
+    if 'metas' in sections:
+        report['metas'] = resumos.goals_report(monthly, cadastros.load_goals())
+    if 'cartoes' in sections:
+        report['cartoes'] = cards_report(profiles, cadastros.load_cards(), start, end, backend)
+    if 'previsao' in sections:
+        report['previsao'] = previsao.forecast(profiles, months, goals=cadastros.load_goals(), backend=backend)
+    return report, (start, end)
+
+
+def _records(df):
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+
+def write_report(report, period, fmt='csv', output='-'):
+    """Grava o relatório: JSON (um documento) ou CSV (um arquivo por seção; em stdout, seções em sequência)."""
+    if fmt == 'json':
+        doc = {'periodo': {'inicio': f"{period[0]:%Y-%m-%d}", 'fim': f"{period[1]:%Y-%m-%d}"}}
+        doc.update({name: _records(df) for name, df in report.items()})
+        text = json.dumps(doc, ensure_ascii=False, indent=2)
+        if output == '-':
+            sys.stdout.write(text + '\n')
+        else:
+            path = output if output.endswith('.json') else os.path.join(output, 'relatorio.json')
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return
+    if output == '-':
+        for name, df in report.items():
+            sys.stdout.write(f"# {name}\n")
+            df.to_csv(sys.stdout, index=False, date_format='%Y-%m-%d')
+            sys.stdout.write('\n')
+        return
+    os.makedirs(output, exist_ok=True)
+    for name, df in report.items():
+        df.to_csv(os.path.join(output, f"{SECTION_FILES[name]}.csv"), index=False, date_format='%Y-%m-%d')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m gerenciamento_custos report',
+                                     description='Resumo mensal, metas, faturas de cartão e previsão de fluxo de caixa de todos os perfis, sem interface.')
+    parser.add_argument('--perfis', help='perfis separados por vírgula (padrão: todos)')
+    parser.add_argument('--inicio', help='data inicial AAAA-MM-DD (padrão: primeira transação)')
+    parser.add_argument('--fim', help='data final AAAA-MM-DD (padrão: última transação)')
+    parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--saida', default='-', help="diretório (ou arquivo .json) de saída; '-' = stdout")
+    parser.add_argument('--secoes', default=','.join(SECTIONS), help=f"seções separadas por vírgula ({', '.join(SECTIONS)})")
+    parser.add_argument('--meses', type=int, default=previsao.DEFAULT_MONTHS,
+                        help=f"meses à frente na seção previsao (1 a {previsao.MAX_MONTHS})")
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.meses <= previsao.MAX_MONTHS:
+        parser.error(f"--meses deve estar entre 1 e {previsao.MAX_MONTHS}")
+    sections = [s.strip() for s in args.secoes.split(',') if s.strip()]
+    unknown = [s for s in sections if s not in SECTIONS]
+    if unknown:
+        parser.error(f"seção desconhecida: {', '.join(unknown)}")
+    profiles = [p.strip() for p in args.perfis.split(',') if p.strip()] if args.perfis else None
+    try:
+        start = pd.Timestamp(args.inicio) if args.inicio else None
+        end = pd.Timestamp(args.fim) if args.fim else None
+    except ValueError as e:
+        parser.error(f"data inválida: {e}")
+    report, period = build_report(profiles, start, end, sections, months=args.meses)
+    write_report(report, period, args.formato, args.saida)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
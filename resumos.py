@@ -0,0 +1,152 @@
+"""
+Resumos mensais (rollups) das transações por perfil.
+
+Para cada perfil é mantida uma tabela agregada
+    Ano-Mês × Tipo × Categoria × Cartao -> Valor (soma), Quantidade (contagem)
+construída uma vez a partir do histórico e depois atualizada de forma incremental
+a cada gravação (append, edição, exclusão) por meio de register_write_listener:
+só as linhas alteradas entram no cálculo.
+
+Gráficos e métricas usam summary_for_window, cujo custo depende do número de meses
+e não do número de transações (apenas os meses parciais nas bordas do período
+são agregados a partir das transações).
+
+No rollup materializado (load_rollup) Valor fica em centavos (int64), como nas transações:
+somas e deltas são exatos. summary_for_window devolve Valor em reais.
+
+goals_report compara os totais mensais (do relatório ou da previsão) com as metas de metas.json.
+"""
+import pandas as pd
+
+import armazenamento
+import cache_dados
+
+ROLLUP_KEYS = ['Ano-Mês', 'Tipo', 'Categoria', 'Cartao']
+ROLLUP_COLUMNS = ROLLUP_KEYS + ['Valor', 'Quantidade']
+
+
+def _empty_rollup():
+    return pd.DataFrame({'Ano-Mês': pd.Series(dtype=object), 'Tipo': pd.Series(dtype=object),
+                         'Categoria': pd.Series(dtype=object), 'Cartao': pd.Series(dtype=object),
+                         'Valor': pd.Series(dtype='int64'), 'Quantidade': pd.Series(dtype='int64')})
+
+
+def build_rollup(df):
+    """Agrega transações em Ano-Mês × Tipo × Categoria × Cartao (soma de Valor e contagem)."""
+    if df is None or df.empty:
+        return _empty_rollup()
+    months = pd.to_datetime(df['Data']).dt.to_period('M').astype(str)
+    keys = df[['Tipo', 'Categoria', 'Cartao']].astype(object).assign(**{'Ano-Mês': months})
+    keys['Valor'] = df['Valor'].to_numpy(dtype='int64')
+    grouped = keys.groupby(ROLLUP_KEYS, dropna=False, sort=False)['Valor'].agg(['sum', 'count']).reset_index()
+    return grouped.rename(columns={'sum': 'Valor', 'count': 'Quantidade'})[ROLLUP_COLUMNS]
+
+
+def apply_delta(rollup, added, removed):
+    """Soma ao rollup as linhas `added` e subtrai as linhas `removed` (versões antigas)."""
+    plus = build_rollup(added)
+    minus = build_rollup(removed)
+    minus['Valor'] = -minus['Valor']
+    minus['Quantidade'] = -minus['Quantidade']
+    frames = [df for df in (rollup, plus, minus) if not df.empty]
+    if not frames:
+        return _empty_rollup()
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.groupby(ROLLUP_KEYS, dropna=False, sort=False)[['Valor', 'Quantidade']].sum().reset_index()
+    return merged[merged['Quantidade'] > 0][ROLLUP_COLUMNS].reset_index(drop=True)
+
+
+def _rollup_key(backend, profile):
+    return f"{backend.cache_key(profile)}#resumo_mensal"
+
+
+def load_rollup(profile, backend=None):
+    """Rollup mensal do perfil (montado a partir do histórico só quando não está em cache)."""
+    backend = armazenamento.get_backend(backend)
+    armazenamento.migrate_profile(profile, backend)
+    version = backend.version(profile)
+    if version is None:
+        return _empty_rollup()
+
+    def build():
+        return build_rollup(armazenamento.load_transactions(profile, backend.name))
+    return cache_dados.get_versioned(_rollup_key(backend, profile), version, build)
+
+
+def _on_write(profile, backend, previous_version, new_version, added, removed):
+    key = _rollup_key(backend, profile)
+    if added is None or removed is None:
+        cache_dados.invalidate(key)
+        return
+    cache_dados.update_frame(key, previous_version, new_version, lambda rollup: apply_delta(rollup, added, removed))
+
+
+armazenamento.register_write_listener(_on_write)
+
+
+def summary_for_window(profiles, start, end, card=None, backend=None):
+    """
+    Rollup (com coluna 'Pessoa' e Valor em reais) das transações de `profiles` entre `start` e `end`
+    (inclusivo), opcionalmente de um cartão. Meses inteiros vêm do rollup materializado; meses parciais
+    nas bordas do período são agregados a partir das transações desses dias.
+    """
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    if end < start:
+        return _empty_rollup().assign(Valor=pd.Series(dtype='float64'), Pessoa=pd.Series(dtype=object))
+    months = pd.period_range(start, end, freq='M')
+    full_months = {str(m) for m in months if m.start_time >= start and m.end_time.normalize() <= end}
+    edge_months = [m for m in months if str(m) not in full_months]
+
+    frames = []
+    # rollups ausentes do cache são montados em paralelo (um perfil por thread)
+    rollups = armazenamento.map_profiles(lambda profile: load_rollup(profile, backend), profiles)
+    for profile, rollup in zip(profiles, rollups):
+        rollup = rollup[rollup['Ano-Mês'].isin(full_months)]
+        if card is not None:
+            rollup = rollup[rollup['Cartao'] == card]
+        if not rollup.empty:
+            frames.append(rollup.assign(Pessoa=profile))
+    for month in edge_months:
+        window_start = max(start, month.start_time)
+        window_end = min(end, month.end_time.normalize())
+        rows = armazenamento.query_transactions(profiles, window_start, window_end, card, backend)
+        for person, person_rows in rows.groupby('Pessoa', sort=False, observed=True):
+            frames.append(build_rollup(person_rows).assign(Pessoa=person))
+    if not frames:
+        return _empty_rollup().assign(Valor=pd.Series(dtype='float64'), Pessoa=pd.Series(dtype=object))
+    summary = pd.concat(frames, ignore_index=True)
+    summary['Valor'] = summary['Valor'].to_numpy(dtype='int64') / 100
+    return summary
+
+
+def monthly_summary(rollup):
+    """Tabela Ano-Mês × (Entrada, Gasto, Saldo) a partir de um rollup."""
+    resumo = rollup.pivot_table(index='Ano-Mês', columns='Tipo', values='Valor', aggfunc='sum', fill_value=0)
+    resumo.columns.name = None
+    # garantir colunas Entrada/Gasto existam
+    if 'Entrada' not in resumo.columns:
+        resumo['Entrada'] = 0.0
+    if 'Gasto' not in resumo.columns:
+        resumo['Gasto'] = 0.0
+    resumo = resumo[['Entrada', 'Gasto']].sort_index()
+    resumo['Saldo'] = resumo['Entrada'] - resumo['Gasto']
+    return resumo
+
+
+def goals_report(monthly, goals):
+    """Para cada perfil/mês do resumo: metas definidas, valores realizados e se a meta foi cumprida."""
+    report = monthly[['Perfil', 'Ano-Mês', 'Entrada', 'Gasto']].copy()
+    report['MetaGasto'] = [(goals.get(p) or {}).get('meta_gasto') for p in report['Perfil']]
+    report['MetaSobraPercent'] = [(goals.get(p) or {}).get('meta_sobra_percent') for p in report['Perfil']]
+    report['MetaGasto'] = pd.to_numeric(report['MetaGasto'], errors='coerce')
+    report['MetaSobraPercent'] = pd.to_numeric(report['MetaSobraPercent'], errors='coerce')
+    report['Sobra'] = (report['Entrada'] - report['Gasto']).round(2)
+    entrada = report['Entrada'].where(report['Entrada'] > 0)
+    report['SobraPercent'] = (report['Sobra'] / entrada * 100).round(2)
+    # sem meta (ou meta zerada) o status fica vazio
+    report['DentroMetaGasto'] = (report['Gasto'] <= report['MetaGasto']).where(report['MetaGasto'] > 0)
+    report['DentroMetaSobra'] = (report['SobraPercent'] >= report['MetaSobraPercent']).where(
+        (report['MetaSobraPercent'] > 0) & entrada.notna())
+    return report[['Perfil', 'Ano-Mês', 'Gasto', 'MetaGasto', 'DentroMetaGasto',
+                   'Sobra', 'SobraPercent', 'MetaSobraPercent', 'DentroMetaSobra']]
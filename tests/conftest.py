@@ -0,0 +1,37 @@
+"""Configuração dos testes: módulos da raiz do repositório importáveis e dados num diretório temporário."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import armazenamento  # noqa: E402
+import cache_dados  # noqa: E402
+
+BACKENDS = ['csv', 'parquet', 'sqlite']
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Arquivos e banco de transações em `tmp_path`, com o cache vazio antes e depois do teste."""
+    monkeypatch.chdir(tmp_path)
+    import armazenamento_sqlite
+    monkeypatch.setattr(armazenamento_sqlite, 'DB_FILE', str(tmp_path / 'gerenciamento_custos.db'))
+    cache_dados.invalidate()
+    yield tmp_path
+    cache_dados.invalidate()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, data_dir):
+    """Nome de cada backend de armazenamento (Parquet só com pyarrow instalado)."""
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return request.param
+
+
+def reload_transactions(profile, backend):
+    """Transações relidas do disco (sem o cache), no formato de exibição (valores em reais)."""
+    cache_dados.invalidate()
+    return armazenamento.display_frame(armazenamento.load_transactions(profile, backend))
@@ -0,0 +1,44 @@
+"""Alertas de gasto alto: só o mês corrente, e o cache segue as gravações sem reler a configuração."""
+import pandas as pd
+
+import alertas
+import armazenamento
+import parcelas
+
+PROFILE = 'Teste'
+CONFIG = {'valor_alerta': 1000.0, 'dias_vencimento_alerta': 5}
+TODAY = '2025-11-25'
+
+
+def _expenses(rows):
+    dates, descriptions, values = zip(*rows)
+    return parcelas.generate_transactions({
+        'Data': pd.to_datetime(list(dates)), 'Tipo': ['Gasto'] * len(rows),
+        'Categoria': ['Moradia'] * len(rows), 'Descrição': list(descriptions), 'Valor': list(values)})
+
+
+def _large_messages(backend):
+    alerts = alertas.evaluate([PROFILE], {}, None, today=TODAY, config=CONFIG, backend=backend)
+    return alerts.loc[alerts['Alerta'] == 'Gasto alto', 'Mensagem'].tolist()
+
+
+def test_next_month_expense_is_not_reported(backend):
+    armazenamento.save_transactions(_expenses([
+        ('2025-11-10', 'Aluguel Novembro', 1500.0),
+        ('2025-12-10', 'Aluguel Dezembro', 1500.0),
+        ('2025-10-10', 'Aluguel Outubro', 1500.0),
+    ]), PROFILE, backend)
+    assert [m.split(' acima')[0] for m in _large_messages(backend)] == ['Aluguel Novembro']
+
+
+def test_append_updates_cached_large_expenses(backend, monkeypatch):
+    armazenamento.save_transactions(_expenses([('2025-11-10', 'Aluguel Novembro', 1500.0)]), PROFILE, backend)
+    assert len(_large_messages(backend)) == 1
+
+    def fail():
+        raise AssertionError("configuração relida durante a gravação")
+    monkeypatch.setattr(alertas, 'load_config', fail)
+    armazenamento.append_transactions(_expenses([
+        ('2025-11-20', 'Notebook', 4000.0), ('2025-11-21', 'Mercado', 300.0),
+    ]), PROFILE, backend)
+    assert [m.split(' acima')[0] for m in _large_messages(backend)] == ['Aluguel Novembro', 'Notebook']
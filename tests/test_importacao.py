@@ -0,0 +1,22 @@
+"""Importação com coluna Pessoa: só perfis cadastrados recebem linhas."""
+import armazenamento
+import cadastros
+import importacao
+from conftest import reload_transactions
+
+
+def test_unknown_person_rows_are_invalid(backend, data_dir):
+    cadastros.save_profiles(['Ana', 'Bruno'])
+    statement = data_dir / 'extrato.csv'
+    statement.write_text("Data,Descrição,Valor,Pessoa\n"
+                         "01/02/2025,Mercado,-100,Bruno\n"
+                         "02/02/2025,Farmácia,-30,\n"
+                         "03/02/2025,Cinema,-50,Fulano\n"
+                         "04/02/2025,Padaria,-12,Fulano\n", encoding='utf-8')
+    result = importacao.import_statement(str(statement), 'Ana', backend=backend)
+    assert (result['importadas'], result['invalidas']) == (2, 2)
+    assert result['por_perfil'] == {'Bruno': 1, 'Ana': 1}
+    assert result['pessoas_desconhecidas'] == {'Fulano': 2}
+    assert reload_transactions('Bruno', backend)['Descrição'].tolist() == ['Mercado']
+    assert reload_transactions('Ana', backend)['Descrição'].tolist() == ['Farmácia']
+    assert armazenamento.get_backend(backend).version('Fulano') is None
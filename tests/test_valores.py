@@ -0,0 +1,87 @@
+"""Valores monetários: gravados em reais, guardados em memória em centavos, relidos em reais."""
+import pandas as pd
+import pytest
+
+import armazenamento
+import importacao
+import parcelas
+from conftest import reload_transactions
+
+PROFILE = 'Teste'
+
+
+def _purchases(values):
+    return parcelas.generate_transactions({
+        'Data': pd.date_range('2025-01-01', periods=len(values), freq='D'), 'Tipo': ['Gasto'] * len(values),
+        'Categoria': ['Lazer'] * len(values), 'Descrição': [f'Compra {i}' for i in range(len(values))],
+        'Valor': values})
+
+
+def test_reais_to_cents_reads_integers_as_reais():
+    assert armazenamento.reais_to_cents(pd.Series([80, 3000])).tolist() == [8000, 300000]
+    assert armazenamento.reais_to_cents(pd.Series([12.34, None])).tolist() == [1234, pd.NA]
+
+
+def test_stored_to_cents_keeps_model_cents():
+    cents = pd.Series([8000, 1234], dtype='int64')
+    assert armazenamento.stored_to_cents(cents).tolist() == [8000, 1234]
+
+
+@pytest.mark.parametrize('values', [[200, 80], [12.34, 0.1], [3000.0, 1999.99]])
+def test_save_and_load_round_trip(backend, values):
+    armazenamento.save_transactions(_purchases(values), PROFILE, backend)
+    assert reload_transactions(PROFILE, backend)['Valor'].tolist() == pytest.approx(values)
+
+
+def test_append_round_trip(backend):
+    armazenamento.save_transactions(_purchases([10.5]), PROFILE, backend)
+    armazenamento.append_transactions(_purchases([200, 12.34]), PROFILE, backend)
+    assert sorted(reload_transactions(PROFILE, backend)['Valor']) == pytest.approx([10.5, 12.34, 200])
+
+
+def test_installments_round_trip(backend):
+    rows = parcelas.generate_transactions({
+        'Data': ['2025-01-10'], 'Tipo': ['Gasto'], 'Categoria': ['Lazer'], 'Descrição': ['TV'], 'Valor': [1000],
+        'PagoComCartao': [True], 'Cartao': ['Nubank'], 'NumParcelas': [3], 'ParcelaAtual': [1],
+        'GerarParcelas': [True]})
+    armazenamento.append_transactions(rows, PROFILE, backend)
+    df = reload_transactions(PROFILE, backend)
+    assert df['Valor'].tolist() == pytest.approx([333.34, 333.33, 333.33])
+    assert df['TotalCompra'].tolist() == pytest.approx([1000, 1000, 1000])
+
+
+def test_editor_whole_number_values(backend):
+    armazenamento.save_transactions(_purchases([10.5, 20.25]), PROFILE, backend)
+    shown = armazenamento.display_frame(armazenamento.load_transactions(PROFILE, backend))
+    # o st.data_editor devolve números inteiros digitados como int
+    editor_state = {
+        'edited_rows': {0: {'Valor': 80}},
+        'added_rows': [{'Data': '2025-02-01', 'Tipo': 'Gasto', 'Categoria': 'Lazer', 'Descrição': 'Nova',
+                        'Valor': 200}],
+        'deleted_rows': [],
+    }
+    upserts, deleted, originals = armazenamento.editor_changes(shown, editor_state)
+    armazenamento.apply_changes(PROFILE, upserts, deleted['ID'], backend, expected=originals)
+    df = reload_transactions(PROFILE, backend).set_index('Descrição')
+    assert df.loc[['Compra 0', 'Compra 1', 'Nova'], 'Valor'].tolist() == pytest.approx([80, 20.25, 200])
+
+
+def test_import_whole_number_amounts(backend, data_dir):
+    statement = data_dir / 'extrato.csv'
+    statement.write_text("Data,Descrição,Valor\n01/02/2025,Mercado,-100\n02/02/2025,Salário,3000\n", encoding='utf-8')
+    result = importacao.import_statement(str(statement), PROFILE, backend=backend)
+    assert result['importadas'] == 2
+    df = reload_transactions(PROFILE, backend).set_index('Descrição')
+    assert df.loc[['Mercado', 'Salário'], 'Valor'].tolist() == pytest.approx([100, 3000])
+    assert df.loc[['Mercado', 'Salário'], 'Tipo'].tolist() == ['Gasto', 'Entrada']
+
+    # reimportar o mesmo extrato não duplica (as chaves comparam os mesmos centavos)
+    again = importacao.import_statement(str(statement), PROFILE, backend=backend)
+    assert (again['importadas'], again['duplicadas']) == (0, 2)
+
+
+def test_import_estimates_purchase_total(data_dir):
+    chunk = pd.DataFrame({'Data': ['2025-03-01'], 'Descrição': ['Loja'], 'Valor': ['150'], 'NumParcelas': ['4']})
+    rows = importacao.to_transactions(chunk, {c: c for c in chunk.columns}, card='Nubank')
+    assert rows['Valor'].tolist() == [15000]
+    assert rows['TotalCompra'].tolist() == [60000]